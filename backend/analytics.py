@@ -0,0 +1,152 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Iterable, List, Optional
+import asyncio
+import numpy as np
+import pandas as pd
+
+from rollups import ROLLUP_SUM_FIELDS
+
+# Columnar analytics engine: only the report columns are projected, each
+# cursor batch is turned into NumPy arrays as it arrives, and type/category/
+# seller become pandas categoricals, so totals, group-bys, margins and
+# percentiles are vectorised bincount/sort operations instead of per-dict
+# Python loops. Frame building and group-bys run in a worker thread.
+ANALYTICS_NUMERIC_FIELDS = ["amount", "saleValue", "supplierValue", "commissionValue"]
+ANALYTICS_CATEGORICAL_FIELDS = ["type", "category", "seller"]
+ANALYTICS_PROJECTION = {"_id": 0, **{field: 1 for field in ANALYTICS_NUMERIC_FIELDS + ANALYTICS_CATEGORICAL_FIELDS}}
+ANALYTICS_BATCH_SIZE = 5000
+DEFAULT_PERCENTILES = [50, 90]
+
+
+def numeric_column(values: list) -> np.ndarray:
+    """Coluna numérica como float64 (ausentes/inválidos viram NaN)"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(np.float64)
+
+
+def build_frame(columns: dict) -> pd.DataFrame:
+    """Montar o DataFrame colunar (categóricas + float64, com salesTotal derivado)"""
+    frame = pd.DataFrame({
+        **{field: pd.Categorical(columns[field]) for field in ANALYTICS_CATEGORICAL_FIELDS},
+        **{field: numeric_column(columns[field]) for field in ANALYTICS_NUMERIC_FIELDS}
+    })
+    # Same semantics as rollup_increments(): sale value falling back to amount
+    amount = frame["amount"].fillna(0)
+    frame["salesTotal"] = frame["saleValue"].where(frame["saleValue"].notna(), amount)
+    frame[ANALYTICS_NUMERIC_FIELDS] = frame[ANALYTICS_NUMERIC_FIELDS].fillna(0)
+    return frame
+
+
+class ColumnBatches:
+    """Colunas de análise acumuladas lote a lote (um array NumPy por lote e campo numérico)"""
+
+    def __init__(self):
+        self.numeric = {field: [] for field in ANALYTICS_NUMERIC_FIELDS}
+        self.categorical = {field: [] for field in ANALYTICS_CATEGORICAL_FIELDS}
+
+    def add(self, batch: List[dict]):
+        for field, chunks in self.numeric.items():
+            chunks.append(numeric_column([document.get(field) for document in batch]))
+        for field, values in self.categorical.items():
+            values.extend(document.get(field) for document in batch)
+
+    def frame(self) -> pd.DataFrame:
+        return build_frame({
+            **self.categorical,
+            **{field: np.concatenate(chunks) if chunks else np.empty(0) for field, chunks in self.numeric.items()}
+        })
+
+
+def frame_from_records(records: Iterable[dict]) -> pd.DataFrame:
+    """DataFrame colunar a partir de transações já carregadas"""
+    columns = ColumnBatches()
+    columns.add(list(records))
+    return columns.frame()
+
+
+async def load_frame(db: AsyncIOMotorDatabase, match: dict) -> pd.DataFrame:
+    """Carregar só as colunas de análise das transações do filtro, lote a lote do cursor"""
+    columns = ColumnBatches()
+    cursor = db.transactions.find(match, ANALYTICS_PROJECTION).batch_size(ANALYTICS_BATCH_SIZE)
+    while batch := await cursor.to_list(ANALYTICS_BATCH_SIZE):
+        columns.add(batch)
+    return await asyncio.to_thread(columns.frame)
+
+
+def group_sums(frame: pd.DataFrame, by: str) -> tuple:
+    """Somas por grupo via bincount sobre os códigos categóricos (linhas sem chave ignoradas)"""
+    categorical = frame[by].cat
+    codes = categorical.codes.to_numpy()
+    groups = len(categorical.categories)
+    valid = codes >= 0
+    sums = {
+        field: np.bincount(codes[valid], weights=frame[field].to_numpy()[valid], minlength=groups)
+        for field in ANALYTICS_NUMERIC_FIELDS + ["salesTotal"]
+    }
+    sums["count"] = np.bincount(codes[valid], minlength=groups)
+    return list(categorical.categories), sums
+
+
+def type_totals(frame: pd.DataFrame) -> dict:
+    """Totais por tipo no mesmo formato de PeriodReport/daily_rollups"""
+    keys, sums = group_sums(frame, "type")
+    return {
+        key: {
+            field: int(sums[field][index]) if field == "count" else float(sums[field][index])
+            for field in ROLLUP_SUM_FIELDS
+        }
+        for index, key in enumerate(keys)
+        if sums["count"][index]
+    }
+
+
+def group_percentiles(codes: np.ndarray, values: np.ndarray, groups: int, percentiles: List[float]) -> np.ndarray:
+    """Percentis (interpolação linear) de cada grupo com uma única ordenação"""
+    valid = codes >= 0
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    values = values[order]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((groups, len(percentiles)), np.nan)
+    present = counts > 0
+    for column, percentile in enumerate(percentiles):
+        position = starts[present] + (counts[present] - 1) * (percentile / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        result[present, column] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return result
+
+
+def group_breakdown(frame: pd.DataFrame, by: str, percentiles: Optional[List[float]] = None) -> List[dict]:
+    """Vendas, custos, lucro, margem e percentis do ticket por type/category/seller"""
+    percentiles = percentiles if percentiles is not None else DEFAULT_PERCENTILES
+    keys, sums = group_sums(frame, by)
+    profit = sums["salesTotal"] - sums["supplierValue"] - sums["commissionValue"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(sums["salesTotal"] > 0, profit / sums["salesTotal"] * 100, 0)
+    ticket_percentiles = group_percentiles(
+        frame[by].cat.codes.to_numpy(), frame["salesTotal"].to_numpy(), len(keys), percentiles
+    )
+    rows = [
+        {
+            by: key,
+            "count": int(sums["count"][index]),
+            "amount": float(sums["amount"][index]),
+            "salesTotal": float(sums["salesTotal"][index]),
+            "supplierValue": float(sums["supplierValue"][index]),
+            "commissionValue": float(sums["commissionValue"][index]),
+            "profit": float(profit[index]),
+            "margin": float(margin[index]),
+            "averageTicket": float(sums["salesTotal"][index] / sums["count"][index]),
+            "percentiles": {
+                f"p{percentile:g}": float(ticket_percentiles[index, column])
+                for column, percentile in enumerate(percentiles)
+            }
+        }
+        for index, key in enumerate(keys)
+        if sums["count"][index]
+    ]
+    return sorted(rows, key=lambda row: row["salesTotal"], reverse=True)
@@ -0,0 +1,171 @@
+from pydantic import BaseModel
+from typing import AsyncIterator, Type, Union, get_args, get_origin
+from datetime import datetime
+import asyncio
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Parquet/Arrow ledger export: a typed Arrow schema derived from the
+# TransactionCreate fields (plus the fields the server stores itself), filled
+# from the Motor cursor in record batches. Each batch is written as a row
+# group to a sink that is drained after every write, so the response streams
+# and memory is bounded by one batch.
+ARROW_BATCH_ROWS = 10000
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+SUPPLIER_STRUCT = pa.struct([
+    ("name", pa.string()),
+    ("value", pa.float64()),
+    ("paymentDate", pa.string()),
+    ("paymentStatus", pa.string()),
+    ("usedMiles", pa.bool_()),
+    ("milesQuantity", pa.float64()),
+    ("milesValue", pa.float64()),
+    ("milesProgram", pa.string()),
+    ("emissionTaxes", pa.float64())
+])
+PASSENGER_STRUCT = pa.struct([
+    ("id", pa.string()),
+    ("name", pa.string()),
+    ("document", pa.string()),
+    ("birthDate", pa.string()),
+    ("type", pa.string()),
+    ("nationality", pa.string()),
+    ("passportNumber", pa.string()),
+    ("passportExpiry", pa.string()),
+    ("specialNeeds", pa.string()),
+    ("status", pa.string())
+])
+# Untyped list fields of the model with a known element shape
+LIST_FIELD_TYPES = {
+    "suppliers": pa.list_(SUPPLIER_STRUCT),
+    "passengers": pa.list_(PASSENGER_STRUCT),
+    "products": pa.list_(pa.string())
+}
+SCALAR_TYPES = {str: pa.string(), float: pa.float64(), int: pa.int64(), bool: pa.bool_()}
+# Fields written by the server on top of the TransactionCreate payload
+SERVER_FIELDS = [
+    ("id", pa.string()),
+    ("date", pa.string()),
+    ("time", pa.string()),
+    ("status", pa.string()),
+    ("effectiveDate", pa.timestamp("ms")),
+    ("entryDate", pa.string()),
+    ("autoGenerated", pa.bool_()),
+    ("originalTransactionId", pa.string()),
+    ("createdAt", pa.timestamp("ms")),
+    ("updatedAt", pa.timestamp("ms"))
+]
+
+
+def field_arrow_type(name: str, annotation) -> pa.DataType:
+    """Tipo Arrow de um campo do modelo (Optional[X] -> X anulável)"""
+    if name in LIST_FIELD_TYPES:
+        return LIST_FIELD_TYPES[name]
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    return SCALAR_TYPES.get(annotation, pa.string())
+
+
+def transaction_arrow_schema(model: Type[BaseModel]) -> pa.Schema:
+    """Schema Arrow das transações a partir dos campos do modelo"""
+    fields = list(SERVER_FIELDS)
+    names = {name for name, _ in fields}
+    for name, field in model.model_fields.items():
+        if name not in names:
+            fields.append((name, field_arrow_type(name, field.annotation)))
+    return pa.schema(fields)
+
+
+def coerce(value, arrow_type: pa.DataType):
+    """Converter um valor do Mongo para o tipo Arrow (None se ausente ou inválido)"""
+    if value is None or value == "":
+        return None
+    try:
+        if pa.types.is_string(arrow_type):
+            if isinstance(value, (dict, list)):
+                return json.dumps(value, default=str, ensure_ascii=False)
+            return str(value)
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+        if pa.types.is_integer(arrow_type):
+            return int(float(value))
+        if pa.types.is_boolean(arrow_type):
+            return value.lower() in ("true", "1", "sim") if isinstance(value, str) else bool(value)
+        if pa.types.is_timestamp(arrow_type):
+            return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        if pa.types.is_list(arrow_type):
+            if not isinstance(value, list):
+                return None
+            return [coerce(item, arrow_type.value_type) for item in value]
+        if pa.types.is_struct(arrow_type):
+            if not isinstance(value, dict):
+                return None
+            return {child.name: coerce(value.get(child.name), child.type) for child in arrow_type}
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+class DrainableSink:
+    """Destino de escrita sequencial cujo conteúdo é retirado em blocos"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def record_batch(rows: list, schema: pa.Schema) -> pa.RecordBatch:
+    """RecordBatch tipado a partir de documentos do Mongo"""
+    columns = {field.name: [] for field in schema}
+    for row in rows:
+        for field in schema:
+            columns[field.name].append(coerce(row.get(field.name), field.type))
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_rows(writer: pq.ParquetWriter, rows: list, schema: pa.Schema):
+    writer.write_batch(record_batch(rows, schema))
+
+
+async def iter_parquet(cursor, schema: pa.Schema, batch_rows: int = ARROW_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """Gerar o arquivo Parquet em blocos (um row group por lote do cursor)"""
+    sink = DrainableSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    rows = []
+    try:
+        async for transaction in cursor:
+            transaction["id"] = str(transaction.pop("_id", transaction.get("id")))
+            rows.append(transaction)
+            if len(rows) >= batch_rows:
+                # Building and compressing the row group is CPU work; keep it off the loop
+                await asyncio.to_thread(write_rows, writer, rows, schema)
+                rows = []
+                yield sink.drain()
+        if rows:
+            await asyncio.to_thread(write_rows, writer, rows, schema)
+    finally:
+        writer.close()
+    yield sink.drain()
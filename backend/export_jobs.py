@@ -0,0 +1,241 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import Awaitable, Callable, Dict, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Background export jobs: POST /api/exports queues a document in `jobs`, a pool
+# of worker tasks inside the app claims queued jobs atomically (so several app
+# processes can share the queue), runs the format's runner and writes the
+# artifact to EXPORT_DIR. Job documents expire through a TTL index on
+# expiresAt; artifact files older than the TTL are swept from disk.
+# A claim takes a lease (a random token on the job) that a heartbeat keeps
+# fresh while the runner works, so only a worker that really died loses the
+# job to a reclaim; progress and the final result are written only while the
+# worker still holds the lease.
+JOBS_COLLECTION = "jobs"
+EXPORT_DIR = Path(os.environ.get("EXPORT_DIR", Path(tempfile.gettempdir()) / "cash_control_exports"))
+EXPORT_ARTIFACT_TTL = timedelta(hours=int(os.environ.get("EXPORT_ARTIFACT_TTL_HOURS", "24")))
+EXPORT_JOB_WORKERS = int(os.environ.get("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_POLL_SECONDS = 5
+EXPORT_JOB_STALE_AFTER = timedelta(minutes=10)
+EXPORT_JOB_HEARTBEAT_SECONDS = 60
+EXPORT_PROGRESS_EVERY = 1000
+
+# Runner: (job, artifact path, progress callback) -> artifact info (filename,
+# mediaType and an optional "result" summary stored on the job). A runner that
+# can resume passes a checkpoint with its progress; it is stored on the job
+# and handed back (job["checkpoint"]) when a reclaimed job runs again.
+ProgressCallback = Callable[..., Awaitable[None]]
+ExportRunner = Callable[[dict, str, ProgressCallback], Awaitable[None]]
+
+
+def job_response(job: dict) -> dict:
+    """Representação pública de um job de exportação"""
+    progress = job.get("progress") or {}
+    processed, total = progress.get("processed", 0), progress.get("total")
+    response = {
+        "id": str(job["_id"]),
+        "kind": job.get("kind", "export"),
+        "format": job["format"],
+        "status": job["status"],
+        "params": job.get("params") or {},
+        "progress": {
+            "processed": processed,
+            "total": total,
+            "percent": round(processed / total * 100, 1) if total else (100.0 if job["status"] == "done" else 0.0)
+        },
+        "createdAt": job["createdAt"].isoformat(),
+        "startedAt": job["startedAt"].isoformat() if job.get("startedAt") else None,
+        "finishedAt": job["finishedAt"].isoformat() if job.get("finishedAt") else None,
+        "expiresAt": job["expiresAt"].isoformat() if job.get("expiresAt") else None,
+        "error": job.get("error")
+    }
+    if job.get("result") is not None:
+        response["result"] = job["result"]
+    if job["status"] == "done":
+        response["downloadUrl"] = f"/api/exports/{response['id']}/download"
+        response["filename"] = job["artifact"]["filename"]
+        response["size"] = job["artifact"]["size"]
+    return response
+
+
+async def create_job(
+    db: AsyncIOMotorDatabase,
+    export_format: str,
+    params: dict,
+    created_by: Optional[str],
+    source: Optional[dict] = None,
+    kind: str = "export"
+) -> dict:
+    """Enfileirar um job (kind "import": source é o arquivo de entrada)"""
+    now = datetime.utcnow()
+    job = {
+        "kind": kind,
+        "format": export_format,
+        "params": params,
+        "status": "queued",
+        "progress": {"processed": 0, "total": None},
+        "createdBy": created_by,
+        "createdAt": now,
+        "updatedAt": now,
+        "expiresAt": now + EXPORT_ARTIFACT_TTL
+    }
+    if source is not None:
+        job["source"] = source
+    result = await db[JOBS_COLLECTION].insert_one(job)
+    job["_id"] = result.inserted_id
+    return job
+
+
+class ExportWorkerPool:
+    def __init__(self, workers: int = EXPORT_JOB_WORKERS, poll_seconds: float = EXPORT_JOB_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.runners: Dict[str, ExportRunner] = {}
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._last_sweep = 0.0
+
+    def start(self, db: AsyncIOMotorDatabase, runners: Dict[str, ExportRunner]):
+        """Iniciar os workers (startup da aplicação)"""
+        self.db = db
+        self.runners = runners
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"✅ Export worker pool started ({self.workers} workers, artifacts in {EXPORT_DIR})")
+
+    async def stop(self):
+        """Parar os workers; jobs em andamento voltam para a fila ao ficarem obsoletos"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Acordar os workers após enfileirar um job"""
+        self._wakeup.set()
+
+    async def claim(self) -> Optional[dict]:
+        """Reservar atomicamente o job mais antigo da fila (ou um 'running' abandonado)"""
+        now = datetime.utcnow()
+        return await self.db[JOBS_COLLECTION].find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "updatedAt": {"$lt": now - EXPORT_JOB_STALE_AFTER}}
+            ]},
+            {"$set": {"status": "running", "startedAt": now, "updatedAt": now, "lease": uuid.uuid4().hex}, "$inc": {"attempts": 1}},
+            sort=[("status", 1), ("createdAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                self.sweep_artifacts()
+                job = await self.claim()
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Export worker {index} error: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def run(self, job: dict):
+        """Executar um job e registrar o artefato (ou o erro) enquanto o lease for deste worker"""
+        jobs = self.db[JOBS_COLLECTION]
+        runner = self.runners.get(job["format"])
+        leased = {"_id": job["_id"], "lease": job.get("lease")}
+        # One file per attempt: a worker that lost its lease never touches the new owner's artifact
+        path = EXPORT_DIR / f"{job['_id']}_{job.get('attempts', 1)}.{job['format']}"
+
+        async def progress(processed: int, total: Optional[int] = None, checkpoint: Optional[dict] = None):
+            update = {"progress.processed": processed, "updatedAt": datetime.utcnow()}
+            if total is not None:
+                update["progress.total"] = total
+            if checkpoint is not None:
+                update["checkpoint"] = checkpoint
+            await jobs.update_one(leased, {"$set": update})
+
+        async def heartbeat():
+            # Long steps (a PDF render) report no progress; keep the lease fresh meanwhile
+            while True:
+                await asyncio.sleep(EXPORT_JOB_HEARTBEAT_SECONDS)
+                result = await jobs.update_one(leased, {"$set": {"updatedAt": datetime.utcnow()}})
+                if result.matched_count == 0:
+                    logger.warning(f"⚠️ Export job {job['_id']} lease lost; its result will be discarded")
+                    return
+
+        beating = asyncio.create_task(heartbeat())
+        try:
+            if runner is None:
+                raise ValueError(f"Formato não suportado: {job['format']}")
+            artifact = await runner(job, str(path), progress)
+            finished = datetime.utcnow()
+            result = await jobs.update_one(leased, {"$set": {
+                "status": "done",
+                "result": artifact.pop("result", None),
+                "artifact": {**artifact, "path": str(path), "size": path.stat().st_size},
+                "finishedAt": finished,
+                "updatedAt": finished,
+                "expiresAt": finished + EXPORT_ARTIFACT_TTL
+            }})
+            if result.matched_count == 0:
+                path.unlink(missing_ok=True)
+                logger.warning(f"⚠️ Export job {job['_id']} was reclaimed by another worker; result discarded")
+                return
+            logger.info(f"✅ Export job {job['_id']} ({job['format']}) finished")
+        except Exception as e:
+            path.unlink(missing_ok=True)
+            finished = datetime.utcnow()
+            await jobs.update_one(leased, {"$set": {
+                "status": "failed",
+                "error": str(e),
+                "finishedAt": finished,
+                "updatedAt": finished
+            }})
+            logger.error(f"❌ Export job {job['_id']} failed: {e}")
+        finally:
+            beating.cancel()
+
+    def sweep_artifacts(self):
+        """Apagar do disco os artefatos mais antigos que o TTL (no máximo uma vez por minuto)"""
+        if time.monotonic() - self._last_sweep < 60:
+            return
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - EXPORT_ARTIFACT_TTL.total_seconds()
+        for artifact in EXPORT_DIR.glob("*"):
+            try:
+                if artifact.is_file() and artifact.stat().st_mtime < cutoff:
+                    artifact.unlink()
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove expired export {artifact}: {e}")
+
+
+async def counted(cursor, progress: ProgressCallback, total: Optional[int] = None):
+    """Repassar os documentos do cursor reportando o progresso a cada EXPORT_PROGRESS_EVERY"""
+    processed = 0
+    await progress(0, total)
+    async for document in cursor:
+        yield document
+        processed += 1
+        if processed % EXPORT_PROGRESS_EVERY == 0:
+            await progress(processed)
+    await progress(processed)
@@ -0,0 +1,178 @@
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from typing import AsyncIterator, List, Optional
+from datetime import date, datetime
+import asyncio
+import csv
+import io
+
+# Transaction exports: only the exported columns of the live transaction schema
+# are projected, and rows are written out while the Motor cursor iterates, so
+# an export of any size runs in constant memory.
+EXPORT_COLUMNS = [
+    ("transactionDate", "Data"),
+    ("time", "Hora"),
+    ("type", "Tipo"),
+    ("category", "Categoria"),
+    ("description", "Descrição"),
+    ("amount", "Valor"),
+    ("paymentMethod", "Forma Pagamento"),
+    ("client", "Cliente"),
+    ("supplier", "Fornecedor"),
+    ("seller", "Vendedor"),
+    ("saleValue", "Valor Venda"),
+    ("supplierValue", "Valor Fornecedor"),
+    ("commissionValue", "Comissão"),
+    ("status", "Status")
+]
+EXPORT_HEADERS = [header for _, header in EXPORT_COLUMNS]
+EXPORT_NUMERIC_FIELDS = {"amount", "saleValue", "supplierValue", "commissionValue"}
+EXPORT_PROJECTION = {
+    "_id": 0, "effectiveDate": 1, "date": 1,
+    **{field: 1 for field, _ in EXPORT_COLUMNS}
+}
+EXPORT_BATCH_SIZE = 1000
+CSV_FLUSH_ROWS = 500
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+
+def export_date(transaction: dict) -> Optional[date]:
+    """Data da transação: effectiveDate, senão transactionDate/date (YYYY-MM-DD)"""
+    effective_date = transaction.get("effectiveDate")
+    if isinstance(effective_date, datetime):
+        return effective_date.date()
+    for value in (transaction.get("transactionDate"), transaction.get("date")):
+        if isinstance(value, datetime):
+            return value.date()
+        if value:
+            try:
+                return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+            except ValueError:
+                continue
+    return None
+
+
+def export_row(transaction: dict) -> list:
+    """Valores tipados de uma linha exportada (date, float ou str; None se ausente)"""
+    row = []
+    for field, _ in EXPORT_COLUMNS:
+        if field == "transactionDate":
+            row.append(export_date(transaction))
+            continue
+        value = transaction.get(field)
+        if field in EXPORT_NUMERIC_FIELDS and value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = None
+        row.append(value)
+    return row
+
+
+def csv_value(value) -> str:
+    """Formatar um valor tipado para o CSV"""
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+async def iter_csv(cursor, headers: List[str] = EXPORT_HEADERS) -> AsyncIterator[bytes]:
+    """Escrever o CSV em blocos enquanto o cursor Motor produz documentos"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    rows = 0
+    async for transaction in cursor:
+        writer.writerow([csv_value(value) for value in export_row(transaction)])
+        rows += 1
+        if rows % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# XLSX export: openpyxl write-only workbook (rows are streamed to per-sheet
+# temp files instead of kept as a worksheet object model), one sheet per
+# transaction type plus a summary sheet filled in once the cursor is exhausted.
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_SHEET_TYPES = ["entrada_vendas", "entrada", "saida_vendas", "saida"]
+XLSX_OTHER_SHEET = "outros"
+XLSX_DATE_FORMAT = "DD/MM/YYYY"
+XLSX_MONEY_FORMAT = "#,##0.00"
+XLSX_SUMMARY_FIELDS = [("amount", "Valor"), ("saleValue", "Valor Venda"), ("supplierValue", "Valor Fornecedor"), ("commissionValue", "Comissão")]
+EXPORT_COLUMN_INDEX = {field: index for index, (field, _) in enumerate(EXPORT_COLUMNS)}
+
+
+def xlsx_cells(sheet, row: list) -> list:
+    """Células tipadas (data e moeda formatadas) de uma linha exportada"""
+    cells = []
+    for (field, _), value in zip(EXPORT_COLUMNS, row):
+        if value is not None and (field == "transactionDate" or field in EXPORT_NUMERIC_FIELDS):
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.number_format = XLSX_DATE_FORMAT if field == "transactionDate" else XLSX_MONEY_FORMAT
+            cells.append(cell)
+        else:
+            cells.append(value)
+    return cells
+
+
+async def write_xlsx(cursor, path: str) -> dict:
+    """Gravar o .xlsx em path lendo o cursor uma vez; devolve os totais por tipo"""
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet("Resumo")
+    sheets = {}
+    totals = {}
+
+    def sheet_for(transaction_type: str):
+        name = transaction_type if transaction_type in XLSX_SHEET_TYPES else XLSX_OTHER_SHEET
+        if name not in sheets:
+            sheets[name] = workbook.create_sheet(name)
+            sheets[name].append(EXPORT_HEADERS)
+        return sheets[name]
+
+    for transaction_type in XLSX_SHEET_TYPES:
+        sheet_for(transaction_type)
+
+    def append_rows(transactions: list):
+        for transaction in transactions:
+            row = export_row(transaction)
+            transaction_type = transaction.get("type")
+            sheet = sheet_for(transaction_type)
+            sheet.append(xlsx_cells(sheet, row))
+            type_totals = totals.setdefault(transaction_type or XLSX_OTHER_SHEET, {"count": 0, **{field: 0.0 for field, _ in XLSX_SUMMARY_FIELDS}})
+            type_totals["count"] += 1
+            for field, _ in XLSX_SUMMARY_FIELDS:
+                type_totals[field] += row[EXPORT_COLUMN_INDEX[field]] or 0
+
+    # Building and appending the cells is CPU work: rows go to a worker thread
+    # one batch at a time (awaited, so the workbook is never used concurrently)
+    batch = []
+    async for transaction in cursor:
+        batch.append(transaction)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            await asyncio.to_thread(append_rows, batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(append_rows, batch)
+
+    summary.append(["Tipo", "Quantidade", *[header for _, header in XLSX_SUMMARY_FIELDS]])
+    ordered_types = [t for t in XLSX_SHEET_TYPES if t in totals] + sorted(t for t in totals if t not in XLSX_SHEET_TYPES)
+    for transaction_type in ordered_types:
+        type_totals = totals[transaction_type]
+        summary.append([transaction_type, type_totals["count"], *[type_totals[field] for field, _ in XLSX_SUMMARY_FIELDS]])
+    entradas = sum(row["amount"] for transaction_type, row in totals.items() if transaction_type.startswith("entrada"))
+    saidas = sum(row["amount"] for transaction_type, row in totals.items() if transaction_type.startswith("saida"))
+    summary.append([])
+    summary.append(["Total de Entradas", None, entradas])
+    summary.append(["Total de Saídas", None, saidas])
+    summary.append(["Saldo", None, entradas - saidas])
+
+    # Saving zips the per-sheet temp files; keep it off the event loop
+    await asyncio.to_thread(workbook.save, path)
+    return totals
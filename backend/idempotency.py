@@ -0,0 +1,77 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+
+# Idempotency keys for transaction writes: the first request with a given
+# Idempotency-Key takes a short "pending" lease in `idempotency` (_id is the
+# endpoint scope, the caller and the key, so two users' keys never meet), runs
+# the write and stores the JSON response.
+# A replay is a single _id lookup that returns the stored response. Records
+# expire through a TTL index on expiresAt; an abandoned pending lease (crash
+# mid-write) expires after IDEMPOTENCY_LEASE and can be taken over.
+IDEMPOTENCY_COLLECTION = "idempotency"
+IDEMPOTENCY_TTL = timedelta(hours=int(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24")))
+IDEMPOTENCY_LEASE = timedelta(minutes=2)
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def record_id(scope: str, owner: str, key: str) -> str:
+    return f"{scope} {owner} {key}"
+
+
+def request_fingerprint(payload) -> str:
+    """SHA-256 do corpo da requisição (detecta reuso da chave com outro payload)"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def begin_request(db: AsyncIOMotorDatabase, scope: str, owner: str, key: str, fingerprint: str) -> Optional[dict]:
+    """Reservar a chave; None se a escrita deve ser executada, senão o registro existente"""
+    now = datetime.utcnow()
+    # Replays (the common case for a retried key) cost a single _id lookup
+    record = await db[IDEMPOTENCY_COLLECTION].find_one({"_id": record_id(scope, owner, key)})
+    if record is not None and record["expiresAt"] >= now:
+        return record
+    lease = {"status": "pending", "fingerprint": fingerprint, "createdAt": now, "expiresAt": now + IDEMPOTENCY_LEASE}
+    if record is None:
+        try:
+            await db[IDEMPOTENCY_COLLECTION].insert_one({"_id": record_id(scope, owner, key), "scope": scope, "owner": owner, "key": key, **lease})
+            return None
+        except DuplicateKeyError:
+            # Reserved by a concurrent request in between: replay (or wait on) its record
+            return await begin_request(db, scope, owner, key, fingerprint)
+    # Take over an abandoned lease (or a record the TTL monitor has not removed yet)
+    taken = await db[IDEMPOTENCY_COLLECTION].find_one_and_update(
+        {"_id": record_id(scope, owner, key), "expiresAt": {"$lt": now}},
+        {"$set": lease, "$unset": {"response": "", "statusCode": ""}},
+        return_document=ReturnDocument.AFTER
+    )
+    if taken is not None:
+        return None
+    # Taken over or removed by someone else in between: look again
+    return await begin_request(db, scope, owner, key, fingerprint)
+
+
+async def complete_request(db: AsyncIOMotorDatabase, scope: str, owner: str, key: str, response, status_code: int = 200):
+    """Guardar a resposta original da escrita para as repetições"""
+    now = datetime.utcnow()
+    await db[IDEMPOTENCY_COLLECTION].update_one(
+        {"_id": record_id(scope, owner, key)},
+        {"$set": {
+            "status": "completed",
+            "response": response,
+            "statusCode": status_code,
+            "completedAt": now,
+            "expiresAt": now + IDEMPOTENCY_TTL
+        }}
+    )
+
+
+async def release_request(db: AsyncIOMotorDatabase, scope: str, owner: str, key: str):
+    """Liberar a chave após uma escrita que falhou (o cliente pode tentar de novo)"""
+    await db[IDEMPOTENCY_COLLECTION].delete_one({"_id": record_id(scope, owner, key), "status": "pending"})
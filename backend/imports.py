@@ -0,0 +1,205 @@
+from pydantic import BaseModel
+from openpyxl import load_workbook
+from typing import Dict, Iterator, List, Optional, Type, Union, get_args, get_origin
+from datetime import date, datetime, time
+import csv
+import json
+import unicodedata
+
+from exports import EXPORT_COLUMNS
+
+# Transaction import: CSV or XLSX (openpyxl read-only mode) read row by row,
+# columns mapped to TransactionCreate fields by header. Rows are parsed in
+# batches of IMPORT_BATCH_ROWS so only one batch is in memory at a time;
+# validation and the bulk insert happen in the caller, batch by batch.
+IMPORT_FORMATS = {".csv": "csv", ".xlsx": "xlsx"}
+IMPORT_BATCH_ROWS = 1000
+IMPORT_REQUIRED_FIELDS = ["type", "description", "amount"]
+IMPORT_CSV_DELIMITERS = ",;\t"
+IMPORT_LIST_SEPARATOR = ";"
+IMPORT_TRUE_VALUES = {"true", "1", "sim", "s", "yes", "x"}
+# Header aliases (normalized) on top of the model field names; the export
+# headers are included so an exported file can be imported back
+IMPORT_HEADER_ALIASES = {
+    **{header: field for field, header in EXPORT_COLUMNS},
+    "data": "transactionDate",
+    "data da transacao": "transactionDate",
+    "valor venda": "saleValue",
+    "valor fornecedor": "supplierValue",
+    "comissao": "commissionValue",
+    "forma de pagamento": "paymentMethod",
+    "observacoes": "additionalInfo"
+}
+
+
+def normalize_header(header) -> str:
+    """Cabeçalho sem acentos, minúsculo e sem espaços extras"""
+    text = unicodedata.normalize("NFKD", str(header or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().replace("_", " ").split())
+
+
+def map_headers(headers: list, model: Type[BaseModel]) -> List[Optional[str]]:
+    """Campo do modelo de cada coluna (None para colunas ignoradas)"""
+    fields = {normalize_header(name): name for name in model.model_fields}
+    aliases = {normalize_header(header): field for header, field in IMPORT_HEADER_ALIASES.items()}
+    columns = []
+    for header in headers:
+        key = normalize_header(header)
+        field = fields.get(key) or fields.get(key.replace(" ", "")) or aliases.get(key)
+        columns.append(field if field in model.model_fields and field not in columns else None)
+    return columns
+
+
+def missing_required(columns: List[Optional[str]]) -> List[str]:
+    return [field for field in IMPORT_REQUIRED_FIELDS if field not in columns]
+
+
+def field_kind(model: Type[BaseModel], field: str):
+    """Tipo base do campo (Optional[X] -> X)"""
+    annotation = model.model_fields[field].annotation
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    return annotation
+
+
+def parse_decimal(value) -> float:
+    """Número em formato brasileiro (1.234,56 / R$ 10,5) ou decimal com ponto"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace("R$", "").replace(" ", "").strip()
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    return float(text)
+
+
+def parse_date(value) -> str:
+    """Data YYYY-MM-DD a partir de célula de data, DD/MM/YYYY ou YYYY-MM-DD"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    for date_format in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(text[:10], date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {text}")
+
+
+def convert_cell(model: Type[BaseModel], field: str, value):
+    """Converter o valor da célula para o tipo do campo (a validação final é do pydantic)"""
+    kind = field_kind(model, field)
+    if kind is float:
+        return parse_decimal(value)
+    if kind is int:
+        return int(parse_decimal(value))
+    if kind is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in IMPORT_TRUE_VALUES
+    if kind is list:
+        if isinstance(value, str) and value.strip().startswith("["):
+            return json.loads(value)
+        return [item.strip() for item in str(value).split(IMPORT_LIST_SEPARATOR) if item.strip()]
+    if field.endswith("Date"):
+        return parse_date(value)
+    if isinstance(value, time):
+        return value.strftime("%H:%M")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_payload(model: Type[BaseModel], columns: List[Optional[str]], values: list) -> Dict:
+    """Payload do modelo a partir de uma linha; erros de conversão por campo em '_errors'"""
+    payload, errors = {}, []
+    for field, value in zip(columns, values):
+        if field is None or value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        try:
+            payload[field] = convert_cell(model, field, value)
+        except (TypeError, ValueError) as e:
+            errors.append({"field": field, "message": str(e)})
+    if errors:
+        payload["_errors"] = errors
+    return payload
+
+
+def csv_dialect(path: str):
+    """Detectar o separador (vírgula, ponto e vírgula ou tab) pelo início do arquivo"""
+    with open(path, newline="", encoding="utf-8-sig") as source:
+        sample = source.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=IMPORT_CSV_DELIMITERS)
+    except csv.Error:
+        return csv.excel
+
+
+def iter_csv_rows(path: str) -> Iterator[tuple]:
+    """(planilha, número da linha, cabeçalho, valores) de cada linha do CSV, em fluxo"""
+    with open(path, newline="", encoding="utf-8-sig") as source:
+        reader = csv.reader(source, csv_dialect(path))
+        headers = next(reader, [])
+        for values in reader:
+            yield None, reader.line_num, headers, values
+
+
+def iter_xlsx_rows(path: str) -> Iterator[tuple]:
+    """(planilha, número da linha, cabeçalho, valores) de todas as planilhas, em modo read-only"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            headers = list(next(rows, None) or [])
+            for row_number, values in enumerate(rows, start=2):
+                yield sheet.title, row_number, headers, list(values)
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(path: str, import_format: str) -> Iterator[tuple]:
+    return iter_xlsx_rows(path) if import_format == "xlsx" else iter_csv_rows(path)
+
+
+def import_headers(path: str, import_format: str) -> Dict[Optional[str], list]:
+    """Cabeçalho de cada planilha (CSV: uma única, chave None)"""
+    if import_format == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as source:
+            return {None: next(csv.reader(source, csv_dialect(path)), [])}
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return {sheet.title: list(next(sheet.iter_rows(max_row=1, values_only=True), None) or []) for sheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def estimate_rows(path: str, import_format: str) -> Optional[int]:
+    """Total aproximado de linhas de dados (para o progresso)"""
+    if import_format == "csv":
+        lines = 0
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                lines += chunk.count(b"\n")
+        return max(lines - 1, 0)
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # max_row comes from the sheet's stored dimension; None if the writer omitted it
+        counts = [sheet.max_row for sheet in workbook.worksheets]
+        return None if None in counts else sum(max(count - 1, 0) for count in counts)
+    finally:
+        workbook.close()
+
+
+def next_batch(rows: Iterator, model: Type[BaseModel], batch_rows: int = IMPORT_BATCH_ROWS) -> list:
+    """Próximo lote de (planilha, linha, payload); planilhas sem as colunas obrigatórias são ignoradas"""
+    batch = []
+    columns_by_sheet = {}
+    for sheet, row_number, headers, values in rows:
+        if sheet not in columns_by_sheet:
+            columns_by_sheet[sheet] = map_headers(headers, model)
+        columns = columns_by_sheet[sheet]
+        if missing_required(columns) or not any(value not in (None, "") for value in values):
+            continue
+        batch.append((sheet, row_number, row_payload(model, columns, values)))
+        if len(batch) >= batch_rows:
+            break
+    return batch
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import logging
+import multiprocessing
+import os
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+# PDF reports: rendering with reportlab is CPU-bound, so it runs in a bounded
+# process pool instead of on the event loop. Only the compact, pre-aggregated
+# report payload (plain dicts/lists of numbers and strings) is pickled to the
+# worker; the worker writes the PDF to a temp file that the endpoint streams.
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+PDF_BREAKDOWN_ROWS = 20
+
+render_pool: Optional[ProcessPoolExecutor] = None
+render_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Pool de processos de renderização (spawn: sem herdar o estado do Motor/asyncio)"""
+    global render_pool, render_slots
+    if render_pool is None:
+        render_pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        render_slots = asyncio.Semaphore(PDF_RENDER_WORKERS)
+    return render_pool
+
+
+def shutdown_render_pool():
+    """Encerrar o pool de renderização (shutdown da aplicação)"""
+    global render_pool, render_slots
+    if render_pool is not None:
+        render_pool.shutdown(wait=False, cancel_futures=True)
+        render_pool = None
+        render_slots = None
+
+
+async def render_pdf(payload: dict, path: str):
+    """Renderizar o PDF em um processo do pool; no máximo PDF_RENDER_WORKERS ao mesmo tempo"""
+    pool = get_render_pool()
+    async with render_slots:
+        await asyncio.get_running_loop().run_in_executor(pool, render_report_pdf, payload, path)
+
+
+def format_money(value) -> str:
+    """Valor em reais (R$ 1.234,56)"""
+    formatted = f"{value or 0:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"R$ {formatted}"
+
+
+def format_percent(value) -> str:
+    return f"{value or 0:.1f}%".replace(".", ",")
+
+
+def render_report_pdf(payload: dict, path: str):
+    """Montar o PDF do relatório com reportlab (executa no processo do pool)"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f3b63")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f4f7")]),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#c8ccd2"))
+    ])
+
+    def table(rows, widths=None):
+        flowable = Table(rows, colWidths=widths, repeatRows=1)
+        flowable.setStyle(table_style)
+        return flowable
+
+    period = payload["period"]
+    summary = payload["summary"]
+    sales = payload["sales"]
+    story = [
+        Paragraph("Relatório de Controle de Caixa", styles["Title"]),
+        # Paragraph text is markup: user-supplied text is escaped ("A & B", "<")
+        Paragraph(escape(payload.get("company") or ""), styles["Heading3"]),
+        Paragraph(
+            f"Período: {escape(period.get('start_date') or 'Início')} até {escape(period.get('end_date') or 'Hoje')}"
+            f" &nbsp;·&nbsp; Gerado em {escape(str(payload['generatedAt']))}",
+            styles["Normal"]
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Resumo financeiro", styles["Heading2"]),
+        table([
+            ["", "Quantidade", "Valor"],
+            ["Entradas - vendas", summary["entradas_vendas_count"], format_money(summary["total_entradas_vendas"])],
+            ["Entradas - outras", summary["entradas_outras_count"], format_money(summary["total_entradas_outras"])],
+            ["Saídas - vendas", summary["saidas_vendas_count"], format_money(summary["total_saidas_vendas"])],
+            ["Saídas - outras", summary["saidas_outras_count"], format_money(summary["total_saidas_outras"])],
+            ["Total de entradas", "", format_money(summary["total_entradas"])],
+            ["Total de saídas", "", format_money(summary["total_saidas"])],
+            ["Saldo", "", format_money(summary["balance"])]
+        ], [8 * cm, 3 * cm, 5 * cm]),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Vendas", styles["Heading2"]),
+        table([
+            ["Indicador", "Valor"],
+            ["Total de vendas", format_money(sales["total_sales"])],
+            ["Custos com fornecedores", format_money(sales["total_supplier_costs"])],
+            ["Comissões", format_money(sales["total_commissions"])],
+            ["Lucro líquido", format_money(sales["net_profit"])],
+            ["Quantidade de vendas", sales["sales_count"]],
+            ["Ticket médio", format_money(sales["average_sale"])]
+        ], [8 * cm, 8 * cm])
+    ]
+
+    for title, key, rows in (
+        ("Vendas por vendedor", "seller", payload.get("sellers", [])),
+        ("Vendas por categoria", "category", payload.get("categories", []))
+    ):
+        if not rows:
+            continue
+        story += [
+            Spacer(1, 0.5 * cm),
+            Paragraph(escape(title), styles["Heading2"]),
+            table(
+                [["", "Qtd.", "Vendas", "Lucro", "Margem", "Ticket mediano"]] + [
+                    [
+                        str(row[key])[:40], row["count"], format_money(row["salesTotal"]),
+                        format_money(row["profit"]), format_percent(row["margin"]),
+                        format_money(row["percentiles"].get("p50"))
+                    ]
+                    for row in rows
+                ],
+                [5.5 * cm, 1.5 * cm, 3 * cm, 3 * cm, 2 * cm, 3 * cm]
+            )
+        ]
+
+    SimpleDocTemplate(
+        path, pagesize=A4, title="Relatório de Controle de Caixa",
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm
+    ).build(story)
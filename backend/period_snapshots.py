@@ -0,0 +1,187 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Iterable, List, Optional
+from datetime import datetime
+import hashlib
+import json
+import logging
+
+from report_engine import period_totals, sales_analysis_from_totals, complete_analysis_from_totals, sales_performance_from_totals
+from rollups import ROLLUP_SUM_FIELDS, empty_totals, get_rollup_totals
+
+logger = logging.getLogger(__name__)
+
+# Closed-period snapshots: closing a month freezes its report output and a
+# content hash in period_snapshots (_id "YYYY-MM"). Reports read the frozen
+# totals for closed months and aggregate live (transactions or rollups) only
+# the open ranges. A write into a closed month is rejected, or in "flag" mode
+# marks the snapshot dirty once the write has committed, so reports fall back
+# to live data for that month until it is closed again.
+SNAPSHOT_COLLECTION = "period_snapshots"
+SNAPSHOT_HASH_FIELDS = ["_id", "type", "amount", "saleValue", "supplierValue", "commissionValue", "effectiveDate", "updatedAt"]
+
+
+def month_key(day: datetime) -> str:
+    """Chave do mês (YYYY-MM) de uma data"""
+    return day.strftime("%Y-%m")
+
+
+def month_range(month: str) -> tuple:
+    """Início e fim (exclusivo) de um mês YYYY-MM; ValueError se inválido"""
+    start = datetime.strptime(month, "%Y-%m")
+    end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+    return start, end
+
+
+def canonical_json(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+async def period_content_hash(db: AsyncIOMotorDatabase, start: datetime, end: datetime) -> str:
+    """SHA-256 das transações do período (ordenadas por _id, campos dos relatórios)"""
+    digest = hashlib.sha256()
+    cursor = db.transactions.find(
+        {"effectiveDate": {"$gte": start, "$lt": end}},
+        {field: 1 for field in SNAPSHOT_HASH_FIELDS}
+    ).sort("_id", 1)
+    async for transaction in cursor:
+        digest.update(canonical_json(transaction).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+async def close_period(db: AsyncIOMotorDatabase, month: str, closed_by: Optional[str] = None) -> dict:
+    """Congelar o relatório de um mês em period_snapshots"""
+    start, end = month_range(month)
+    totals = await period_totals(db, {"effectiveDate": {"$gte": start, "$lt": end}})
+    # BSON keys must be strings: rows without a type never reach the reports
+    totals = {transaction_type: row for transaction_type, row in totals.items() if isinstance(transaction_type, str)}
+    snapshot = {
+        "_id": month,
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "reports": {
+            "sales-analysis": sales_analysis_from_totals(totals),
+            "complete-analysis": complete_analysis_from_totals(totals),
+            "sales-performance": sales_performance_from_totals(totals)
+        },
+        "transactionCount": sum(row["count"] for row in totals.values()),
+        "contentHash": await period_content_hash(db, start, end),
+        "dirty": False,
+        "lateWrites": 0,
+        "closedAt": datetime.utcnow(),
+        "closedBy": closed_by
+    }
+    await db[SNAPSHOT_COLLECTION].replace_one({"_id": month}, snapshot, upsert=True)
+    logger.info(f"✅ Period {month} closed ({snapshot['transactionCount']} transactions)")
+    return snapshot
+
+
+async def reopen_period(db: AsyncIOMotorDatabase, month: str) -> bool:
+    """Reabrir um mês (remove o snapshot)"""
+    result = await db[SNAPSHOT_COLLECTION].delete_one({"_id": month})
+    return result.deleted_count > 0
+
+
+async def verify_period(db: AsyncIOMotorDatabase, month: str) -> Optional[dict]:
+    """Comparar o hash congelado com o conteúdo atual do mês"""
+    snapshot = await db[SNAPSHOT_COLLECTION].find_one({"_id": month}, {"contentHash": 1, "start": 1, "end": 1, "dirty": 1})
+    if snapshot is None:
+        return None
+    current_hash = await period_content_hash(db, snapshot["start"], snapshot["end"])
+    return {
+        "month": month,
+        "contentHash": snapshot["contentHash"],
+        "currentHash": current_hash,
+        "matches": current_hash == snapshot["contentHash"],
+        "dirty": snapshot.get("dirty", False)
+    }
+
+
+async def find_closed_periods(db: AsyncIOMotorDatabase, effective_dates: Iterable[Optional[datetime]]) -> List[str]:
+    """Meses fechados atingidos por uma escrita nas datas informadas"""
+    months = sorted({month_key(day) for day in effective_dates if isinstance(day, datetime)})
+    if not months:
+        return []
+    closed = await db[SNAPSHOT_COLLECTION].find({"_id": {"$in": months}}, {"_id": 1}).to_list(None)
+    return [snapshot["_id"] for snapshot in closed]
+
+
+async def flag_periods(db: AsyncIOMotorDatabase, months: List[str]):
+    """Marcar snapshots como desatualizados após escrita tardia"""
+    if not months:
+        return
+    await db[SNAPSHOT_COLLECTION].update_many(
+        {"_id": {"$in": months}},
+        {"$set": {"dirty": True, "lastLateWriteAt": datetime.utcnow()}, "$inc": {"lateWrites": 1}}
+    )
+    logger.warning(f"⚠️ Late write into closed period(s) {', '.join(months)}; snapshot flagged")
+
+
+def add_totals(target: dict, totals: dict):
+    """Somar totais por tipo em target"""
+    for transaction_type, row in totals.items():
+        accumulated = target.setdefault(transaction_type, empty_totals())
+        for field in ROLLUP_SUM_FIELDS:
+            accumulated[field] += row.get(field, 0)
+
+
+def snapshot_filter(day_range: Optional[dict] = None) -> dict:
+    """Filtro dos snapshots válidos inteiramente contidos no intervalo"""
+    filters = {"dirty": {"$ne": True}}
+    if day_range and day_range.get("$gte") is not None:
+        filters["start"] = {"$gte": day_range["$gte"]}
+    if day_range and day_range.get("$lt") is not None:
+        filters["end"] = {"$lte": day_range["$lt"]}
+    return filters
+
+
+async def has_snapshots(db: AsyncIOMotorDatabase, day_range: Optional[dict] = None) -> bool:
+    """Se algum mês fechado (snapshot válido) cai no intervalo"""
+    return await db[SNAPSHOT_COLLECTION].count_documents(snapshot_filter(day_range), limit=1) > 0
+
+
+async def live_totals(db: AsyncIOMotorDatabase, day_ranges: List[Optional[dict]], use_rollups: bool = False) -> dict:
+    """Totais por tipo agregados ao vivo (transações ou rollups) sobre os intervalos (None: tudo)"""
+    if use_rollups:
+        totals = {}
+        for day_range in day_ranges:
+            add_totals(totals, await get_rollup_totals(db, day_range))
+        return totals
+    if None in day_ranges:
+        return await period_totals(db, {})
+    return await period_totals(db, {"$or": [{"effectiveDate": day_range} for day_range in day_ranges]})
+
+
+async def combined_period_totals(db: AsyncIOMotorDatabase, day_range: Optional[dict] = None, use_rollups: bool = False) -> tuple:
+    """Totais por tipo: snapshots dos meses fechados + agregação ao vivo (transações ou rollups) dos intervalos abertos"""
+    range_start = day_range.get("$gte") if day_range else None
+    range_end = day_range.get("$lt") if day_range else None
+    snapshots = await db[SNAPSHOT_COLLECTION].find(
+        snapshot_filter(day_range), {"totals": 1, "start": 1, "end": 1}
+    ).sort("start", 1).to_list(None)
+
+    if not snapshots:
+        return await live_totals(db, [day_range], use_rollups), []
+
+    # Open ranges: the gaps around and between the closed months
+    open_ranges = []
+    cursor = range_start
+    for snapshot in snapshots:
+        if cursor is None or cursor < snapshot["start"]:
+            gap = {"$lt": snapshot["start"]}
+            if cursor is not None:
+                gap["$gte"] = cursor
+            open_ranges.append(gap)
+        cursor = snapshot["end"]
+    if range_end is None:
+        open_ranges.append({"$gte": cursor})
+    elif cursor < range_end:
+        open_ranges.append({"$gte": cursor, "$lt": range_end})
+
+    totals = {}
+    for snapshot in snapshots:
+        add_totals(totals, snapshot["totals"])
+    if open_ranges:
+        add_totals(totals, await live_totals(db, open_ranges, use_rollups))
+    return totals, [snapshot["_id"] for snapshot in snapshots]
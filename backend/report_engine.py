@@ -0,0 +1,163 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional, Callable, List
+import asyncio
+import logging
+
+from analytics import ColumnBatches, type_totals
+from rollups import empty_totals, ROLLUP_COLLECTION, ROLLUP_SUM_FIELDS, ROLLUP_SUM_EXPRESSIONS
+
+logger = logging.getLogger(__name__)
+
+# Shared report engine: one scan of a period accumulates the per-type totals
+# and transaction buckets that /reports/sales-analysis, complete-analysis and
+# sales-performance all need. While the buckets are filled, the numeric and key
+# columns of each cursor batch go into the columnar analytics engine, whose
+# totals have the same semantics as the daily rollups (so source=rollups and a
+# live scan always agree).
+REPORT_TYPES = ["entrada_vendas", "entrada", "saida_vendas", "saida"]
+SCAN_BATCH_SIZE = 1000
+
+
+class PeriodReport:
+    def __init__(self):
+        self.totals = {}
+        self.buckets = {transaction_type: [] for transaction_type in REPORT_TYPES}
+        self.transactions = []
+
+    def add(self, transaction: dict):
+        """Guardar uma transação no bucket do seu tipo"""
+        transaction_type = transaction.get("type")
+        if transaction_type in self.buckets:
+            self.buckets[transaction_type].append(transaction)
+        self.transactions.append(transaction)
+
+
+async def scan_period(
+    db: AsyncIOMotorDatabase,
+    period_filter: dict,
+    projection: Optional[dict] = None,
+    serialize: Optional[Callable[[dict], dict]] = None
+) -> PeriodReport:
+    """Percorrer as transações do período uma única vez e acumular o relatório"""
+    report = PeriodReport()
+    columns = ColumnBatches()
+    cursor = db.transactions.find(period_filter, projection).batch_size(SCAN_BATCH_SIZE)
+    while batch := await cursor.to_list(SCAN_BATCH_SIZE):
+        # Columns first: serialize() rewrites the documents for the response
+        columns.add(batch)
+        for transaction in batch:
+            report.add(serialize(transaction) if serialize else transaction)
+    report.totals = await asyncio.to_thread(lambda: type_totals(columns.frame()))
+    return report
+
+
+async def period_totals(db: AsyncIOMotorDatabase, period_filter: dict) -> dict:
+    """Totais por tipo do período calculados no servidor (sem trafegar documentos)"""
+    pipeline = []
+    if period_filter:
+        pipeline.append({"$match": period_filter})
+    pipeline.append({"$group": {"_id": "$type", **ROLLUP_SUM_EXPRESSIONS}})
+    rows = await db.transactions.aggregate(pipeline).to_list(None)
+    return {row.pop("_id"): row for row in rows}
+
+
+# Time series: per-period totals of each report type, bucketed with $dateTrunc
+TIMESERIES_GRANULARITIES = ["day", "week", "month"]
+TIMESERIES_METRICS = ROLLUP_SUM_FIELDS
+
+
+async def period_timeseries(
+    db: AsyncIOMotorDatabase,
+    granularity: str,
+    metric: str,
+    day_range: Optional[dict] = None,
+    use_rollups: bool = False
+) -> List[dict]:
+    """Série temporal por tipo (dia/semana/mês) a partir das transações ou dos rollups"""
+    if use_rollups:
+        collection, date_field = db[ROLLUP_COLLECTION], "day"
+        value = {"$sum": f"${metric}"}
+    else:
+        collection, date_field = db.transactions, "effectiveDate"
+        value = ROLLUP_SUM_EXPRESSIONS[metric]
+    
+    truncate = {"date": f"${date_field}", "unit": granularity}
+    if granularity == "week":
+        truncate["startOfWeek"] = "monday"
+    
+    pipeline = [
+        {"$match": {date_field: day_range if day_range else {"$type": "date"}}},
+        {"$group": {"_id": {"period": {"$dateTrunc": truncate}, "type": "$type"}, "value": value}},
+        {"$sort": {"_id.period": 1}}
+    ]
+    rows = {}
+    async for row in collection.aggregate(pipeline):
+        period = row["_id"]["period"]
+        point = rows.setdefault(period, {"period": period.strftime("%Y-%m-%d"), **{t: 0 for t in REPORT_TYPES}})
+        if row["_id"]["type"] in REPORT_TYPES:
+            point[row["_id"]["type"]] = row["value"]
+    return list(rows.values())
+
+
+def sales_analysis_from_totals(totals: dict) -> dict:
+    """Métricas de /reports/sales-analysis a partir dos totais por tipo"""
+    entrada_vendas = totals.get("entrada_vendas", empty_totals())
+    saida_vendas = totals.get("saida_vendas", empty_totals())
+    total_sales = entrada_vendas["salesTotal"]
+    total_supplier_costs = entrada_vendas["supplierValue"] + saida_vendas["amount"]
+    total_commissions = entrada_vendas["commissionValue"]
+    sales_count = entrada_vendas["count"]
+    return {
+        "total_sales": total_sales,
+        "total_supplier_costs": total_supplier_costs,
+        "total_commissions": total_commissions,
+        "net_profit": total_sales - total_supplier_costs - total_commissions,
+        "sales_count": sales_count,
+        "average_sale": total_sales / sales_count if sales_count > 0 else 0
+    }
+
+
+def complete_analysis_from_totals(totals: dict) -> dict:
+    """Métricas de /reports/complete-analysis a partir dos totais por tipo"""
+    entradas_vendas = totals.get("entrada_vendas", empty_totals())
+    entradas_outras = totals.get("entrada", empty_totals())
+    saidas_vendas = totals.get("saida_vendas", empty_totals())
+    saidas_outras = totals.get("saida", empty_totals())
+    total_entradas = entradas_vendas["amount"] + entradas_outras["amount"]
+    total_saidas = saidas_vendas["amount"] + saidas_outras["amount"]
+    return {
+        "total_entradas": total_entradas,
+        "total_entradas_vendas": entradas_vendas["amount"],
+        "total_entradas_outras": entradas_outras["amount"],
+        "total_saidas": total_saidas,
+        "total_saidas_vendas": saidas_vendas["amount"],
+        "total_saidas_outras": saidas_outras["amount"],
+        "balance": total_entradas - total_saidas,
+        "entradas_vendas_count": entradas_vendas["count"],
+        "entradas_outras_count": entradas_outras["count"],
+        "saidas_vendas_count": saidas_vendas["count"],
+        "saidas_outras_count": saidas_outras["count"]
+    }
+
+
+def sales_performance_from_totals(totals: dict) -> dict:
+    """Métricas de /reports/sales-performance a partir dos totais por tipo"""
+    entrada_vendas = totals.get("entrada_vendas", empty_totals())
+    saida_vendas = totals.get("saida_vendas", empty_totals())
+    total_sales = entrada_vendas["amount"]
+    total_quantity = entrada_vendas["count"]
+    total_supplier_payments = entrada_vendas["supplierValue"] + saida_vendas["amount"]
+    total_commissions = entrada_vendas["commissionValue"]
+    net_sales_profit = total_sales - total_commissions - total_supplier_payments
+    average_ticket = total_sales / total_quantity if total_quantity > 0 else 0
+    return {
+        "total_sales": total_sales,
+        "total_quantity": total_quantity,
+        "sales_count": total_quantity,
+        "total_commissions": total_commissions,
+        "total_supplier_payments": total_supplier_payments,
+        "net_sales_profit": net_sales_profit,
+        "average_ticket": average_ticket,
+        "average_sale": average_ticket,
+        "sales_margin": (net_sales_profit / total_sales * 100) if total_sales > 0 else 0
+    }
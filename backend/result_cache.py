@@ -0,0 +1,94 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+# In-process result cache for summary/report endpoints. Entries are keyed by
+# endpoint, parameters and the generation counter of the collection they read;
+# write endpoints bump the counter (stored in Mongo so every worker sees it),
+# which makes all older entries unreachable. LRU + TTL bound the number of
+# entries; a weight budget (rows held by the cached results) bounds their size.
+GENERATIONS_COLLECTION = "cache_generations"
+
+
+def result_weight(value: Any) -> int:
+    """Peso de um resultado: 1 + linhas das listas contidas (em dicts aninhados)"""
+    if isinstance(value, dict):
+        return 1 + sum(result_weight(item) - 1 for item in value.values())
+    if isinstance(value, list):
+        return 1 + len(value)
+    return 1
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300, max_weight: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obter resultado em cache (None se ausente ou expirado)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, weight: Optional[int] = None):
+        """Guardar resultado, removendo os menos usados quando cheio (resultados maiores que o orçamento não são guardados)"""
+        weight = result_weight(value) if weight is None else weight
+        self._remove(key)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, weight)
+        self.weight += weight
+        while len(self._entries) > self.max_entries or (self.max_weight is not None and self.weight > self.max_weight):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.weight = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "weight": self.weight,
+            "maxWeight": self.max_weight,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0
+        }
+
+
+async def get_generation(db: AsyncIOMotorDatabase, collection: str) -> int:
+    """Contador de geração atual de uma coleção"""
+    doc = await db[GENERATIONS_COLLECTION].find_one({"_id": collection})
+    return doc["value"] if doc else 0
+
+
+async def bump_generation(db: AsyncIOMotorDatabase, collection: str):
+    """Invalidar os resultados em cache que dependem da coleção"""
+    await db[GENERATIONS_COLLECTION].update_one({"_id": collection}, {"$inc": {"value": 1}}, upsert=True)
@@ -0,0 +1,150 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from typing import Optional, List
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Daily rollups: one document per (day, type, category, seller, paymentMethod)
+# with the sums the dashboard and /reports endpoints need. Kept up to date with
+# $inc by the transaction write endpoints and rebuildable from scratch.
+ROLLUP_COLLECTION = "daily_rollups"
+ROLLUP_KEY_FIELDS = ["day", "type", "category", "seller", "paymentMethod"]
+ROLLUP_SUM_FIELDS = ["amount", "saleValue", "salesTotal", "supplierValue", "commissionValue", "count"]
+# $group accumulators matching rollup_increments(), for server-side aggregation
+ROLLUP_SUM_EXPRESSIONS = {
+    "amount": {"$sum": {"$ifNull": ["$amount", 0]}},
+    "saleValue": {"$sum": {"$ifNull": ["$saleValue", 0]}},
+    "salesTotal": {"$sum": {"$ifNull": ["$saleValue", {"$ifNull": ["$amount", 0]}]}},
+    "supplierValue": {"$sum": {"$ifNull": ["$supplierValue", 0]}},
+    "commissionValue": {"$sum": {"$ifNull": ["$commissionValue", 0]}},
+    "count": {"$sum": 1}
+}
+
+
+def empty_totals() -> dict:
+    """Totais zerados de um tipo de transação"""
+    return {field: 0 for field in ROLLUP_SUM_FIELDS}
+
+
+def rollup_day(transaction: dict) -> Optional[datetime]:
+    """Dia do rollup: effectiveDate, ou transactionDate/date quando ainda não preenchido"""
+    effective_date = transaction.get("effectiveDate")
+    if isinstance(effective_date, datetime):
+        return effective_date
+    for value in (effective_date, transaction.get("transactionDate"), transaction.get("date")):
+        if value:
+            try:
+                return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+            except ValueError:
+                continue
+    return None
+
+
+def parse_day_expression(field: str) -> dict:
+    """Expressão de agregação: data YYYY-MM-DD do campo, ou null se vazia/inválida"""
+    return {"$dateFromString": {
+        "dateString": {"$substrCP": [{"$toString": field}, 0, 10]},
+        "format": "%Y-%m-%d",
+        "onError": None,
+        "onNull": None
+    }}
+
+
+# rollup_day() as an aggregation expression, for rebuild_rollups()
+ROLLUP_DAY_EXPRESSION = {"$cond": [
+    {"$eq": [{"$type": "$effectiveDate"}, "date"]},
+    "$effectiveDate",
+    {"$ifNull": [
+        parse_day_expression("$effectiveDate"),
+        {"$ifNull": [parse_day_expression("$transactionDate"), parse_day_expression("$date")]}
+    ]}
+]}
+
+
+def rollup_key(transaction: dict) -> dict:
+    """Chave do rollup de uma transação (day None se não houver data válida)"""
+    # Undated rows keep a day=None row: they count in the all-time totals, as
+    # in the transactions scan, and fall outside every period range
+    return {
+        "day": rollup_day(transaction),
+        "type": transaction.get("type"),
+        "category": transaction.get("category"),
+        "seller": transaction.get("seller"),
+        "paymentMethod": transaction.get("paymentMethod")
+    }
+
+
+def rollup_increments(transaction: dict, sign: int = 1) -> dict:
+    """Valores a somar ($inc) no rollup; sign=-1 desfaz a contribuição"""
+    amount = transaction.get("amount") or 0
+    sale_value = transaction.get("saleValue")
+    return {
+        "amount": sign * amount,
+        "saleValue": sign * (sale_value or 0),
+        # Sale value falling back to amount, as used by the sales analysis
+        "salesTotal": sign * (sale_value if sale_value is not None else amount),
+        "supplierValue": sign * (transaction.get("supplierValue") or 0),
+        "commissionValue": sign * (transaction.get("commissionValue") or 0),
+        "count": sign
+    }
+
+
+async def apply_rollups(db: AsyncIOMotorDatabase, transactions: List[dict], sign: int = 1):
+    """Somar (sign=1) ou subtrair (sign=-1) transações dos rollups diários"""
+    operations = []
+    for transaction in transactions:
+        operations.append(UpdateOne(rollup_key(transaction), {"$inc": rollup_increments(transaction, sign)}, upsert=True))
+    if not operations:
+        return
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        # The transaction write already succeeded; a rebuild brings rollups back in sync
+        logger.error(f"❌ Daily rollup update failed, rebuild required: {e}")
+
+
+async def apply_rollup(db: AsyncIOMotorDatabase, transaction: dict, sign: int = 1):
+    """Atualizar os rollups diários com uma única transação"""
+    await apply_rollups(db, [transaction], sign)
+
+
+async def rebuild_rollups(db: AsyncIOMotorDatabase) -> int:
+    """Recalcular daily_rollups a partir de todas as transações"""
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "day": ROLLUP_DAY_EXPRESSION,
+                "type": "$type",
+                "category": "$category",
+                "seller": "$seller",
+                "paymentMethod": "$paymentMethod"
+            },
+            **ROLLUP_SUM_EXPRESSIONS
+        }},
+        {"$project": {
+            "_id": 0,
+            **{field: f"$_id.{field}" for field in ROLLUP_KEY_FIELDS},
+            **{field: 1 for field in ROLLUP_SUM_FIELDS}
+        }},
+        # $out swaps the collection atomically and keeps its indexes
+        {"$out": ROLLUP_COLLECTION}
+    ]
+    await db.transactions.aggregate(pipeline).to_list(None)
+    count = await db[ROLLUP_COLLECTION].count_documents({})
+    logger.info(f"✅ Daily rollups rebuilt ({count} rows)")
+    return count
+
+
+async def get_rollup_totals(db: AsyncIOMotorDatabase, day_range: Optional[dict] = None) -> dict:
+    """Totais por tipo de transação a partir dos rollups (day_range: filtro sobre `day`)"""
+    pipeline = []
+    if day_range:
+        pipeline.append({"$match": {"day": day_range}})
+    pipeline.append({"$group": {
+        "_id": "$type",
+        **{field: {"$sum": f"${field}"} for field in ROLLUP_SUM_FIELDS}
+    }})
+    rows = await db[ROLLUP_COLLECTION].aggregate(pipeline).to_list(None)
+    return {row.pop("_id"): row for row in rows}
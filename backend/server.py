@@ -1,21 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Header, UploadFile, File
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pydantic import ValidationError
 from contextlib import asynccontextmanager
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, create_model
+from pymongo import ReturnDocument
+from typing import Any, Optional, List
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
+import shutil
+import csv
 import logging
-from datetime import datetime, date
+import asyncio
+import functools
+import hashlib
+from datetime import datetime, date, timedelta, timezone
 from bson import ObjectId
+from result_cache import ResultCache, get_generation, bump_generation
+from analytics import ANALYTICS_CATEGORICAL_FIELDS, DEFAULT_PERCENTILES, load_frame, group_breakdown
+from report_engine import PeriodReport, REPORT_TYPES, TIMESERIES_GRANULARITIES, TIMESERIES_METRICS, scan_period, period_totals, period_timeseries, sales_analysis_from_totals, complete_analysis_from_totals, sales_performance_from_totals
+from arrow_export import PARQUET_MEDIA_TYPE, transaction_arrow_schema, iter_parquet
+from idempotency import IDEMPOTENCY_COLLECTION, IDEMPOTENCY_KEY_MAX_LENGTH, request_fingerprint, begin_request, complete_request, release_request
+from export_jobs import JOBS_COLLECTION, EXPORT_DIR, ExportWorkerPool, create_job, job_response, counted
+from imports import IMPORT_FORMATS, IMPORT_BATCH_ROWS, IMPORT_REQUIRED_FIELDS, import_headers, map_headers, missing_required, estimate_rows, iter_import_rows, next_batch
+from exports import EXPORT_PROJECTION, EXPORT_BATCH_SIZE, CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, iter_csv, write_xlsx
+from pdf_reports import PDF_BREAKDOWN_ROWS, render_pdf, shutdown_render_pool
+from period_snapshots import SNAPSHOT_COLLECTION, month_key, month_range, close_period, reopen_period, verify_period, find_closed_periods, flag_periods, has_snapshots, combined_period_totals
+from transaction_patch import build_patch_update, removal_arrays
+from rollups import apply_rollup, apply_rollups, rebuild_rollups, empty_totals, parse_day_expression, ROLLUP_COLLECTION, ROLLUP_KEY_FIELDS
 import bcrypt
 import jwt
 import uuid
+import base64
+import json
+import re
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,26 +56,45 @@ if not MONGO_URL:
 
 client = None
 db = None
+index_build_task = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global client, db
+    global client, db, index_build_task
     try:
         client = AsyncIOMotorClient(MONGO_URL)
         db = client.cash_control
         await client.admin.command('ping')
         logger.info("✅ Connected to MongoDB successfully")
+        # Build indexes in the background so startup is not blocked
+        index_build_task = asyncio.create_task(create_indexes())
+        export_workers.start(db, {**EXPORT_RUNNERS, **IMPORT_RUNNERS})
         yield
     except Exception as e:
         logger.error(f"❌ Failed to connect to MongoDB: {e}")
         raise
     finally:
         # Shutdown
+        if index_build_task and not index_build_task.done():
+            index_build_task.cancel()
+        await export_workers.stop()
+        shutdown_render_pool()
         if client:
             client.close()
             logger.info("✅ MongoDB connection closed")
 
+async def create_indexes():
+    """Criar os índices do INDEX_REGISTRY (executado em segundo plano no startup)"""
+    created = 0
+    for collection, keys, options in INDEX_REGISTRY:
+        try:
+            await db[collection].create_index(keys, **options)
+            created += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Error creating index {collection}.{options.get('name')}: {e}")
+    logger.info(f"✅ Database indexes created ({created}/{len(INDEX_REGISTRY)})")
+
 # Create FastAPI app
 app = FastAPI(
     title="Cash Control API",
@@ -156,6 +200,22 @@ class TransactionCreate(BaseModel):
     emissionType: Optional[str] = None
     supplierPhone: Optional[str] = None
 
+# PATCH body: every TransactionCreate field optional (only the changed ones are
+# sent), plus JSON-Patch-style operations on single suppliers[]/passengers[] entries
+class TransactionPatchOperation(BaseModel):
+    op: str
+    path: str
+    value: Optional[Any] = None
+
+TransactionPatch = create_model(
+    "TransactionPatch",
+    operations=(List[TransactionPatchOperation], []),
+    **{name: (Optional[field.annotation], None) for name, field in TransactionCreate.model_fields.items()}
+)
+
+# Typed Arrow schema of the ledger (Parquet export)
+TRANSACTION_ARROW_SCHEMA = transaction_arrow_schema(TransactionCreate)
+
 # Create API router
 from fastapi import APIRouter
 api_router = APIRouter(prefix="/api")
@@ -163,6 +223,9 @@ api_router = APIRouter(prefix="/api")
 # Create reports router
 reports_router = APIRouter(prefix="/reports")
 
+# Create exports router
+exports_router = APIRouter(prefix="/exports")
+
 # Helper functions
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -178,6 +241,291 @@ def create_jwt_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, "your-secret-key", algorithm="HS256")
 
+def serialize_transaction(transaction: dict) -> dict:
+    """Converter ObjectId e datas de uma transação para JSON"""
+    transaction["id"] = str(transaction["_id"])
+    transaction["_id"] = str(transaction["_id"])
+    # Convert datetime objects to strings
+    if "createdAt" in transaction:
+        transaction["createdAt"] = transaction["createdAt"].isoformat()
+    if "updatedAt" in transaction:
+        transaction["updatedAt"] = transaction["updatedAt"].isoformat()
+    if transaction.get("effectiveDate"):
+        transaction["effectiveDate"] = transaction["effectiveDate"].isoformat()
+    return transaction
+
+# Keyset pagination for the transaction list
+TRANSACTIONS_SORT = [("date", -1), ("time", -1), ("_id", -1)]
+TRANSACTIONS_DEFAULT_LIMIT = 100
+TRANSACTIONS_MAX_LIMIT = 1000
+
+def encode_transactions_cursor(transaction: dict) -> str:
+    """Gerar cursor opaco a partir da última transação da página"""
+    key = [transaction.get("date"), transaction.get("time"), str(transaction["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def decode_transactions_cursor(cursor: str) -> dict:
+    """Converter cursor opaco no filtro que continua após a última transação"""
+    try:
+        last_date, last_time, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        last_id = ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    # Strictly after (date, time, _id) in descending order
+    return {
+        "$or": [
+            {"date": {"$lt": last_date}},
+            {"date": last_date, "time": {"$lt": last_time}},
+            {"date": last_date, "time": last_time, "_id": {"$lt": last_id}}
+        ]
+    }
+
+# Canonical effective date: one indexed BSON date instead of the date/transactionDate $or
+def to_effective_date(transaction_date: Optional[str]) -> Optional[datetime]:
+    """Converter data YYYY-MM-DD da transação na data efetiva (BSON date)"""
+    if not transaction_date:
+        return None
+    try:
+        return datetime.strptime(str(transaction_date)[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+
+def build_period_filter(start_date: Optional[str], end_date: Optional[str]) -> dict:
+    """Montar o filtro de período dos relatórios sobre effectiveDate"""
+    if not (start_date and end_date):
+        return {}
+    start = to_effective_date(start_date)
+    end = to_effective_date(end_date)
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="Datas devem estar no formato YYYY-MM-DD")
+    return {"effectiveDate": {"$gte": start, "$lt": end + timedelta(days=1)}}
+
+async def backfill_effective_date() -> int:
+    """Preencher effectiveDate nas transações antigas (transactionDate, senão date)"""
+    # Missing or null: rows left null by an earlier run are retried. An empty or
+    # unparsable transactionDate falls back to date
+    result = await db.transactions.update_many(
+        {"effectiveDate": None},
+        [{"$set": {"effectiveDate": {"$ifNull": [
+            parse_day_expression("$transactionDate"),
+            parse_day_expression("$date")
+        ]}}}]
+    )
+    return result.modified_count
+
+# Server-side filters for the transaction list
+TRANSACTION_FILTER_FIELDS = ["type", "client", "seller", "supplier", "suppliers.name", "status", "paymentMethod"]
+
+def build_transactions_filter(
+    transaction_type: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    client: Optional[str] = None,
+    seller: Optional[str] = None,
+    supplier: Optional[str] = None,
+    transaction_status: Optional[str] = None,
+    paymentMethod: Optional[str] = None
+) -> dict:
+    """Montar o filtro Mongo da listagem de transações"""
+    filters = {}
+    if transaction_type:
+        filters["type"] = transaction_type
+    if client:
+        filters["client"] = client
+    if seller:
+        filters["seller"] = seller
+    if transaction_status:
+        filters["status"] = transaction_status
+    if paymentMethod:
+        filters["paymentMethod"] = paymentMethod
+    if date_from or date_to:
+        filters["date"] = {}
+        if date_from:
+            filters["date"]["$gte"] = date_from
+        if date_to:
+            filters["date"]["$lte"] = date_to
+    if supplier:
+        # Single supplier field or one of the multiple suppliers
+        filters["$or"] = [{"supplier": supplier}, {"suppliers.name": supplier}]
+    return filters
+
+def combine_filters(*filters: dict) -> dict:
+    """Combinar filtros Mongo com $and, ignorando os vazios"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    if len(filters) == 1:
+        return filters[0]
+    return {"$and": filters}
+
+# Delta sync: changes since an (updatedAt, _id) watermark. Pages are sorted on
+# both, so documents sharing one updatedAt (bulk/import writes) are never
+# skipped between pages. updatedAt comes from the app clock: a write stamped
+# before a client's read but committed after it can land below that client's
+# watermark; clients that cannot tolerate this should resync periodically.
+DELETION_LOG_RETENTION = timedelta(days=90)
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 5000
+
+def parse_watermark_time(value: str) -> datetime:
+    """Converter data ISO 8601 em datetime UTC (sem timezone, como no banco)"""
+    watermark = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if watermark.tzinfo:
+        watermark = watermark.astimezone(timezone.utc).replace(tzinfo=None)
+    return watermark
+
+def encode_watermark(updated_at: datetime, last_id: Optional[ObjectId]) -> str:
+    """Watermark opaco: updatedAt da última alteração e o _id dela (desempate)"""
+    key = [updated_at.isoformat(), str(last_id) if last_id else None]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def parse_watermark(since: str) -> tuple:
+    """(updatedAt, _id ou None) do watermark; aceita também uma data ISO 8601 simples"""
+    try:
+        try:
+            updated_at, last_id = json.loads(base64.urlsafe_b64decode(since.encode("ascii")))
+            return parse_watermark_time(updated_at), ObjectId(last_id) if last_id else None
+        except (ValueError, TypeError, UnicodeError):
+            return parse_watermark_time(since), None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Watermark inválido")
+
+async def log_transaction_deletions(transaction_ids: List[str]):
+    """Registrar exclusões para o endpoint de sincronização incremental"""
+    if transaction_ids:
+        deleted_at = datetime.utcnow()
+        await db.transaction_deletions.insert_many([
+            {"transactionId": transaction_id, "deletedAt": deleted_at}
+            for transaction_id in transaction_ids
+        ])
+
+# Sparse fieldsets: `fields=` becomes a Mongo projection
+TRANSACTION_FIELD_PROFILES = {
+    "list": [
+        "date", "time", "type", "category", "description", "amount", "paymentMethod",
+        "client", "supplier", "seller", "status", "transactionDate"
+    ],
+    "passenger": [
+        "date", "time", "type", "client", "description", "passengers", "productType", "tripType",
+        "airline", "emissionType", "supplier", "supplierPhone", "travelNotes",
+        "reservationLocator", "clientReservationCode", "internalReservationCode",
+        "departureDate", "returnDate", "departureCity", "arrivalCity",
+        "originAirport", "destinationAirport",
+        "outboundDepartureTime", "outboundArrivalTime", "returnDepartureTime", "returnArrivalTime",
+        "hasOutboundStop", "hasReturnStop", "outboundStopCity", "outboundStopArrival",
+        "outboundStopDeparture", "returnStopCity", "returnStopArrival", "returnStopDeparture",
+        "outboundStops", "returnStops", "hiddenFromPassengerControl"
+    ]
+}
+FIELD_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*")
+# Fields the report calculations read, always projected on /reports endpoints
+REPORT_REQUIRED_FIELDS = ["type", "amount", "saleValue", "supplierValue", "commissionValue"]
+
+def build_projection(fields: Optional[str], required: List[str] = ()) -> Optional[dict]:
+    """Converter `fields=` (nomes ou perfis separados por vírgula) em projeção Mongo"""
+    if not fields:
+        return None
+    projection = {}
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        if name in TRANSACTION_FIELD_PROFILES:
+            projection.update({field: 1 for field in TRANSACTION_FIELD_PROFILES[name]})
+        elif FIELD_NAME_PATTERN.fullmatch(name):
+            projection[name] = 1
+        else:
+            raise HTTPException(status_code=400, detail=f"Campo inválido: {name}")
+    projection.update({field: 1 for field in required})
+    projection.pop("_id", None)  # _id is always returned
+    projection.pop("id", None)   # derived from _id by serialize_transaction
+    # MongoDB rejects a path together with one of its subpaths (path collision);
+    # the parent already returns the child, so the child is dropped
+    return {
+        field: 1 for field in projection
+        if not any(field.startswith(f"{parent}.") for parent in projection)
+    }
+
+# Index registry: one entry per query shape server.py runs, built at startup.
+# HOT_QUERIES lists representative filters/sorts that must never COLLSCAN
+# (checked with explain() in tests/test_indexes.py).
+INDEX_REGISTRY = [
+    # GET /transactions: keyset pagination on (date, time, _id)
+    ("transactions", [("date", -1), ("time", -1), ("_id", -1)], {"name": "date_time_id_desc"}),
+    # GET /transactions filters: equality prefix followed by the sort key
+    *[
+        ("transactions", [(field, 1), ("date", -1), ("time", -1), ("_id", -1)], {"name": f"{field}_date_time_id"})
+        for field in TRANSACTION_FILTER_FIELDS
+    ],
+    # /reports/*: period range on the canonical effective date
+    ("transactions", [("effectiveDate", 1)], {"name": "effectiveDate"}),
+    # generate-expenses: existing auto-generated expense per supplier
+    ("transactions", [("originalTransactionId", 1), ("supplier", 1)], {"name": "originalTransactionId_supplier"}),
+    # GET /transactions/changes
+    ("transactions", [("updatedAt", 1), ("_id", 1)], {"name": "updatedAt_id"}),
+    ("transaction_deletions", [("deletedAt", 1)], {
+        "name": "deletedAt_ttl",
+        "expireAfterSeconds": int(DELETION_LOG_RETENTION.total_seconds())
+    }),
+    # Daily rollups: one row per key, range scans by day
+    (ROLLUP_COLLECTION, [(field, 1) for field in ROLLUP_KEY_FIELDS], {"name": "rollup_key", "unique": True}),
+    # Export jobs: workers claim the oldest queued job; finished jobs expire
+    (JOBS_COLLECTION, [("status", 1), ("createdAt", 1)], {"name": "status_createdAt"}),
+    (JOBS_COLLECTION, [("expiresAt", 1)], {"name": "expiresAt_ttl", "expireAfterSeconds": 0}),
+    # Idempotency keys: replays are _id lookups; records and stale leases expire
+    (IDEMPOTENCY_COLLECTION, [("expiresAt", 1)], {"name": "expiresAt_ttl", "expireAfterSeconds": 0}),
+    # Email lookups on login/register and duplicate checks
+    ("users", [("email", 1)], {"name": "email"}),
+    ("clients", [("email", 1)], {"name": "email"}),
+    ("suppliers", [("email", 1)], {"name": "email"}),
+    # Section/type lookups
+    ("internal_control", [("section", 1)], {"name": "section"}),
+    ("settings", [("type", 1)], {"name": "type"}),
+]
+
+HOT_QUERIES = [
+    ("transactions", {}, TRANSACTIONS_SORT),
+    ("transactions", {"type": "entrada_vendas"}, TRANSACTIONS_SORT),
+    ("transactions", {"client": "Cliente"}, TRANSACTIONS_SORT),
+    ("transactions", {"effectiveDate": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)}}, None),
+    ("transactions", {"originalTransactionId": "0" * 24, "supplier": "Fornecedor", "autoGenerated": True}, None),
+    ("transactions", {"updatedAt": {"$gt": datetime(2024, 1, 1)}}, [("updatedAt", 1), ("_id", 1)]),
+    ("transaction_deletions", {"deletedAt": {"$gt": datetime(2024, 1, 1)}}, [("deletedAt", 1)]),
+    (ROLLUP_COLLECTION, {"day": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)}}, None),
+    (JOBS_COLLECTION, {"status": "queued"}, [("status", 1), ("createdAt", 1)]),
+    ("users", {"email": "user@example.com"}, None),
+    ("clients", {"email": "client@example.com"}, None),
+    ("suppliers", {"email": "supplier@example.com"}, None),
+    ("internal_control", {"section": "partners"}, None),
+    ("settings", {"type": "company"}, None),
+]
+
+async def fetch_transactions_page(filters: dict, projection: Optional[dict], cursor: Optional[str], page_size: int) -> dict:
+    """Buscar uma página (keyset) de transações: {items, next_cursor, limit}"""
+    query = combine_filters(filters, decode_transactions_cursor(cursor) if cursor else {})
+    # Fetch one extra document to know whether another page exists
+    transactions = await db.transactions.find(query, projection).sort(TRANSACTIONS_SORT).limit(page_size + 1).to_list(page_size + 1)
+    has_more = len(transactions) > page_size
+    transactions = transactions[:page_size]
+    next_cursor = encode_transactions_cursor(transactions[-1]) if has_more else None
+    return {
+        "items": [serialize_transaction(transaction) for transaction in transactions],
+        "next_cursor": next_cursor,
+        "limit": page_size
+    }
+
+# Streaming (NDJSON) transaction listings
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+
+def wants_ndjson(request: Request, stream: bool) -> bool:
+    """Verificar se o cliente pediu a resposta em NDJSON"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def iter_ndjson(cursor):
+    """Serializar cada documento do cursor Motor em uma linha JSON"""
+    async for document in cursor:
+        yield json.dumps(serialize_transaction(document), default=str, ensure_ascii=False) + "\n"
+
 # Security scheme
 security = HTTPBearer()
 
@@ -210,6 +558,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except Exception as e:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+optional_security = HTTPBearer(auto_error=False)
+
+async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[dict]:
+    """Usuário do token JWT, se enviado (None sem token; token inválido -> 401)"""
+    if credentials is None:
+        return None
+    return await get_current_user(credentials)
+
 # Authentication routes
 @api_router.post("/auth/register")
 async def register(user_data: UserCreate):
@@ -718,203 +1074,338 @@ async def delete_supplier(supplier_id: str):
         logging.error(f"Error deleting supplier: {str(e)}")
         raise HTTPException(status_code=500, detail="Error deleting supplier")
 
+# Result cache for summary/report endpoints, invalidated by transaction writes;
+# bounded by entries and by the total transaction rows the cached results hold
+REPORT_CACHE_MAX_ROWS = int(os.environ.get("REPORT_CACHE_MAX_ROWS", "200000"))
+report_cache = ResultCache(max_entries=256, ttl_seconds=300, max_weight=REPORT_CACHE_MAX_ROWS)
+
+async def invalidate_transaction_caches():
+    """Invalidar resultados em cache após escrita em transações"""
+    await bump_generation(db, "transactions")
+
+# Writes into a closed month: "reject" (409) or "flag" (snapshot marked dirty)
+CLOSED_PERIOD_WRITES = os.environ.get('CLOSED_PERIOD_WRITES', 'reject')
+
+async def guard_closed_periods(*effective_dates: Optional[datetime]) -> List[str]:
+    """Bloquear escritas que caem em meses fechados; no modo flag, devolve os meses a sinalizar após a escrita"""
+    closed = await find_closed_periods(db, effective_dates)
+    if not closed or CLOSED_PERIOD_WRITES == "flag":
+        return closed
+    raise HTTPException(status_code=409, detail=f"Período fechado: {', '.join(closed)}")
+
+def cached_report(endpoint: str):
+    """Decorator: servir o endpoint do cache enquanto não houver escrita em transações"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            generation = await get_generation(db, "transactions")
+            # "today" matters for the dashboard summary
+            key = (endpoint, generation, date.today().isoformat(), tuple(sorted(kwargs.items())))
+            cached = report_cache.get(key)
+            if cached is not None:
+                return cached
+            result = await func(**kwargs)
+            report_cache.set(key, result)
+            return result
+        return wrapper
+    return decorator
+
 # Transactions API endpoints
 @api_router.get("/transactions")
-async def get_transactions():
+async def get_transactions(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=TRANSACTIONS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    all_transactions: bool = Query(False, alias="all"),
+    fields: Optional[str] = None,
+    type_filter: Optional[str] = Query(None, alias="type"),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    client: Optional[str] = None,
+    seller: Optional[str] = None,
+    supplier: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    paymentMethod: Optional[str] = None
+):
     """Obter transações ordenadas por data e hora (mais recente primeiro)"""
     try:
-        transactions = await db.transactions.find({}).sort([("date", -1), ("time", -1)]).to_list(None)
-        for transaction in transactions:
-            transaction["id"] = str(transaction["_id"])
-            transaction["_id"] = str(transaction["_id"])
-            # Convert datetime objects to strings
-            if "createdAt" in transaction:
-                transaction["createdAt"] = transaction["createdAt"].isoformat()
-            if "updatedAt" in transaction:
-                transaction["updatedAt"] = transaction["updatedAt"].isoformat()
-        return transactions
+        # Paging needs the (date, time) key on every returned document
+        projection = build_projection(fields, required=["date", "time"])
+        filters = build_transactions_filter(
+            transaction_type=type_filter, date_from=date_from, date_to=date_to, client=client,
+            seller=seller, supplier=supplier, transaction_status=status_filter, paymentMethod=paymentMethod
+        )
+        
+        # NDJSON: send each document as the Motor cursor yields it
+        if wants_ndjson(request, stream):
+            query = combine_filters(filters, decode_transactions_cursor(cursor) if cursor else {})
+            transactions_cursor = db.transactions.find(query, projection).sort(TRANSACTIONS_SORT).batch_size(STREAM_BATCH_SIZE)
+            if limit:
+                transactions_cursor = transactions_cursor.limit(limit)
+            return StreamingResponse(iter_ndjson(transactions_cursor), media_type=NDJSON_MEDIA_TYPE)
+
+        # The full, unpaged list is an explicit opt-in (?all=true); by default a bounded page
+        if all_transactions:
+            transactions = await db.transactions.find(filters, projection).sort(TRANSACTIONS_SORT).to_list(None)
+            return [serialize_transaction(transaction) for transaction in transactions]
+
+        return await fetch_transactions_page(filters, projection, cursor, limit or TRANSACTIONS_DEFAULT_LIMIT)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Transactions error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting transactions")
 
+def build_transaction_documents(transaction: TransactionCreate, sale_id: Optional[ObjectId] = None) -> tuple:
+    """Montar em memória a transação e as despesas geradas automaticamente (fornecedores pagos e comissão)"""
+    # Pre-generated ids: the expenses reference the sale before anything is written
+    sale_id = sale_id or ObjectId()
+    today = date.today().strftime("%Y-%m-%d")
+    now = datetime.utcnow()
+    
+    # Use the transaction date provided by user, or default to today
+    transaction_date = transaction.transactionDate if transaction.transactionDate else today
+    
+    # Calculate commission percentage if values provided
+    commission_percentage = None
+    if transaction.saleValue and transaction.commissionValue:
+        commission_percentage = (transaction.commissionValue / transaction.saleValue) * 100
+    
+    # Use custom category if provided, otherwise use predefined category
+    final_category = transaction.customCategory if transaction.customCategory else transaction.category
+    
+    # Prepare transaction data
+    new_transaction = {
+        "_id": sale_id,
+        "date": transaction_date,  # Use the actual transaction date, not entry date
+        "time": datetime.now().strftime("%H:%M"),  # Keep current time for record keeping
+        "type": transaction.type,
+        "category": final_category,
+        "description": transaction.description,
+        "amount": transaction.amount,
+        "paymentMethod": transaction.paymentMethod,
+        "client": transaction.client,
+        "supplier": transaction.supplier,
+        "seller": transaction.seller,
+        "saleValue": transaction.saleValue,
+        "supplierValue": transaction.supplierValue,
+        "supplierPaymentDate": transaction.supplierPaymentDate,
+        "supplierPaymentStatus": transaction.supplierPaymentStatus or "Pendente",
+        "commissionValue": transaction.commissionValue,
+        "commissionPaymentDate": transaction.commissionPaymentDate,
+        "commissionPaymentStatus": transaction.commissionPaymentStatus or "Pendente",
+        "commissionPercentage": commission_percentage,
+        "customCategory": transaction.customCategory,
+        # Travel-specific fields
+        "clientNumber": transaction.clientNumber,
+        "reservationLocator": transaction.reservationLocator,
+        "departureDate": transaction.departureDate,
+        "returnDate": transaction.returnDate,
+        "departureTime": transaction.departureTime,
+        "arrivalTime": transaction.arrivalTime,
+        "hasStops": transaction.hasStops,
+        "originAirport": transaction.originAirport,
+        "destinationAirport": transaction.destinationAirport,
+        "tripType": transaction.tripType or "Lazer",
+        "products": transaction.products or [],
+        # Enhanced fields for client reservation and supplier miles
+        "clientReservationCode": transaction.clientReservationCode,
+        "internalReservationCode": transaction.internalReservationCode,
+        "departureCity": transaction.departureCity,
+        "arrivalCity": transaction.arrivalCity,
+        "productType": transaction.productType or "Passagem",
+        
+        # Enhanced flight schedule fields with timezone support
+        "outboundDepartureTime": transaction.outboundDepartureTime,
+        "outboundArrivalTime": transaction.outboundArrivalTime,
+        "returnDepartureTime": transaction.returnDepartureTime,
+        "returnArrivalTime": transaction.returnArrivalTime,
+        "hasOutboundStop": transaction.hasOutboundStop,
+        "hasReturnStop": transaction.hasReturnStop,
+        "outboundStopCity": transaction.outboundStopCity,
+        "outboundStopArrival": transaction.outboundStopArrival,
+        "outboundStopDeparture": transaction.outboundStopDeparture,
+        "returnStopCity": transaction.returnStopCity,
+        "returnStopArrival": transaction.returnStopArrival,
+        "returnStopDeparture": transaction.returnStopDeparture,
+        
+        "supplierUsedMiles": transaction.supplierUsedMiles or False,
+        "supplierMilesQuantity": transaction.supplierMilesQuantity,
+        "supplierMilesValue": transaction.supplierMilesValue,
+        "supplierMilesProgram": transaction.supplierMilesProgram,
+        "airportTaxes": transaction.airportTaxes,
+        "milesTaxes": transaction.milesTaxes,
+        # Escalas
+        "outboundStops": transaction.outboundStops,
+        "returnStops": transaction.returnStops,
+        # Additional fields for expenses
+        "saleReference": transaction.saleReference,
+        "productPurchased": transaction.productPurchased,
+        "additionalInfo": transaction.additionalInfo,
+        # Multiple suppliers support
+        "suppliers": transaction.suppliers or [],
+        # Passenger management for travel bookings
+        "passengers": transaction.passengers or [],
+        "airline": transaction.airline,
+        "travelNotes": transaction.travelNotes,
+        # Supplier contact information
+        "emissionType": transaction.emissionType,
+        "supplierPhone": transaction.supplierPhone,
+        "status": "Confirmado",
+        "transactionDate": transaction_date,  # Store the actual transaction date
+        "effectiveDate": to_effective_date(transaction_date),
+        "createdAt": now,  # Keep record of when this was entered into system
+        "updatedAt": now,
+        "entryDate": today  # When this was entered into system
+    }
+    
+    # Auto-generate expense transactions for paid suppliers
+    expense_transactions = []
+    reservation_suffix = f" ({transaction.internalReservationCode})" if transaction.internalReservationCode else ""
+    # CORREÇÃO: Usar saida_vendas quando a entrada for entrada_vendas
+    expense_type = "saida_vendas" if transaction.type == "entrada_vendas" else "saida"
+    for supplier in transaction.suppliers or []:
+        if supplier.get('paymentStatus') == 'Pago' and supplier.get('name') and supplier.get('value'):
+            payment_date = supplier.get('paymentDate') or today
+            expense_transactions.append({
+                "_id": ObjectId(),
+                "id": str(uuid.uuid4()),
+                "date": today,
+                "time": datetime.now().strftime("%H:%M"),
+                "type": expense_type,
+                "category": "Pagamento a Fornecedor",
+                "description": f"Pagamento a {supplier['name']} - Ref: {transaction.description}" + reservation_suffix,
+                "amount": float(supplier['value']),
+                "paymentMethod": transaction.paymentMethod or "PIX",
+                "supplier": supplier['name'],
+                "saleReference": str(sale_id),
+                "additionalInfo": f"Gerado automaticamente para fornecedor: {supplier['name']}",
+                "status": "Confirmado",
+                "transactionDate": payment_date,
+                "effectiveDate": to_effective_date(payment_date),
+                "createdAt": now,
+                "updatedAt": now,
+                "entryDate": today,
+                "autoGenerated": True,
+                "originalTransactionId": str(sale_id)
+            })
+    
+    # Auto-generate commission expense if there's commission value and seller
+    if transaction.commissionValue and transaction.seller and transaction.commissionPaymentStatus == 'Pago':
+        payment_date = transaction.commissionPaymentDate or today
+        expense_transactions.append({
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "date": today,
+            "time": datetime.now().strftime("%H:%M"),
+            "type": expense_type,
+            "category": "Comissão de Vendedor",
+            "description": f"Comissão para {transaction.seller} - Ref: {transaction.description}" + reservation_suffix,
+            "amount": float(transaction.commissionValue),
+            "paymentMethod": transaction.paymentMethod or "PIX",
+            "seller": transaction.seller,
+            "saleReference": str(sale_id),
+            "additionalInfo": f"Comissão gerada automaticamente para vendedor: {transaction.seller}",
+            "status": "Confirmado",
+            "transactionDate": payment_date,
+            "effectiveDate": to_effective_date(payment_date),
+            "createdAt": now,
+            "updatedAt": now,
+            "entryDate": today,
+            "autoGenerated": True,
+            "originalTransactionId": str(sale_id)
+        })
+    
+    return new_transaction, expense_transactions
+
+# Multi-document transactions need a replica set or mongos; on a standalone
+# server the group is still written with a single insert_many, just not atomically
+ILLEGAL_OPERATION = 20
+session_transactions_supported = None
+
+async def insert_transaction_group(documents: List[dict]):
+    """Gravar a venda e as despesas geradas em uma única transação multi-documento"""
+    global session_transactions_supported
+
+    async def insert_group(session):
+        await db.transactions.insert_many(documents, session=session)
+
+    if session_transactions_supported is not False:
+        try:
+            # with_transaction retries on TransientTransactionError and
+            # UnknownTransactionCommitResult; the pre-generated _ids make a retry safe
+            async with await client.start_session() as session:
+                await session.with_transaction(insert_group)
+            session_transactions_supported = True
+            return
+        except OperationFailure as e:
+            if e.code != ILLEGAL_OPERATION:
+                raise
+            session_transactions_supported = False
+            logger.warning("⚠️ MongoDB does not support transactions (standalone server); sale and expenses are written without a transaction")
+    await db.transactions.insert_many(documents)
+
+# Idempotency-Key support for transaction writes (flaky mobile retries)
+async def idempotent_write(idempotency_key: Optional[str], scope: str, current_user: Optional[dict], payload, write):
+    """Executar a escrita uma única vez por Idempotency-Key; repetições devolvem a resposta original"""
+    if idempotency_key is None:
+        return await write()
+    if not idempotency_key.strip() or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key deve ter entre 1 e {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres")
+    
+    # Keys are per caller: another user's key never replays (or blocks) this request
+    owner = current_user["id"] if current_user else "anonymous"
+    fingerprint = request_fingerprint(payload)
+    record = await begin_request(db, scope, owner, idempotency_key, fingerprint)
+    if record is not None:
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key já utilizada com outro conteúdo de requisição")
+        if record["status"] != "completed":
+            raise HTTPException(status_code=409, detail="Requisição com esta Idempotency-Key ainda em processamento")
+        return JSONResponse(content=record["response"], status_code=record["statusCode"], headers={"Idempotent-Replayed": "true"})
+    
+    try:
+        response = await write()
+    except Exception:
+        await release_request(db, scope, owner, idempotency_key)
+        raise
+    await complete_request(db, scope, owner, idempotency_key, jsonable_encoder(response))
+    return response
+
 @api_router.post("/transactions")
-async def create_transaction(transaction: TransactionCreate):
+async def create_transaction(
+    transaction: TransactionCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """Criar nova transação"""
+    return await idempotent_write(
+        idempotency_key, "POST /api/transactions", current_user, transaction.model_dump(),
+        lambda: insert_transaction(transaction)
+    )
+
+async def insert_transaction(transaction: TransactionCreate) -> dict:
+    """Gravar a transação e as despesas geradas automaticamente"""
     try:
-        # Use the transaction date provided by user, or default to today
-        transaction_date = transaction.transactionDate if transaction.transactionDate else date.today().strftime("%Y-%m-%d")
-        
-        # Calculate commission percentage if values provided
-        commission_percentage = None
-        if transaction.saleValue and transaction.commissionValue:
-            commission_percentage = (transaction.commissionValue / transaction.saleValue) * 100
-        
-        # Use custom category if provided, otherwise use predefined category
-        final_category = transaction.customCategory if transaction.customCategory else transaction.category
+        new_transaction, expense_transactions = build_transaction_documents(transaction)
         
-        # Prepare transaction data
-        new_transaction = {
-            "date": transaction_date,  # Use the actual transaction date, not entry date
-            "time": datetime.now().strftime("%H:%M"),  # Keep current time for record keeping
-            "type": transaction.type,
-            "category": final_category,
-            "description": transaction.description,
-            "amount": transaction.amount,
-            "paymentMethod": transaction.paymentMethod,
-            "client": transaction.client,
-            "supplier": transaction.supplier,
-            "seller": transaction.seller,
-            "saleValue": transaction.saleValue,
-            "supplierValue": transaction.supplierValue,
-            "supplierPaymentDate": transaction.supplierPaymentDate,
-            "supplierPaymentStatus": transaction.supplierPaymentStatus or "Pendente",
-            "commissionValue": transaction.commissionValue,
-            "commissionPaymentDate": transaction.commissionPaymentDate,
-            "commissionPaymentStatus": transaction.commissionPaymentStatus or "Pendente",
-            "commissionPercentage": commission_percentage,
-            "customCategory": transaction.customCategory,
-            # Travel-specific fields
-            "clientNumber": transaction.clientNumber,
-            "reservationLocator": transaction.reservationLocator,
-            "departureDate": transaction.departureDate,
-            "returnDate": transaction.returnDate,
-            "departureTime": transaction.departureTime,
-            "arrivalTime": transaction.arrivalTime,
-            "hasStops": transaction.hasStops,
-            "originAirport": transaction.originAirport,
-            "destinationAirport": transaction.destinationAirport,
-            "tripType": transaction.tripType or "Lazer",
-            "products": transaction.products or [],
-            # Enhanced fields for client reservation and supplier miles
-            "clientReservationCode": transaction.clientReservationCode,
-            "internalReservationCode": transaction.internalReservationCode,
-            "departureCity": transaction.departureCity,
-            "arrivalCity": transaction.arrivalCity,
-            "productType": transaction.productType or "Passagem",
-            
-            # Enhanced flight schedule fields with timezone support
-            "outboundDepartureTime": transaction.outboundDepartureTime,
-            "outboundArrivalTime": transaction.outboundArrivalTime,
-            "returnDepartureTime": transaction.returnDepartureTime,
-            "returnArrivalTime": transaction.returnArrivalTime,
-            "hasOutboundStop": transaction.hasOutboundStop,
-            "hasReturnStop": transaction.hasReturnStop,
-            "outboundStopCity": transaction.outboundStopCity,
-            "outboundStopArrival": transaction.outboundStopArrival,
-            "outboundStopDeparture": transaction.outboundStopDeparture,
-            "returnStopCity": transaction.returnStopCity,
-            "returnStopArrival": transaction.returnStopArrival,
-            "returnStopDeparture": transaction.returnStopDeparture,
-            
-            "supplierUsedMiles": transaction.supplierUsedMiles or False,
-            "supplierMilesQuantity": transaction.supplierMilesQuantity,
-            "supplierMilesValue": transaction.supplierMilesValue,
-            "supplierMilesProgram": transaction.supplierMilesProgram,
-            "airportTaxes": transaction.airportTaxes,
-            "milesTaxes": transaction.milesTaxes,
-            # Escalas
-            "outboundStops": transaction.outboundStops,
-            "returnStops": transaction.returnStops,
-            # Additional fields for expenses
-            "saleReference": transaction.saleReference,
-            "productPurchased": transaction.productPurchased,
-            "additionalInfo": transaction.additionalInfo,
-            # Multiple suppliers support
-            "suppliers": transaction.suppliers or [],
-            # Passenger management for travel bookings
-            "passengers": transaction.passengers or [],
-            "airline": transaction.airline,
-            "travelNotes": transaction.travelNotes,
-            # Supplier contact information
-            "emissionType": transaction.emissionType,
-            "supplierPhone": transaction.supplierPhone,
-            "status": "Confirmado",
-            "transactionDate": transaction_date,  # Store the actual transaction date
-            "createdAt": datetime.utcnow(),  # Keep record of when this was entered into system
-            "updatedAt": datetime.utcnow(),
-            "entryDate": date.today().strftime("%Y-%m-%d")  # When this was entered into system
-        }
+        # Reject writes into closed months (sale date and generated expense dates)
+        late_months = await guard_closed_periods(*[document["effectiveDate"] for document in [new_transaction, *expense_transactions]])
         
-        # Insert transaction into database
-        result = await db.transactions.insert_one(new_transaction)
+        # Sale and generated expenses are written together, in one round trip
+        await insert_transaction_group([new_transaction, *expense_transactions])
+        await apply_rollups(db, [new_transaction, *expense_transactions])
+        await flag_periods(db, late_months)
         
-        # Get created transaction
-        created_transaction = await db.transactions.find_one({"_id": result.inserted_id})
-        if created_transaction:
-            created_transaction["id"] = str(created_transaction["_id"])
-            created_transaction["_id"] = str(created_transaction["_id"])
-            # Convert datetime objects to strings
-            if "createdAt" in created_transaction:
-                created_transaction["createdAt"] = created_transaction["createdAt"].isoformat()
-            if "updatedAt" in created_transaction:
-                created_transaction["updatedAt"] = created_transaction["updatedAt"].isoformat()
+        created_transaction = dict(new_transaction)
+        created_transaction["id"] = str(created_transaction["_id"])
+        created_transaction["_id"] = str(created_transaction["_id"])
+        # Convert datetime objects to strings
+        created_transaction["createdAt"] = created_transaction["createdAt"].isoformat()
+        created_transaction["updatedAt"] = created_transaction["updatedAt"].isoformat()
         
-        # Auto-generate expense transactions for paid suppliers
-        expense_transactions = []
-        if transaction.suppliers:
-            for supplier in transaction.suppliers:
-                if supplier.get('paymentStatus') == 'Pago' and supplier.get('name') and supplier.get('value'):
-                    # CORREÇÃO: Usar saida_vendas quando a entrada for entrada_vendas
-                    expense_type = "saida_vendas" if transaction.type == "entrada_vendas" else "saida"
-                    
-                    expense_transaction = {
-                        "id": str(uuid.uuid4()),
-                        "date": date.today().strftime("%Y-%m-%d"),
-                        "time": datetime.now().strftime("%H:%M"),
-                        "type": expense_type,  # CORREÇÃO: Tipo dinâmico baseado na entrada
-                        "category": "Pagamento a Fornecedor",
-                        "description": f"Pagamento a {supplier['name']} - Ref: {transaction.description}" + (f" ({transaction.internalReservationCode})" if transaction.internalReservationCode else ""),
-                        "amount": float(supplier['value']),
-                        "paymentMethod": transaction.paymentMethod or "PIX",
-                        "supplier": supplier['name'],
-                        "saleReference": created_transaction.get('id', ''),
-                        "additionalInfo": f"Gerado automaticamente para fornecedor: {supplier['name']}",
-                        "status": "Confirmado",
-                        "transactionDate": supplier.get('paymentDate') or date.today().strftime("%Y-%m-%d"),
-                        "createdAt": datetime.utcnow(),
-                        "updatedAt": datetime.utcnow(),
-                        "entryDate": date.today().strftime("%Y-%m-%d"),
-                        "autoGenerated": True,
-                        "originalTransactionId": str(created_transaction["_id"])
-                    }
-                    
-                    # Insert expense transaction
-                    expense_result = await db.transactions.insert_one(expense_transaction)
-                    expense_transaction["_id"] = str(expense_result.inserted_id)
-                    expense_transactions.append(expense_transaction)
-        
-        # Auto-generate commission expense if there's commission value and seller
-        if (transaction.commissionValue and transaction.seller and 
-            transaction.commissionPaymentStatus == 'Pago'):
-            
-            # CORREÇÃO: Usar saida_vendas quando a entrada for entrada_vendas
-            commission_type = "saida_vendas" if transaction.type == "entrada_vendas" else "saida"
-            
-            commission_expense = {
-                "id": str(uuid.uuid4()),
-                "date": date.today().strftime("%Y-%m-%d"),
-                "time": datetime.now().strftime("%H:%M"),
-                "type": commission_type,  # CORREÇÃO: Tipo dinâmico baseado na entrada
-                "category": "Comissão de Vendedor",
-                "description": f"Comissão para {transaction.seller} - Ref: {transaction.description}" + (f" ({transaction.internalReservationCode})" if transaction.internalReservationCode else ""),
-                "amount": float(transaction.commissionValue),
-                "paymentMethod": transaction.paymentMethod or "PIX",
-                "seller": transaction.seller,
-                "saleReference": created_transaction.get('id', ''),
-                "additionalInfo": f"Comissão gerada automaticamente para vendedor: {transaction.seller}",
-                "status": "Confirmado",
-                "transactionDate": transaction.commissionPaymentDate or date.today().strftime("%Y-%m-%d"),
-                "createdAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow(),
-                "entryDate": date.today().strftime("%Y-%m-%d"),
-                "autoGenerated": True,
-                "originalTransactionId": str(created_transaction["_id"])
-            }
-            
-            # Insert commission expense transaction
-            commission_result = await db.transactions.insert_one(commission_expense)
-            commission_expense["_id"] = str(commission_result.inserted_id)
-            expense_transactions.append(commission_expense)
+        await invalidate_transaction_caches()
         
         response_data = {"message": "Transação criada com sucesso", **created_transaction}
         if expense_transactions:
@@ -922,10 +1413,132 @@ async def create_transaction(transaction: TransactionCreate):
             response_data["expenseMessage"] = f"{len(expense_transactions)} transação(ões) de despesa gerada(s) automaticamente"
         
         return response_data
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Create transaction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao criar transação: {str(e)}")
 
+# Bulk creation: validate everything, build all documents in memory, then write
+# them in unordered insert_many batches; an item whose sale or generated
+# expense fails is rolled back as a whole, so a retry never duplicates it
+BULK_MAX_ITEMS = 5000
+BULK_INSERT_BATCH_SIZE = 1000
+
+class BulkTransactionsRequest(BaseModel):
+    transactions: List[dict]
+
+def validation_errors(error: ValidationError) -> List[dict]:
+    """Erros de validação do pydantic em formato serializável"""
+    return [{"field": ".".join(str(part) for part in item["loc"]), "message": item["msg"]} for item in error.errors()]
+
+@api_router.post("/transactions/bulk")
+async def create_transactions_bulk(
+    request: BulkTransactionsRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """Criar transações em lote (com as despesas automáticas), com resultado por item"""
+    return await idempotent_write(
+        idempotency_key, "POST /api/transactions/bulk", current_user, request.transactions,
+        lambda: insert_transactions_bulk(request)
+    )
+
+async def insert_transaction_groups(item_documents: dict) -> dict:
+    """Gravar grupos (venda, despesas geradas) em insert_many não ordenados; devolve os erros por item"""
+    errors_by_item = {}
+    
+    # Closed months: one lookup for the whole batch
+    closed = set(await find_closed_periods(db, [
+        document["effectiveDate"]
+        for sale, expenses in item_documents.values() for document in [sale, *expenses]
+    ]))
+    if closed and CLOSED_PERIOD_WRITES != "flag":
+        for index, (sale, expenses) in item_documents.items():
+            months = sorted({
+                month_key(document["effectiveDate"]) for document in [sale, *expenses]
+                if document["effectiveDate"] and month_key(document["effectiveDate"]) in closed
+            })
+            if months:
+                errors_by_item[index] = [{"field": "transactionDate", "message": f"Período fechado: {', '.join(months)}"}]
+    
+    # Flatten, remembering which item each document belongs to
+    documents, owners = [], []
+    for index, (sale, expenses) in item_documents.items():
+        if index in errors_by_item:
+            continue
+        for document in [sale, *expenses]:
+            documents.append(document)
+            owners.append(index)
+    
+    failed_documents, failed_items = set(), set()
+    for offset in range(0, len(documents), BULK_INSERT_BATCH_SIZE):
+        batch = documents[offset:offset + BULK_INSERT_BATCH_SIZE]
+        try:
+            await db.transactions.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_documents.add(offset + error["index"])
+                failed_items.add(owners[offset + error["index"]])
+                errors_by_item.setdefault(owners[offset + error["index"]], []).append({"field": None, "message": error.get("errmsg", "Erro de escrita")})
+    
+    # A group is all or nothing: remove the siblings that did get written for a
+    # failed item (never the failed positions: a duplicate _id is someone else's)
+    orphans = [
+        document["_id"] for position, (document, owner) in enumerate(zip(documents, owners))
+        if owner in failed_items and position not in failed_documents
+    ]
+    if orphans:
+        await db.transactions.delete_many({"_id": {"$in": orphans}})
+    
+    written = [document for document, owner in zip(documents, owners) if owner not in failed_items]
+    await apply_rollups(db, written)
+    # Flag mode: only the closed months that actually received a write
+    await flag_periods(db, sorted({
+        month_key(document["effectiveDate"]) for document in written
+        if document["effectiveDate"] and month_key(document["effectiveDate"]) in closed
+    }))
+    return errors_by_item
+
+async def insert_transactions_bulk(request: BulkTransactionsRequest) -> dict:
+    """Validar e gravar um lote de transações"""
+    try:
+        if len(request.transactions) > BULK_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Máximo de {BULK_MAX_ITEMS} transações por lote")
+        
+        results = [None] * len(request.transactions)
+        item_documents = {}
+        for index, payload in enumerate(request.transactions):
+            try:
+                item_documents[index] = build_transaction_documents(TransactionCreate.model_validate(payload))
+            except ValidationError as e:
+                results[index] = {"index": index, "status": "error", "errors": validation_errors(e)}
+            except (TypeError, ValueError) as e:
+                results[index] = {"index": index, "status": "error", "errors": [{"field": None, "message": str(e)}]}
+        
+        errors_by_item = await insert_transaction_groups(item_documents)
+        if len(errors_by_item) < len(item_documents):
+            await invalidate_transaction_caches()
+        
+        for index, (sale, expenses) in item_documents.items():
+            if index in errors_by_item:
+                results[index] = {"index": index, "status": "error", "errors": errors_by_item[index]}
+            else:
+                results[index] = {"index": index, "status": "created", "id": str(sale["_id"]), "generatedExpenses": len(expenses)}
+        
+        created = sum(1 for result in results if result["status"] == "created")
+        return {
+            "message": f"{created} de {len(results)} transação(ões) criada(s)",
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Bulk create transactions error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao criar transações em lote: {str(e)}")
+
 @api_router.get("/transactions/categories")
 async def get_categories():
     """Obter categorias"""
@@ -976,27 +1589,110 @@ async def get_payment_methods():
         ]
     }
 
+@api_router.get("/transactions/changes")
+async def get_transaction_changes(
+    since: Optional[str] = None,
+    limit: int = Query(CHANGES_DEFAULT_LIMIT, ge=1, le=CHANGES_MAX_LIMIT),
+    fields: Optional[str] = None
+):
+    """Obter transações criadas/alteradas e excluídas desde o watermark"""
+    try:
+        watermark, watermark_id = parse_watermark(since) if since else (None, None)
+        projection = build_projection(fields, required=["updatedAt"])
+        
+        # Tombstones older than the retention window are gone: client must resync
+        if watermark and watermark < datetime.utcnow() - DELETION_LOG_RETENTION:
+            return {"reset": True, "changes": [], "deleted": [], "watermark": None, "has_more": False}
+        
+        # Strictly after (updatedAt, _id): ties on updatedAt resume after the last _id
+        changed_filter = {}
+        if watermark and watermark_id:
+            changed_filter = {"$or": [
+                {"updatedAt": {"$gt": watermark}},
+                {"updatedAt": watermark, "_id": {"$gt": watermark_id}}
+            ]}
+        elif watermark:
+            changed_filter = {"updatedAt": {"$gt": watermark}}
+        changes = await db.transactions.find(changed_filter, projection)\
+            .sort([("updatedAt", 1), ("_id", 1)])\
+            .limit(limit + 1)\
+            .to_list(limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        # On a partial page only report deletions up to the last change returned,
+        # so the next call resumes from a single consistent watermark
+        deleted_range = {}
+        if watermark:
+            deleted_range["$gt"] = watermark
+        if has_more:
+            deleted_range["$lte"] = changes[-1]["updatedAt"]
+        deleted_filter = {"deletedAt": deleted_range} if deleted_range else {}
+        deletions = await db.transaction_deletions.find(deleted_filter).sort("deletedAt", 1).to_list(None)
+        
+        # The _id tie-breaker is kept only while the watermark time is the last change's
+        # (on a tie max() keeps the first candidate, so the last change wins)
+        candidates = [(changes[-1]["updatedAt"], changes[-1]["_id"])] if changes else []
+        if watermark:
+            candidates.append((watermark, watermark_id))
+        if deletions:
+            candidates.append((deletions[-1]["deletedAt"], None))
+        new_watermark, new_watermark_id = max(candidates, key=lambda candidate: candidate[0]) if candidates else (None, None)
+        
+        return {
+            "reset": any(d.get("reset") for d in deletions),
+            "changes": [serialize_transaction(transaction) for transaction in changes],
+            "deleted": [d["transactionId"] for d in deletions if d.get("transactionId")],
+            "watermark": encode_watermark(new_watermark, new_watermark_id) if new_watermark else None,
+            "has_more": has_more
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Transaction changes error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting transaction changes")
+
 @api_router.get("/transactions/summary")
-async def get_transaction_summary():
+@cached_report("summary")
+async def get_transaction_summary(source: str = "transactions"):
     """Obter resumo das transações"""
     try:
-        # Get transactions from database
-        transactions = await db.transactions.find({}).to_list(None)
-        
-        total_entradas = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'entrada')
-        total_saidas = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'saida')
-        saldo_atual = total_entradas - total_saidas
-        
-        # Count today's transactions
         today = date.today().strftime("%Y-%m-%d")
-        transacoes_hoje = len([t for t in transactions if t.get('date') == today or t.get('transactionDate') == today])
         
-        # Count unique clients
-        clientes_atendidos = len(set(t.get('client', '') for t in transactions if t.get('client')))
+        if source == "rollups":
+            return await summary_from_rollups(today)
+        
+        # One aggregation returning only the numbers, instead of shipping the whole ledger
+        pipeline = [
+            {"$project": {"type": 1, "amount": 1, "date": 1, "transactionDate": 1, "client": 1}},
+            {"$facet": {
+                "totals": [
+                    {"$match": {"type": {"$in": ["entrada", "saida"]}}},
+                    {"$group": {"_id": "$type", "total": {"$sum": {"$ifNull": ["$amount", 0]}}, "count": {"$sum": 1}}}
+                ],
+                "today": [
+                    {"$match": {"$or": [{"date": today}, {"transactionDate": today}]}},
+                    {"$count": "count"}
+                ],
+                "clients": [
+                    {"$match": {"client": {"$nin": [None, ""]}}},
+                    {"$group": {"_id": "$client"}},
+                    {"$count": "count"}
+                ]
+            }}
+        ]
+        result = (await db.transactions.aggregate(pipeline).to_list(1))[0]
+        
+        totals = {row["_id"]: row for row in result["totals"]}
+        total_entradas = totals.get("entrada", {}).get("total", 0)
+        total_saidas = totals.get("saida", {}).get("total", 0)
+        saldo_atual = total_entradas - total_saidas
+        transacoes_hoje = result["today"][0]["count"] if result["today"] else 0
+        clientes_atendidos = result["clients"][0]["count"] if result["clients"] else 0
         
         # Calculate average ticket
-        entrada_transactions = [t for t in transactions if t.get('type') == 'entrada']
-        ticket_medio = total_entradas / len(entrada_transactions) if entrada_transactions else 0
+        entradas_count = totals.get("entrada", {}).get("count", 0)
+        ticket_medio = total_entradas / entradas_count if entradas_count else 0
         
         return {
             "totalEntradas": total_entradas,
@@ -1010,242 +1706,763 @@ async def get_transaction_summary():
         logging.error(f"Summary error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting summary")
 
+# Report metrics computed from daily_rollups totals (source=rollups)
+async def summary_from_rollups(today: str) -> dict:
+    """Resumo do dashboard a partir dos rollups diários"""
+    totals, _ = await combined_period_totals(db, use_rollups=True)
+    entrada = totals.get("entrada", empty_totals())
+    saida = totals.get("saida", empty_totals())
+    # Today's count and distinct clients are not part of the rollup key
+    transacoes_hoje = await db.transactions.count_documents(
+        {"$or": [{"date": today}, {"effectiveDate": to_effective_date(today)}]}
+    )
+    clients = await db.transactions.aggregate([
+        {"$match": {"client": {"$nin": [None, ""]}}},
+        {"$group": {"_id": "$client"}},
+        {"$count": "count"}
+    ]).to_list(1)
+    return {
+        "totalEntradas": entrada["amount"],
+        "totalSaidas": saida["amount"],
+        "saldoAtual": entrada["amount"] - saida["amount"],
+        "transacoesHoje": transacoes_hoje,
+        "clientesAtendidos": clients[0]["count"] if clients else 0,
+        "ticketMedio": entrada["amount"] / entrada["count"] if entrada["count"] else 0
+    }
+
+# Shared period scans: concurrent requests for the same period wait on one scan
+period_scans_in_flight = {}
+
+async def scan_period_report(date_filter: dict, projection: Optional[dict]) -> PeriodReport:
+    """Varredura do período; com meses fechados no intervalo, os totais vêm dos snapshots"""
+    report = await scan_period(db, date_filter, projection, serialize_transaction)
+    day_range = date_filter.get("effectiveDate")
+    if await has_snapshots(db, day_range):
+        report.totals, _ = await combined_period_totals(db, day_range)
+    return report
+
+async def get_period_report(start_date: Optional[str], end_date: Optional[str], fields: Optional[str]) -> PeriodReport:
+    """Obter o relatório do período (uma varredura compartilhada pelos três relatórios)"""
+    date_filter = build_period_filter(start_date, end_date)
+    projection = build_projection(fields, required=REPORT_REQUIRED_FIELDS)
+    generation = await get_generation(db, "transactions")
+    key = ("period-scan", generation, start_date, end_date, fields)
+    
+    report = report_cache.get(key)
+    if report is not None:
+        return report
+    
+    scan = period_scans_in_flight.get(key)
+    if scan is None:
+        scan = asyncio.ensure_future(scan_period_report(date_filter, projection))
+        period_scans_in_flight[key] = scan
+        scan.add_done_callback(lambda _: period_scans_in_flight.pop(key, None))
+    # Shielded: a disconnecting client must not cancel the scan other requests wait on
+    report = await asyncio.shield(scan)
+    report_cache.set(key, report, weight=len(report.transactions))
+    return report
+
+# include=summary|details: metrics only, or metrics plus one page per bucket
+REPORT_PAGE_DEFAULT_LIMIT = 100
+# Response key -> transaction type of each report's detail buckets
+SALES_ANALYSIS_BUCKETS = {"transactions": "entrada_vendas", "supplier_payments": "saida_vendas"}
+COMPLETE_ANALYSIS_BUCKETS = {
+    "entradas_vendas": "entrada_vendas", "entradas_outras": "entrada",
+    "saidas_vendas": "saida_vendas", "saidas_outras": "saida"
+}
+SALES_PERFORMANCE_BUCKETS = {"entrada_vendas": "entrada_vendas", "saida_vendas": "saida_vendas"}
+
+async def report_totals(start_date: Optional[str], end_date: Optional[str], use_rollups: bool = False) -> dict:
+    """Totais por tipo do período: snapshots dos meses fechados + agregação do restante (transações ou rollups)"""
+    totals, _ = await combined_period_totals(db, build_period_filter(start_date, end_date).get("effectiveDate"), use_rollups)
+    return totals
+
+async def fetch_report_page(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    bucket: str,
+    cursor: Optional[str] = None,
+    limit: int = REPORT_PAGE_DEFAULT_LIMIT,
+    fields: Optional[str] = None
+) -> dict:
+    """Página de transações de um bucket (tipo) do período"""
+    if bucket not in REPORT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Bucket inválido: {bucket}")
+    filters = combine_filters(build_period_filter(start_date, end_date), {"type": bucket})
+    projection = build_projection(fields, required=["date", "time"])
+    return {"bucket": bucket, **await fetch_transactions_page(filters, projection, cursor, limit)}
+
+async def report_details(start_date, end_date, buckets: dict, limit: int, fields: Optional[str]) -> dict:
+    """Primeira página de cada bucket do relatório (chave da resposta -> tipo)"""
+    pages = await asyncio.gather(*[
+        fetch_report_page(start_date, end_date, bucket, limit=limit, fields=fields)
+        for bucket in buckets.values()
+    ])
+    return dict(zip(buckets.keys(), pages))
+
+def validate_include(include: Optional[str]):
+    """Validar o parâmetro include dos relatórios"""
+    if include not in (None, "summary", "details"):
+        raise HTTPException(status_code=400, detail="include deve ser 'summary' ou 'details'")
+
+@reports_router.get("/transactions")
+async def get_report_transactions(
+    bucket: str,
+    start_date: str = None,
+    end_date: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(REPORT_PAGE_DEFAULT_LIMIT, ge=1, le=TRANSACTIONS_MAX_LIMIT),
+    fields: Optional[str] = None
+):
+    """Paginar as transações de um bucket dos relatórios (include=details)"""
+    try:
+        return await fetch_report_page(start_date, end_date, bucket, cursor, limit, fields)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Report transactions error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting report transactions")
+
 @reports_router.get("/sales-analysis")
-async def get_sales_analysis(start_date: str = None, end_date: str = None):
+@cached_report("sales-analysis")
+async def get_sales_analysis(
+    start_date: str = None,
+    end_date: str = None,
+    fields: Optional[str] = None,
+    source: str = "transactions",
+    include: Optional[str] = None,
+    limit: int = Query(REPORT_PAGE_DEFAULT_LIMIT, ge=1, le=TRANSACTIONS_MAX_LIMIT)
+):
     """Obter análise de vendas por período - APENAS entrada_vendas e saida_vendas"""
     try:
-        # Build date filter
-        date_filter = {}
-        if start_date and end_date:
-            date_filter = {
-                "$or": [
-                    {"date": {"$gte": start_date, "$lte": end_date}},
-                    {"transactionDate": {"$gte": start_date, "$lte": end_date}}
-                ]
-            }
-        
-        # Get ALL transactions in period
-        all_transactions = await db.transactions.find(date_filter).to_list(None)
-        
-        # Convert ObjectIds to strings for JSON serialization
-        for transaction in all_transactions:
-            transaction["id"] = str(transaction["_id"])
-            transaction["_id"] = str(transaction["_id"])
-            # Convert datetime objects to strings
-            if "createdAt" in transaction:
-                transaction["createdAt"] = transaction["createdAt"].isoformat()
-            if "updatedAt" in transaction:
-                transaction["updatedAt"] = transaction["updatedAt"].isoformat()
-        
-        # NOVA LÓGICA: APENAS entrada_vendas e saida_vendas (vendas puras)
-        entrada_vendas = [t for t in all_transactions if t.get('type') == 'entrada_vendas']
-        saida_vendas = [t for t in all_transactions if t.get('type') == 'saida_vendas']
-        
-        # Calculate sales metrics (handle None values)
-        total_sales = sum((t.get('saleValue') or 0) if t.get('saleValue') is not None else (t.get('amount') or 0) for t in entrada_vendas)
-        
-        # Calculate supplier costs APENAS from saida_vendas
-        total_supplier_costs = 0
-        
-        # From entrada_vendas (direct supplier cost field)
-        for transaction in entrada_vendas:
-            if transaction.get("supplierValue"):
-                total_supplier_costs += transaction.get("supplierValue", 0)
-        
-        # From saida_vendas (supplier payments and sales commissions)
-        for transaction in saida_vendas:
-            total_supplier_costs += transaction.get("amount", 0)
+        period = {"start_date": start_date, "end_date": end_date}
+        validate_include(include)
         
-        # Calculate commissions ONLY from entrada_vendas (direct commission field)
-        total_commissions = 0
+        if source == "rollups":
+            totals = await report_totals(start_date, end_date, use_rollups=True)
+            return {"period": period, "sales": sales_analysis_from_totals(totals), "source": "rollups"}
         
-        # From entrada_vendas (direct commission field only)
-        for transaction in entrada_vendas:
-            if transaction.get("commissionValue"):
-                total_commissions += transaction.get("commissionValue", 0)
-        
-        net_profit = total_sales - total_supplier_costs - total_commissions
-        
-        # Count transactions
-        sales_count = len(entrada_vendas)
-        average_sale = total_sales / sales_count if sales_count > 0 else 0
+        if include:
+            result = {"period": period, "sales": sales_analysis_from_totals(await report_totals(start_date, end_date))}
+            if include == "details":
+                result["details"] = await report_details(start_date, end_date, SALES_ANALYSIS_BUCKETS, limit, fields)
+            return result
         
+        report = await get_period_report(start_date, end_date, fields)
         return {
-            "period": {"start_date": start_date, "end_date": end_date},
-            "sales": {
-                "total_sales": total_sales,
-                "total_supplier_costs": total_supplier_costs,
-                "total_commissions": total_commissions,
-                "net_profit": net_profit,
-                "sales_count": sales_count,
-                "average_sale": average_sale
-            },
-            "transactions": entrada_vendas,
-            "supplier_payments": saida_vendas
+            "period": period,
+            "sales": sales_analysis_from_totals(report.totals),
+            "transactions": report.buckets["entrada_vendas"],
+            "supplier_payments": report.buckets["saida_vendas"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Sales analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting sales analysis")
 
 @reports_router.get("/complete-analysis")
-async def get_complete_analysis(start_date: str = None, end_date: str = None):
+@cached_report("complete-analysis")
+async def get_complete_analysis(
+    start_date: str = None,
+    end_date: str = None,
+    fields: Optional[str] = None,
+    source: str = "transactions",
+    include: Optional[str] = None,
+    limit: int = Query(REPORT_PAGE_DEFAULT_LIMIT, ge=1, le=TRANSACTIONS_MAX_LIMIT)
+):
     """Obter análise completa por período - TODAS as entradas e saídas (vendas + outras)"""
     try:
-        # Build date filter
-        date_filter = {}
-        if start_date and end_date:
-            date_filter = {
-                "$or": [
-                    {"date": {"$gte": start_date, "$lte": end_date}},
-                    {"transactionDate": {"$gte": start_date, "$lte": end_date}}
-                ]
-            }
-        
-        # Get all transactions in period
-        transactions = await db.transactions.find(date_filter).to_list(None)
-        
-        # Convert ObjectIds to strings for JSON serialization
-        for transaction in transactions:
-            transaction["id"] = str(transaction["_id"])
-            transaction["_id"] = str(transaction["_id"])
-            # Convert datetime objects to strings
-            if "createdAt" in transaction:
-                transaction["createdAt"] = transaction["createdAt"].isoformat()
-            if "updatedAt" in transaction:
-                transaction["updatedAt"] = transaction["updatedAt"].isoformat()
-        
-        # Separate by type (include ALL entrada and saida types)
-        entradas_vendas = [t for t in transactions if t.get('type') == 'entrada_vendas']
-        entradas_outras = [t for t in transactions if t.get('type') == 'entrada']
-        saidas_vendas = [t for t in transactions if t.get('type') == 'saida_vendas']
-        saidas_outras = [t for t in transactions if t.get('type') == 'saida']
-        
-        # Combine for totals
-        entradas_todas = entradas_vendas + entradas_outras
-        saidas_todas = saidas_vendas + saidas_outras
-        
-        # Calculate totals
-        total_entradas_vendas = sum(t.get('amount', 0) for t in entradas_vendas)
-        total_entradas_outras = sum(t.get('amount', 0) for t in entradas_outras)
-        total_entradas = total_entradas_vendas + total_entradas_outras
+        period = {"start_date": start_date, "end_date": end_date}
+        validate_include(include)
         
-        total_saidas_vendas = sum(t.get('amount', 0) for t in saidas_vendas)
-        total_saidas_outras = sum(t.get('amount', 0) for t in saidas_outras)
-        total_saidas = total_saidas_vendas + total_saidas_outras
+        if source == "rollups":
+            totals = await report_totals(start_date, end_date, use_rollups=True)
+            return {"period": period, "summary": complete_analysis_from_totals(totals), "source": "rollups"}
         
-        balance = total_entradas - total_saidas
+        if include:
+            result = {"period": period, "summary": complete_analysis_from_totals(await report_totals(start_date, end_date))}
+            if include == "details":
+                result["details"] = await report_details(start_date, end_date, COMPLETE_ANALYSIS_BUCKETS, limit, fields)
+            return result
         
+        report = await get_period_report(start_date, end_date, fields)
         return {
-            "period": {"start_date": start_date, "end_date": end_date},
-            "summary": {
-                "total_entradas": total_entradas,
-                "total_entradas_vendas": total_entradas_vendas,
-                "total_entradas_outras": total_entradas_outras,
-                "total_saidas": total_saidas,
-                "total_saidas_vendas": total_saidas_vendas,
-                "total_saidas_outras": total_saidas_outras,
-                "balance": balance,
-                "entradas_vendas_count": len(entradas_vendas),
-                "entradas_outras_count": len(entradas_outras),
-                "saidas_vendas_count": len(saidas_vendas),
-                "saidas_outras_count": len(saidas_outras)
-            },
-            "entradas_vendas": entradas_vendas,
-            "entradas_outras": entradas_outras,
-            "saidas_vendas": saidas_vendas,
-            "saidas_outras": saidas_outras,
-            "all_transactions": transactions
+            "period": period,
+            "summary": complete_analysis_from_totals(report.totals),
+            "entradas_vendas": report.buckets["entrada_vendas"],
+            "entradas_outras": report.buckets["entrada"],
+            "saidas_vendas": report.buckets["saida_vendas"],
+            "saidas_outras": report.buckets["saida"],
+            "all_transactions": report.transactions
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Complete analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting complete analysis")
 
 @reports_router.get("/sales-performance")
-async def get_sales_performance(start_date: str = None, end_date: str = None):
+@cached_report("sales-performance")
+async def get_sales_performance(
+    start_date: str = None,
+    end_date: str = None,
+    fields: Optional[str] = None,
+    source: str = "transactions",
+    include: Optional[str] = None,
+    limit: int = Query(REPORT_PAGE_DEFAULT_LIMIT, ge=1, le=TRANSACTIONS_MAX_LIMIT)
+):
     """Analytics específico de vendas - APENAS entrada_vendas + saida_vendas"""
     try:
-        # Build date filter
-        date_filter = {}
-        if start_date and end_date:
-            date_filter = {
-                "$or": [
-                    {"date": {"$gte": start_date, "$lte": end_date}},
-                    {"transactionDate": {"$gte": start_date, "$lte": end_date}}
-                ]
-            }
-        
-        # Get ALL transactions in period
-        all_transactions = await db.transactions.find(date_filter).to_list(None)
+        period = {"start_date": start_date, "end_date": end_date}
+        validate_include(include)
         
-        # Convert ObjectIds to strings for JSON serialization
-        for transaction in all_transactions:
-            transaction["id"] = str(transaction["_id"])
-            transaction["_id"] = str(transaction["_id"])
-            if "createdAt" in transaction:
-                transaction["createdAt"] = transaction["createdAt"].isoformat()
-            if "updatedAt" in transaction:
-                transaction["updatedAt"] = transaction["updatedAt"].isoformat()
+        if source == "rollups":
+            totals = await report_totals(start_date, end_date, use_rollups=True)
+            return {"sales": sales_performance_from_totals(totals), "period": period, "source": "rollups"}
         
-        # NOVA LÓGICA: APENAS entrada_vendas e saida_vendas (vendas puras)
-        entrada_vendas = [t for t in all_transactions if t.get('type') == 'entrada_vendas']
-        saida_vendas = [t for t in all_transactions if t.get('type') == 'saida_vendas']
+        if include:
+            result = {"period": period, "sales": sales_performance_from_totals(await report_totals(start_date, end_date))}
+            if include == "details":
+                result["details"] = await report_details(start_date, end_date, SALES_PERFORMANCE_BUCKETS, limit, fields)
+            return result
         
-        # Calculate sales metrics
-        total_sales = sum(t.get("amount", 0) for t in entrada_vendas)
-        total_quantity = len(entrada_vendas)
-        
-        # Calculate supplier costs from entrada_vendas (direct) and saida_vendas
-        total_supplier_payments = 0
-        
-        # From entrada_vendas (direct supplier cost field)
-        for transaction in entrada_vendas:
-            if transaction.get("supplierValue"):
-                total_supplier_payments += transaction.get("supplierValue", 0)
-        
-        # From saida_vendas (ALL saida_vendas are sales-related costs)
-        for transaction in saida_vendas:
-            total_supplier_payments += transaction.get("amount", 0)
-        
-        # Calculate commissions ONLY from entrada_vendas (direct commission field)
-        total_commissions = 0
-        
-        # From entrada_vendas (direct commission field only)
-        for transaction in entrada_vendas:
-            if transaction.get("commissionValue"):
-                total_commissions += transaction.get("commissionValue", 0)
+        report = await get_period_report(start_date, end_date, fields)
+        return {
+            "sales": sales_performance_from_totals(report.totals),
+            "period": period,
+            "entrada_vendas": report.buckets["entrada_vendas"],
+            "saida_vendas": report.buckets["saida_vendas"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Sales performance error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting sales performance")
+
+@reports_router.get("/timeseries")
+@cached_report("timeseries")
+async def get_timeseries(
+    granularity: str = "day",
+    metric: str = "amount",
+    start_date: str = None,
+    end_date: str = None,
+    source: str = "transactions"
+):
+    """Série temporal de entradas/saídas por dia, semana ou mês"""
+    try:
+        if granularity not in TIMESERIES_GRANULARITIES:
+            raise HTTPException(status_code=400, detail=f"granularity deve ser um de: {', '.join(TIMESERIES_GRANULARITIES)}")
+        if metric not in TIMESERIES_METRICS:
+            raise HTTPException(status_code=400, detail=f"metric deve ser um de: {', '.join(TIMESERIES_METRICS)}")
         
-        # Net profit from sales
-        net_sales_profit = total_sales - total_commissions - total_supplier_payments
+        day_range = build_period_filter(start_date, end_date).get("effectiveDate")
+        series = await period_timeseries(db, granularity, metric, day_range, use_rollups=source == "rollups")
         
-        # Average ticket
-        average_ticket = total_sales / total_quantity if total_quantity > 0 else 0
+        return {
+            "period": {"start_date": start_date, "end_date": end_date},
+            "granularity": granularity,
+            "metric": metric,
+            "series": series
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Timeseries error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting timeseries")
+
+def parse_percentiles(percentiles: Optional[str]) -> List[float]:
+    """Converter "50,90,99" em lista de percentis entre 0 e 100"""
+    if not percentiles:
+        return DEFAULT_PERCENTILES
+    try:
+        values = [float(value) for value in percentiles.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles deve ser uma lista de números separados por vírgula")
+    if not values or any(value < 0 or value > 100 for value in values):
+        raise HTTPException(status_code=400, detail="percentiles deve conter valores entre 0 e 100")
+    return values
+
+@reports_router.get("/breakdown")
+@cached_report("breakdown")
+async def get_breakdown(
+    by: str = "seller",
+    type_filter: Optional[str] = Query("entrada_vendas", alias="type"),
+    start_date: str = None,
+    end_date: str = None,
+    percentiles: Optional[str] = None
+):
+    """Vendas, custos, lucro, margem e percentis do ticket por vendedor, categoria ou tipo"""
+    try:
+        if by not in ANALYTICS_CATEGORICAL_FIELDS:
+            raise HTTPException(status_code=400, detail=f"by deve ser um de: {', '.join(ANALYTICS_CATEGORICAL_FIELDS)}")
+        requested_percentiles = parse_percentiles(percentiles)
         
-        # Sales margin
-        sales_margin = (net_sales_profit / total_sales * 100) if total_sales > 0 else 0
+        match = build_period_filter(start_date, end_date)
+        if type_filter:
+            match = combine_filters(match, {"type": type_filter})
+        frame = await load_frame(db, match)
         
         return {
-            "sales": {
-                "total_sales": total_sales,
-                "total_quantity": total_quantity,
-                "sales_count": total_quantity,
-                "total_commissions": total_commissions,
-                "total_supplier_payments": total_supplier_payments,
-                "net_sales_profit": net_sales_profit,
-                "average_ticket": average_ticket,
-                "average_sale": average_ticket,
-                "sales_margin": sales_margin
-            },
-            "period": {
-                "start_date": start_date,
-                "end_date": end_date
-            },
-            "entrada_vendas": entrada_vendas,
-            "saida_vendas": saida_vendas
+            "period": {"start_date": start_date, "end_date": end_date},
+            "by": by,
+            "type": type_filter,
+            "groups": await asyncio.to_thread(group_breakdown, frame, by, requested_percentiles)
         }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Sales performance error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error getting sales performance")
+        logging.error(f"Breakdown error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting breakdown")
+
+def export_filename(extension: str) -> str:
+    return f"transacoes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+def export_filters(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod) -> dict:
+    """Filtro das transações exportadas (período + filtros da listagem)"""
+    return combine_filters(
+        build_period_filter(start_date, end_date),
+        build_transactions_filter(type_filter, None, None, client, seller, supplier, status_filter, paymentMethod)
+    )
+
+def export_cursor(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod):
+    """Cursor das transações exportadas, só com as colunas exportadas"""
+    filters = export_filters(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod)
+    return db.transactions.find(filters, EXPORT_PROJECTION).sort(TRANSACTIONS_SORT).batch_size(EXPORT_BATCH_SIZE)
+
+@exports_router.get("/transactions.csv")
+async def export_transactions_csv(
+    start_date: str = None,
+    end_date: str = None,
+    type_filter: Optional[str] = Query(None, alias="type"),
+    client: Optional[str] = None,
+    seller: Optional[str] = None,
+    supplier: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    paymentMethod: Optional[str] = None
+):
+    """Exportar transações em CSV, transmitido enquanto o cursor é lido"""
+    try:
+        cursor = export_cursor(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod)
+        return StreamingResponse(
+            iter_csv(cursor),
+            media_type=CSV_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{export_filename("csv")}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"CSV export error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error exporting CSV")
+
+@exports_router.get("/transactions.xlsx")
+async def export_transactions_xlsx(
+    start_date: str = None,
+    end_date: str = None,
+    type_filter: Optional[str] = Query(None, alias="type"),
+    client: Optional[str] = None,
+    seller: Optional[str] = None,
+    supplier: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    paymentMethod: Optional[str] = None
+):
+    """Exportar transações em Excel (.xlsx): uma aba por tipo e uma aba de resumo"""
+    tmp_file_path = None
+    try:
+        cursor = export_cursor(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp_file:
+            tmp_file_path = tmp_file.name
+        await write_xlsx(cursor, tmp_file_path)
+        return FileResponse(
+            tmp_file_path,
+            filename=export_filename("xlsx"),
+            media_type=XLSX_MEDIA_TYPE,
+            background=BackgroundTask(os.unlink, tmp_file_path)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        if tmp_file_path and os.path.exists(tmp_file_path):
+            os.unlink(tmp_file_path)
+        logging.error(f"XLSX export error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error exporting XLSX")
+
+@exports_router.get("/transactions.parquet")
+async def export_transactions_parquet(
+    start_date: str = None,
+    end_date: str = None,
+    type_filter: Optional[str] = Query(None, alias="type"),
+    client: Optional[str] = None,
+    seller: Optional[str] = None,
+    supplier: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    paymentMethod: Optional[str] = None
+):
+    """Exportar o livro de transações em Parquet (schema Arrow tipado, gerado em lotes)"""
+    try:
+        filters = export_filters(start_date, end_date, type_filter, client, seller, supplier, status_filter, paymentMethod)
+        projection = {field.name: 1 for field in TRANSACTION_ARROW_SCHEMA if field.name != "id"}
+        cursor = db.transactions.find(filters, projection).sort(TRANSACTIONS_SORT).batch_size(EXPORT_BATCH_SIZE)
+        return StreamingResponse(
+            iter_parquet(cursor, TRANSACTION_ARROW_SCHEMA),
+            media_type=PARQUET_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{export_filename("parquet")}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Parquet export error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error exporting Parquet")
+
+async def build_pdf_report_payload(start_date: Optional[str], end_date: Optional[str]) -> dict:
+    """Payload compacto e pré-agregado do relatório em PDF (é o que atravessa para o processo de renderização)"""
+    totals = await report_totals(start_date, end_date)
+    sales_frame = await load_frame(db, combine_filters(build_period_filter(start_date, end_date), {"type": "entrada_vendas"}))
+    company = await db.company_settings.find_one({}, {"name": 1})
+    return {
+        "company": company.get("name") if company else None,
+        "period": {"start_date": start_date, "end_date": end_date},
+        "generatedAt": datetime.now().strftime("%d/%m/%Y %H:%M"),
+        "summary": complete_analysis_from_totals(totals),
+        "sales": sales_analysis_from_totals(totals),
+        "sellers": (await asyncio.to_thread(group_breakdown, sales_frame, "seller"))[:PDF_BREAKDOWN_ROWS],
+        "categories": (await asyncio.to_thread(group_breakdown, sales_frame, "category"))[:PDF_BREAKDOWN_ROWS]
+    }
+
+@exports_router.get("/report.pdf")
+async def export_report_pdf(start_date: str = None, end_date: str = None):
+    """Exportar o relatório do período em PDF (renderizado fora do event loop)"""
+    tmp_file_path = None
+    try:
+        payload = await build_pdf_report_payload(start_date, end_date)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            tmp_file_path = tmp_file.name
+        await render_pdf(payload, tmp_file_path)
+        return FileResponse(
+            tmp_file_path,
+            filename=f"relatorio_caixa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            media_type="application/pdf",
+            background=BackgroundTask(os.unlink, tmp_file_path)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        if tmp_file_path and os.path.exists(tmp_file_path):
+            os.unlink(tmp_file_path)
+        logging.error(f"PDF export error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error generating PDF report")
+
+# Background export jobs (POST /exports -> GET /exports/{id} -> download)
+EXPORT_JOB_PARAMS = ["start_date", "end_date", "type", "client", "seller", "supplier", "status", "paymentMethod"]
+export_workers = ExportWorkerPool()
+
+class ExportJobCreate(BaseModel):
+    format: str
+    params: dict = {}
+
+def export_job_filter_args(params: dict) -> list:
+    """Argumentos de export_filters/export_cursor a partir dos parâmetros do job"""
+    return [params.get(name) for name in EXPORT_JOB_PARAMS]
+
+async def run_csv_export_job(job: dict, path: str, progress) -> dict:
+    """Job CSV: mesmo conteúdo de GET /exports/transactions.csv, gravado em disco"""
+    args = export_job_filter_args(job["params"])
+    total = await db.transactions.count_documents(export_filters(*args))
+    with open(path, "wb") as artifact:
+        async for chunk in iter_csv(counted(export_cursor(*args), progress, total)):
+            artifact.write(chunk)
+    return {"filename": export_filename("csv"), "mediaType": CSV_MEDIA_TYPE}
+
+async def run_xlsx_export_job(job: dict, path: str, progress) -> dict:
+    """Job XLSX: mesmo conteúdo de GET /exports/transactions.xlsx"""
+    args = export_job_filter_args(job["params"])
+    total = await db.transactions.count_documents(export_filters(*args))
+    await write_xlsx(counted(export_cursor(*args), progress, total), path)
+    return {"filename": export_filename("xlsx"), "mediaType": XLSX_MEDIA_TYPE}
+
+async def run_pdf_export_job(job: dict, path: str, progress) -> dict:
+    """Job PDF: relatório do período renderizado no pool de processos"""
+    await progress(0, 1)
+    payload = await build_pdf_report_payload(job["params"].get("start_date"), job["params"].get("end_date"))
+    await render_pdf(payload, path)
+    await progress(1)
+    return {"filename": f"relatorio_caixa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf", "mediaType": "application/pdf"}
+
+async def run_user_data_export_job(job: dict, path: str, progress) -> dict:
+    """Job user-data: dados do usuário (sem senha) e todas as transações, em JSON gravado em fluxo"""
+    user = await db.users.find_one({"_id": ObjectId(job["createdBy"])}, {"password": 0})
+    if not user:
+        raise ValueError("Usuário não encontrado")
+    user["_id"] = str(user["_id"])
+    total = await db.transactions.count_documents({})
+    exported = 0
+    with open(path, "w", encoding="utf-8") as artifact:
+        artifact.write('{"user": ' + json.dumps(user, default=str, ensure_ascii=False))
+        artifact.write(', "exportDate": ' + json.dumps(datetime.utcnow().isoformat()) + ', "transactions": [')
+        async for transaction in counted(db.transactions.find({}).batch_size(EXPORT_BATCH_SIZE), progress, total):
+            artifact.write(("," if exported else "") + json.dumps(serialize_transaction(transaction), default=str, ensure_ascii=False))
+            exported += 1
+        artifact.write(f'], "totalTransactions": {exported}}}')
+    return {"filename": f"dados_usuario_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", "mediaType": "application/json"}
+
+EXPORT_RUNNERS = {
+    "csv": run_csv_export_job,
+    "xlsx": run_xlsx_export_job,
+    "pdf": run_pdf_export_job,
+    "user-data": run_user_data_export_job
+}
+
+async def get_owned_job(job_id: str, current_user: dict, kind: Optional[str] = None) -> dict:
+    """Job do usuário atual (404 se não existir, for de outro usuário ou de outro kind)"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    query = {"_id": ObjectId(job_id), "createdBy": current_user["id"]}
+    if kind:
+        query["kind"] = kind
+    job = await db[JOBS_COLLECTION].find_one(query)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return job
+
+@exports_router.post("", status_code=202)
+async def create_export_job(request: ExportJobCreate, current_user: dict = Depends(get_current_user)):
+    """Enfileirar uma exportação em segundo plano (csv, xlsx, pdf ou user-data)"""
+    try:
+        if request.format not in EXPORT_RUNNERS:
+            raise HTTPException(status_code=400, detail=f"format deve ser um de: {', '.join(EXPORT_RUNNERS)}")
+        unknown = set(request.params) - set(EXPORT_JOB_PARAMS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Parâmetros inválidos: {', '.join(sorted(unknown))}")
+        params = {name: str(value) for name, value in request.params.items() if value not in (None, "")}
+        build_period_filter(params.get("start_date"), params.get("end_date"))
+        
+        job = await create_job(db, request.format, params, current_user["id"])
+        export_workers.notify()
+        return job_response(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Create export job error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao criar exportação")
+
+@exports_router.get("/{job_id}")
+async def get_export_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status e progresso de uma exportação"""
+    try:
+        return job_response(await get_owned_job(job_id, current_user))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Get export job error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao obter exportação")
+
+@exports_router.get("/{job_id}/download")
+async def download_export_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Baixar o arquivo de uma exportação concluída"""
+    try:
+        job = await get_owned_job(job_id, current_user)
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Exportação ainda não concluída ({job['status']})")
+        artifact = job["artifact"]
+        if not os.path.exists(artifact["path"]):
+            raise HTTPException(status_code=410, detail="Arquivo da exportação expirou")
+        return FileResponse(artifact["path"], filename=artifact["filename"], media_type=artifact["mediaType"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Download export job error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao baixar exportação")
+
+# Transaction import (POST /import/transactions -> GET /import/transactions/{id});
+# runs on the export worker pool, the job artifact is the row error report.
+# After each batch the job stores a checkpoint (rows done, result so far, size
+# of the error report), so a reclaimed job (crash, shutdown) resumes after the
+# last committed batch instead of replaying the file. Each row's sale gets an
+# _id derived from the job and the row, which lets the resumed run recognize
+# the rows of the one batch that may have been written after the checkpoint.
+# If the crash fell between that batch's insert and its rollups, those rows
+# are counted but their rollups are not reapplied (POST /api/admin/rebuild-rollups).
+IMPORT_ERROR_HEADERS = ["Planilha", "Linha", "Campo", "Erro"]
+IMPORT_ERROR_SAMPLE = 100
+
+def import_row_id(job_id: ObjectId, sheet: Optional[str], row_number: int) -> ObjectId:
+    """_id determinístico da venda de uma linha importada (tempo do job + hash da linha)"""
+    digest = hashlib.sha256(f"{job_id} {sheet or ''} {row_number}".encode("utf-8")).digest()
+    return ObjectId(job_id.binary[:4] + digest[:8])
+
+def resume_import_report(previous: Optional[str], size: int, path: str) -> bool:
+    """Copiar o relatório de erros da tentativa anterior até o checkpoint; False se ele não existir mais"""
+    if not previous or not os.path.exists(previous):
+        return False
+    with open(previous, "rb") as source, open(path, "wb") as target:
+        while size > 0:
+            chunk = source.read(min(size, 1024 * 1024))
+            if not chunk:
+                break
+            target.write(chunk)
+            size -= len(chunk)
+    if previous != path:
+        os.unlink(previous)
+    return True
+
+async def committed_import_items(item_documents: dict) -> set:
+    """Itens já gravados por inteiro por uma tentativa anterior; gravações parciais são removidas"""
+    sale_ids = [sale["_id"] for sale, _ in item_documents.values()]
+    references = [str(sale_id) for sale_id in sale_ids]
+    sales = {document["_id"] for document in await db.transactions.find({"_id": {"$in": sale_ids}}, {"_id": 1}).to_list(None)}
+    expenses = {}
+    async for document in db.transactions.find({"originalTransactionId": {"$in": references}, "autoGenerated": True}, {"originalTransactionId": 1}):
+        expenses[document["originalTransactionId"]] = expenses.get(document["originalTransactionId"], 0) + 1
+    
+    committed, partial = set(), []
+    for index, (sale, generated) in item_documents.items():
+        written = (sale["_id"] in sales) + expenses.get(str(sale["_id"]), 0)
+        if written == 1 + len(generated):
+            committed.add(index)
+        elif written:
+            partial.append(sale["_id"])
+    if partial:
+        await db.transactions.delete_many({"$or": [
+            {"_id": {"$in": partial}},
+            {"originalTransactionId": {"$in": [str(sale_id) for sale_id in partial]}, "autoGenerated": True}
+        ]})
+    return committed
+
+async def run_transactions_import_job(job: dict, path: str, progress) -> dict:
+    """Job de importação: lê o arquivo em lotes, valida, grava com insert_many e registra os erros por linha"""
+    source = job["source"]
+    checkpoint = job.get("checkpoint") or {}
+    result = checkpoint.get("result") or {"rows": 0, "created": 0, "failed": 0, "generatedExpenses": 0, "errors": []}
+    created_before = result["created"]
+    rows = iter_import_rows(source["path"], source["format"])
+    try:
+        await progress(result["rows"], await asyncio.to_thread(estimate_rows, source["path"], source["format"]))
+        # Resuming: skip the committed rows (same batch boundaries as the first run)
+        skipped = 0
+        while skipped < result["rows"]:
+            skipped_batch = await asyncio.to_thread(next_batch, rows, TransactionCreate, min(IMPORT_BATCH_ROWS, result["rows"] - skipped))
+            if not skipped_batch:
+                break
+            skipped += len(skipped_batch)
+        resumed = bool(checkpoint) and await asyncio.to_thread(resume_import_report, checkpoint.get("report"), checkpoint.get("reportBytes", 0), path)
+        
+        with open(path, "a" if resumed else "w", newline="", encoding="utf-8") as report:
+            writer = csv.writer(report)
+            if not resumed:
+                writer.writerow(IMPORT_ERROR_HEADERS)
+            # Only the first batch after a checkpoint can hold rows an earlier attempt wrote
+            redo = bool(checkpoint)
+            while True:
+                # Reading and parsing the next rows is blocking work; keep it off the loop
+                batch = await asyncio.to_thread(next_batch, rows, TransactionCreate, IMPORT_BATCH_ROWS)
+                if not batch:
+                    break
+                
+                item_documents, row_errors = {}, {}
+                for index, (sheet, row_number, payload) in enumerate(batch):
+                    errors = payload.pop("_errors", [])
+                    try:
+                        transaction = TransactionCreate.model_validate(payload)
+                    except ValidationError as e:
+                        # Cells that failed conversion are already reported; skip their "required" errors
+                        failed_fields = {error["field"] for error in errors}
+                        errors += [error for error in validation_errors(e) if error["field"] not in failed_fields]
+                    if errors:
+                        row_errors[index] = errors
+                    else:
+                        item_documents[index] = build_transaction_documents(transaction, import_row_id(job["_id"], sheet, row_number))
+                
+                committed = await committed_import_items(item_documents) if redo else set()
+                redo = False
+                row_errors.update(await insert_transaction_groups({
+                    index: documents for index, documents in item_documents.items() if index not in committed
+                }))
+                
+                for index, (sale, expenses) in item_documents.items():
+                    if index not in row_errors:
+                        result["created"] += 1
+                        result["generatedExpenses"] += len(expenses)
+                for index in sorted(row_errors):
+                    sheet, row_number, _ = batch[index]
+                    for error in row_errors[index]:
+                        writer.writerow([sheet or "", row_number, error["field"] or "", error["message"]])
+                        if len(result["errors"]) < IMPORT_ERROR_SAMPLE:
+                            result["errors"].append({"sheet": sheet, "row": row_number, **error})
+                result["failed"] += len(row_errors)
+                result["rows"] += len(batch)
+                report.flush()
+                await progress(result["rows"], checkpoint={"result": result, "report": path, "reportBytes": report.tell()})
+            # The total was an estimate (blank lines, skipped sheets)
+            await progress(result["rows"], result["rows"])
+    except Exception:
+        # Failed for good (the job is marked failed, not retried): drop the upload
+        Path(source["path"]).unlink(missing_ok=True)
+        raise
+    finally:
+        rows.close()
+        if result["created"] > created_before:
+            await invalidate_transaction_caches()
+    # Done: the upload is no longer needed. A crash or shutdown (cancellation)
+    # skips this, keeping the file for the reclaimed job to resume from
+    Path(source["path"]).unlink(missing_ok=True)
+    return {
+        "filename": f"erros_importacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        "mediaType": CSV_MEDIA_TYPE,
+        "result": result
+    }
+
+IMPORT_RUNNERS = {
+    "import-transactions": run_transactions_import_job
+}
+
+@api_router.post("/import/transactions", status_code=202)
+async def import_transactions(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """Importar transações de um arquivo CSV ou XLSX em segundo plano"""
+    source_path = None
+    try:
+        import_format = IMPORT_FORMATS.get(Path(file.filename or "").suffix.lower())
+        if import_format is None:
+            raise HTTPException(status_code=400, detail=f"Arquivo deve ser {' ou '.join(IMPORT_FORMATS)}")
+        
+        # Uploads live next to the artifacts, so an abandoned one is swept with them
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        source_path = EXPORT_DIR / f"upload_{uuid.uuid4().hex}.{import_format}"
+        with open(source_path, "wb") as target:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, target, 1024 * 1024)
+        
+        try:
+            sheets = await asyncio.to_thread(import_headers, str(source_path), import_format)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Arquivo inválido ou corrompido")
+        if not any(not missing_required(map_headers(headers, TransactionCreate)) for headers in sheets.values()):
+            raise HTTPException(status_code=400, detail=f"Colunas obrigatórias ausentes; o arquivo deve ter: {', '.join(IMPORT_REQUIRED_FIELDS)}")
+        
+        job = await create_job(
+            db, "import-transactions", {"filename": file.filename}, current_user["id"],
+            source={"path": str(source_path), "format": import_format}, kind="import"
+        )
+        export_workers.notify()
+        return job_response(job)
+    except HTTPException:
+        if source_path is not None:
+            source_path.unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        if source_path is not None:
+            source_path.unlink(missing_ok=True)
+        logging.error(f"Import transactions error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao iniciar importação")
+
+@api_router.get("/import/transactions/{job_id}")
+async def get_import_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status, progresso e erros de uma importação (relatório de erros em /exports/{id}/download)"""
+    try:
+        return job_response(await get_owned_job(job_id, current_user, kind="import"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Get import job error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao obter importação")
 
 class CompanySettings(BaseModel):
     name: str
@@ -1306,6 +2523,8 @@ async def hide_from_passenger_control(transaction_id: str, current_user: dict =
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Transação não encontrada")
         
+        await invalidate_transaction_caches()
+        
         return {"message": "Reserva removida do controle de passageiros", "transaction_id": transaction_id}
         
     except Exception as e:
@@ -1341,6 +2560,9 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
         else:
             transaction_date = date.today().strftime("%Y-%m-%d")
         
+        # Neither the current nor the new date may fall in a closed month
+        late_months = await guard_closed_periods(existing_transaction.get("effectiveDate"), to_effective_date(transaction_date))
+        
         # Calculate commission percentage
         commission_percentage = 0.0
         if transaction.saleValue and transaction.commissionValue:
@@ -1428,6 +2650,7 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
             "supplierPhone": transaction.supplierPhone,
             "status": "Confirmado",
             "transactionDate": transaction_date,
+            "effectiveDate": to_effective_date(transaction_date),
             "updatedAt": datetime.utcnow(),
             "entryDate": existing_transaction.get("entryDate", date.today().strftime("%Y-%m-%d")),
             # CORREÇÃO: Campo para ocultar do controle de passageiros
@@ -1442,9 +2665,14 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Transação não encontrada ou não foi modificada")
+        await flag_periods(db, late_months)
         
         # Return updated transaction  
         updated_transaction = await db.transactions.find_one({"_id": ObjectId(transaction_id)})
+        # Move this transaction's contribution in the daily rollups
+        await apply_rollup(db, existing_transaction, -1)
+        if updated_transaction:
+            await apply_rollup(db, updated_transaction)
         if updated_transaction:
             updated_transaction["id"] = str(updated_transaction["_id"])
             updated_transaction["_id"] = str(updated_transaction["_id"])
@@ -1499,6 +2727,8 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
                 except Exception as e:
                     print(f"❌ Sync error: {e}")
         
+        await invalidate_transaction_caches()
+        
         # Auto-generate expense transactions for newly paid suppliers is DISABLED in updates
         # to prevent duplicate expense creation. Only sync existing expenses.
         # expense_transactions = [] # Removed to prevent duplicates
@@ -1515,6 +2745,104 @@ async def update_transaction(transaction_id: str, transaction: TransactionCreate
         logging.error(f"Update transaction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao atualizar transação: {str(e)}")
 
+# Fields read before a PATCH: closed-period guard, rollup key/sums, commission
+# percentage and the expense -> sale supplier sync
+PATCH_PRE_IMAGE_FIELDS = [
+    "effectiveDate", "transactionDate", "date", "type", "category", "seller", "paymentMethod", "amount",
+    "saleValue", "supplierValue", "commissionValue", "originalTransactionId", "description", "updatedAt",
+    "customCategory"
+]
+PATCH_ROLLUP_FIELDS = {"transactionDate", "date", "type", "category", "seller", "paymentMethod", "amount", "saleValue", "supplierValue", "commissionValue"}
+
+@api_router.patch("/transactions/{transaction_id}")
+async def patch_transaction(transaction_id: str, patch: TransactionPatch, current_user: dict = Depends(get_current_user)):
+    """Atualizar apenas os campos enviados (e entradas de suppliers/passengers por operação)"""
+    try:
+        if not ObjectId.is_valid(transaction_id):
+            raise HTTPException(status_code=404, detail="Transação não encontrada")
+        fields = patch.model_dump(exclude_unset=True, exclude={"operations"})
+        operations = [operation.model_dump() for operation in patch.operations]
+        if not fields and not operations:
+            raise HTTPException(status_code=400, detail="Nenhuma alteração enviada")
+        required = [name for name, field in TransactionCreate.model_fields.items() if field.is_required() and name in fields and fields[name] is None]
+        if required:
+            raise HTTPException(status_code=422, detail=f"Campos obrigatórios não podem ser nulos: {', '.join(required)}")
+        if "transactionDate" in fields:
+            effective_date = to_effective_date(fields["transactionDate"])
+            if effective_date is None:
+                raise HTTPException(status_code=422, detail="transactionDate deve estar no formato YYYY-MM-DD")
+            fields.update({"transactionDate": effective_date.strftime("%Y-%m-%d"), "date": effective_date.strftime("%Y-%m-%d"), "effectiveDate": effective_date})
+        
+        # Arrays losing an entry are rewritten whole from this pre-image
+        removals = removal_arrays(operations)
+        existing_transaction = await db.transactions.find_one({"_id": ObjectId(transaction_id)}, PATCH_PRE_IMAGE_FIELDS + removals)
+        if not existing_transaction:
+            raise HTTPException(status_code=404, detail="Transação não encontrada")
+        
+        # Neither the current nor the new date may fall in a closed month
+        late_months = await guard_closed_periods(existing_transaction.get("effectiveDate"), fields.get("effectiveDate"))
+        
+        # Stored category: the custom one when set, else the chosen one (default "Outros")
+        if "customCategory" in fields or "category" in fields:
+            custom_category = fields.get("customCategory", existing_transaction.get("customCategory"))
+            category = fields.get("category", existing_transaction.get("category"))
+            if not custom_category and "category" not in fields and category == existing_transaction.get("customCategory"):
+                # Clearing the custom category drops the value that only mirrored it
+                category = None
+            fields["category"] = custom_category or category or "Outros"
+        
+        if "saleValue" in fields or "commissionValue" in fields:
+            sale_value = fields.get("saleValue", existing_transaction.get("saleValue"))
+            commission_value = fields.get("commissionValue", existing_transaction.get("commissionValue"))
+            fields["commissionPercentage"] = (commission_value / sale_value) * 100 if sale_value and commission_value else 0.0
+        fields["updatedAt"] = datetime.utcnow()
+        
+        try:
+            update, conditions = build_patch_update(fields, operations, {array: existing_transaction.get(array) for array in removals})
+        except IndexError:
+            raise HTTPException(status_code=422, detail="Entrada de suppliers/passengers inexistente no índice informado")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Matching on updatedAt keeps the pre-image (rollups) consistent with what is modified
+        updated_transaction = await db.transactions.find_one_and_update(
+            {"_id": ObjectId(transaction_id), "updatedAt": existing_transaction.get("updatedAt"), **conditions},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+        if updated_transaction is None:
+            if conditions and not await db.transactions.count_documents({"_id": ObjectId(transaction_id), **conditions}, limit=1):
+                raise HTTPException(status_code=422, detail="Entrada de suppliers/passengers inexistente no índice informado")
+            raise HTTPException(status_code=409, detail="Transação alterada por outra requisição; tente novamente")
+        await flag_periods(db, late_months)
+        
+        if PATCH_ROLLUP_FIELDS & set(fields):
+            await apply_rollup(db, existing_transaction, -1)
+            await apply_rollup(db, updated_transaction)
+        
+        # Auto-generated supplier expense: keep the supplier entry of the original sale in sync
+        if "amount" in fields and existing_transaction.get("type") == "saida" and existing_transaction.get("originalTransactionId"):
+            description = existing_transaction.get("description", "")
+            if "Pagamento a " in description and ObjectId.is_valid(existing_transaction["originalTransactionId"]):
+                supplier_name = description.split("Pagamento a ")[1].split(" - Ref:")[0].strip()
+                await db.transactions.update_one(
+                    {"_id": ObjectId(existing_transaction["originalTransactionId"]), "suppliers.name": supplier_name},
+                    {"$set": {
+                        "suppliers.$.value": str(float(fields["amount"])),
+                        "suppliers.$.paymentStatus": "Pago",
+                        "updatedAt": datetime.utcnow()
+                    }}
+                )
+        
+        await invalidate_transaction_caches()
+        
+        return {"message": "Transação atualizada com sucesso", **serialize_transaction(updated_transaction)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Patch transaction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar transação: {str(e)}")
+
 @api_router.delete("/transactions/{transaction_id}")
 async def delete_transaction(transaction_id: str):
     try:
@@ -1523,11 +2851,18 @@ async def delete_transaction(transaction_id: str):
         if not existing_transaction:
             raise HTTPException(status_code=404, detail="Transação não encontrada")
         
+        late_months = await guard_closed_periods(existing_transaction.get("effectiveDate"))
+        
         # Delete the transaction
         result = await db.transactions.delete_one({"_id": ObjectId(transaction_id)})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Transação não encontrada")
+        await flag_periods(db, late_months)
+        
+        await apply_rollup(db, existing_transaction, -1)
+        await log_transaction_deletions([transaction_id])
+        await invalidate_transaction_caches()
         
         return {"message": "Transação excluída com sucesso", "id": transaction_id}
     except HTTPException:
@@ -1568,6 +2903,11 @@ async def generate_expenses_manually(transaction_id: str):
         expense_transactions = []
         suppliers = original_transaction.get('suppliers', [])
         
+        late_months = await guard_closed_periods(*[
+            to_effective_date(supplier.get('paymentDate') or date.today().strftime("%Y-%m-%d"))
+            for supplier in suppliers if supplier.get('paymentStatus') == 'Pago'
+        ])
+        
         if suppliers:
             for supplier in suppliers:
                 if supplier.get('paymentStatus') == 'Pago' and supplier.get('name') and supplier.get('value'):
@@ -1596,6 +2936,7 @@ async def generate_expenses_manually(transaction_id: str):
                             "additionalInfo": f"Gerado manualmente para fornecedor: {supplier['name']}",
                             "status": "Confirmado",
                             "transactionDate": supplier.get('paymentDate') or date.today().strftime("%Y-%m-%d"),
+                            "effectiveDate": to_effective_date(supplier.get('paymentDate') or date.today().strftime("%Y-%m-%d")),
                             "createdAt": datetime.utcnow(),
                             "updatedAt": datetime.utcnow(),
                             "entryDate": date.today().strftime("%Y-%m-%d"),
@@ -1609,6 +2950,13 @@ async def generate_expenses_manually(transaction_id: str):
                         expense_transaction["_id"] = str(expense_result.inserted_id)
                         expense_transactions.append(expense_transaction)
         
+        await apply_rollups(db, expense_transactions)
+        await flag_periods(db, sorted({
+            month_key(expense["effectiveDate"]) for expense in expense_transactions
+            if expense["effectiveDate"] and month_key(expense["effectiveDate"]) in late_months
+        }))
+        await invalidate_transaction_caches()
+        
         if expense_transactions:
             return {
                 "message": "Despesas geradas com sucesso",
@@ -1955,6 +3303,12 @@ async def clear_test_data():
         
         # Clear collections (keeping admin users)
         await db.transactions.delete_many({})
+        await db[ROLLUP_COLLECTION].delete_many({})
+        await db[SNAPSHOT_COLLECTION].delete_many({})
+        await db[IDEMPOTENCY_COLLECTION].delete_many({})
+        await invalidate_transaction_caches()
+        # Tell delta-sync clients to drop their local copy
+        await db.transaction_deletions.insert_one({"reset": True, "deletedAt": datetime.utcnow()})
         await db.clients.delete_many({})
         await db.suppliers.delete_many({})
         
@@ -2000,6 +3354,119 @@ async def clear_test_data():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao limpar dados de teste: {str(e)}")
 
+@api_router.post("/admin/backfill-effective-date")
+async def backfill_effective_date_endpoint():
+    """Migração única: preencher effectiveDate nas transações existentes"""
+    try:
+        updated = await backfill_effective_date()
+        await invalidate_transaction_caches()
+        # Rows with neither date parsable stay out of every period report
+        remaining = await db.transactions.count_documents({"effectiveDate": None})
+        return {"message": "effectiveDate preenchido com sucesso", "updated": updated, "remaining": remaining}
+    except Exception as e:
+        logging.error(f"Backfill effectiveDate error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao preencher effectiveDate: {str(e)}")
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats():
+    """Estatísticas do cache de resumo/relatórios"""
+    return {**report_cache.stats(), "generation": await get_generation(db, "transactions")}
+
+@api_router.post("/admin/rebuild-rollups")
+async def rebuild_rollups_endpoint():
+    """Recalcular a coleção daily_rollups a partir das transações"""
+    try:
+        await backfill_effective_date()
+        rows = await rebuild_rollups(db)
+        await invalidate_transaction_caches()
+        return {"message": "Rollups diários recalculados com sucesso", "rows": rows}
+    except Exception as e:
+        logging.error(f"Rebuild rollups error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao recalcular rollups: {str(e)}")
+
+def validate_month(month: str):
+    """Validar o mês (YYYY-MM) das rotas de fechamento"""
+    try:
+        return month_range(month)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Mês deve estar no formato YYYY-MM")
+
+@api_router.get("/admin/periods")
+async def list_closed_periods():
+    """Listar os meses fechados"""
+    try:
+        snapshots = await db[SNAPSHOT_COLLECTION].find({}, {"totals": 0, "reports": 0}).sort("_id", -1).to_list(None)
+        return [{"month": snapshot.pop("_id"), **snapshot} for snapshot in snapshots]
+    except Exception as e:
+        logging.error(f"List closed periods error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao listar períodos fechados: {str(e)}")
+
+@api_router.get("/admin/periods/{month}")
+async def get_closed_period(month: str):
+    """Obter o snapshot congelado de um mês fechado"""
+    try:
+        validate_month(month)
+        snapshot = await db[SNAPSHOT_COLLECTION].find_one({"_id": month})
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Período não está fechado")
+        return {"month": snapshot.pop("_id"), **snapshot}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Get closed period error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao obter período fechado: {str(e)}")
+
+@api_router.post("/admin/periods/{month}/close")
+async def close_period_endpoint(month: str, current_user: dict = Depends(get_current_user)):
+    """Fechar um mês: congelar o relatório e o hash do conteúdo"""
+    try:
+        _, end = validate_month(month)
+        if end > datetime.combine(date.today(), datetime.min.time()):
+            raise HTTPException(status_code=400, detail="Só é possível fechar meses já encerrados")
+        snapshot = await close_period(db, month, current_user.get("email"))
+        await invalidate_transaction_caches()
+        return {
+            "message": f"Período {month} fechado com sucesso",
+            "month": month,
+            "transactionCount": snapshot["transactionCount"],
+            "contentHash": snapshot["contentHash"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Close period error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao fechar período: {str(e)}")
+
+@api_router.delete("/admin/periods/{month}")
+async def reopen_period_endpoint(month: str, current_user: dict = Depends(get_current_user)):
+    """Reabrir um mês fechado"""
+    try:
+        validate_month(month)
+        if not await reopen_period(db, month):
+            raise HTTPException(status_code=404, detail="Período não está fechado")
+        await invalidate_transaction_caches()
+        return {"message": f"Período {month} reaberto com sucesso", "month": month}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Reopen period error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao reabrir período: {str(e)}")
+
+@api_router.get("/admin/periods/{month}/verify")
+async def verify_period_endpoint(month: str):
+    """Conferir se o conteúdo atual do mês ainda bate com o hash congelado"""
+    try:
+        validate_month(month)
+        result = await verify_period(db, month)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Período não está fechado")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Verify period error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao verificar período: {str(e)}")
+
 @api_router.get("/travel/airlines")
 async def get_airlines():
     """Obter lista de companhias aéreas"""
@@ -2110,6 +3577,9 @@ if reports_router:
 else:
     logger.error("❌ Reports router not available")
 
+# Include exports router
+app.include_router(exports_router, prefix="/api")
+
 @app.get("/")
 async def root():
     return {"message": "Rise Travel Cash Control API - Sistema funcionando corretamente!"}
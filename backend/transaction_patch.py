@@ -0,0 +1,126 @@
+from typing import Dict, List, Optional, Tuple
+import copy
+import re
+
+# Partial transaction updates (PATCH /api/transactions/{id}): the changed
+# fields become a $set of just those fields, and JSON-Patch-style operations
+# on single suppliers[]/passengers[] entries become positional updates
+# ("suppliers.2.paymentStatus"), so the document is never rewritten whole.
+# Indexes refer to the entries as stored before the patch. Removing an entry
+# shifts the others, so an array with a removal is rewritten whole from the
+# pre-image read by the caller (the update is guarded by updatedAt, so that
+# pre-image is exactly what gets replaced) and stays a single write.
+PATCH_ARRAY_FIELDS = ["suppliers", "passengers"]
+PATCH_OPERATIONS = ["add", "replace", "remove"]
+PATCH_ENTRY_FIELD = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+
+def parse_patch_path(path: str) -> Tuple[str, str, Optional[str]]:
+    """(array, índice ou '-', campo da entrada ou None) de um caminho /suppliers/0/value"""
+    parts = path.split("/")
+    if len(parts) not in (3, 4) or parts[0] != "" or parts[1] not in PATCH_ARRAY_FIELDS:
+        raise ValueError(f"Caminho inválido: {path} (use /{{{'|'.join(PATCH_ARRAY_FIELDS)}}}/<índice>[/<campo>])")
+    array, index = parts[1], parts[2]
+    if not (index.isdigit() or index == "-"):
+        raise ValueError(f"Índice inválido em {path}")
+    entry_field = parts[3] if len(parts) == 4 else None
+    if entry_field is not None and (index == "-" or not PATCH_ENTRY_FIELD.match(entry_field)):
+        raise ValueError(f"Campo inválido em {path}")
+    return array, index, entry_field
+
+
+def removal_arrays(operations: List[Dict]) -> List[str]:
+    """Arrays com remoção de entrada inteira (o chamador precisa lê-los antes do update)"""
+    arrays = []
+    for operation in operations:
+        parts = str(operation.get("path", "")).split("/")
+        if operation.get("op") == "remove" and len(parts) == 3 and parts[1] in PATCH_ARRAY_FIELDS and parts[1] not in arrays:
+            arrays.append(parts[1])
+    return arrays
+
+
+def rewrite_array(array: str, stored: Optional[list], set_fields: Dict, unset_fields: Dict) -> list:
+    """Aplicar ao array lido as alterações por índice; IndexError se uma entrada não existir"""
+    entries = copy.deepcopy(stored or [])
+    removed = set()
+    for target, value in [*set_fields.items(), *((target, None) for target in unset_fields)]:
+        _, index, *entry_field = target.split(".")
+        index = int(index)
+        if index >= len(entries):
+            raise IndexError(f"{array}/{index}: entrada inexistente")
+        if target in unset_fields and not entry_field:
+            removed.add(index)
+        elif target in unset_fields:
+            entries[index].pop(entry_field[0], None)
+        elif entry_field:
+            entries[index][entry_field[0]] = value
+        else:
+            entries[index] = value
+    return [entry for index, entry in enumerate(entries) if index not in removed]
+
+
+def build_patch_update(fields: Dict, operations: List[Dict], stored: Optional[Dict[str, list]] = None) -> Tuple[Dict, Dict]:
+    """Update Mongo (campos alterados + operações) e condições de existência; stored: arrays de removal_arrays() como gravados"""
+    set_fields, unset_fields, pushes = dict(fields), {}, {}
+    conditions, removed = {}, []
+
+    for operation in operations:
+        op, path, value = operation.get("op"), operation.get("path", ""), operation.get("value")
+        if op not in PATCH_OPERATIONS:
+            raise ValueError(f"Operação inválida: {op} (use {', '.join(PATCH_OPERATIONS)})")
+        array, index, entry_field = parse_patch_path(path)
+        if array in fields:
+            raise ValueError(f"{array} enviado inteiro e por operações na mesma requisição")
+
+        if op == "add" and entry_field is None:
+            if not isinstance(value, dict):
+                raise ValueError(f"{path}: value deve ser um objeto")
+            push = pushes.setdefault(array, {"$each": []})
+            if index != "-":
+                if "$position" in push or push["$each"]:
+                    raise ValueError(f"{path}: apenas uma inserção por posição em {array}")
+                push["$position"] = int(index)
+            elif "$position" in push:
+                raise ValueError(f"{path}: apenas uma inserção por posição em {array}")
+            push["$each"].append(value)
+            continue
+
+        if index == "-":
+            raise ValueError(f"{path}: '-' só é válido para adicionar uma entrada")
+        conditions[f"{array}.{index}"] = {"$exists": True}
+        target = f"{array}.{index}" + (f".{entry_field}" if entry_field else "")
+        if op == "remove":
+            unset_fields[target] = ""
+            if entry_field is None and array not in removed:
+                removed.append(array)
+        else:
+            if entry_field is None and not isinstance(value, dict):
+                raise ValueError(f"{path}: value deve ser um objeto")
+            set_fields[target] = value
+
+    # MongoDB rejects an update touching a path and its parent (or $push plus
+    # positional changes on the same array)
+    paths = [*set_fields, *unset_fields, *pushes]
+    for position, first in enumerate(paths):
+        for second in paths[position + 1:]:
+            if first == second or second.startswith(first + ".") or first.startswith(second + "."):
+                raise ValueError(f"Operações conflitantes em {first} e {second}")
+
+    for array in removed:
+        prefix = f"{array}."
+        set_fields[array] = rewrite_array(
+            array, (stored or {}).get(array),
+            {target: set_fields.pop(target) for target in list(set_fields) if target.startswith(prefix)},
+            {target: unset_fields.pop(target) for target in list(unset_fields) if target.startswith(prefix)}
+        )
+        for target in [target for target in conditions if target.startswith(prefix)]:
+            del conditions[target]
+
+    update = {}
+    if set_fields:
+        update["$set"] = set_fields
+    if unset_fields:
+        update["$unset"] = unset_fields
+    if pushes:
+        update["$push"] = pushes
+    return update, conditions
@@ -20,7 +20,7 @@ import {
 import { Badge } from '../ui/badge';
 import { Textarea } from '../ui/textarea';
 import { Checkbox } from '../ui/checkbox';
-import { transactionsAPI, clientsAPI, suppliersAPI, usersAPI } from '../../services/api';
+import { transactionsAPI, clientsAPI, suppliersAPI, usersAPI, generateIdempotencyKey } from '../../services/api';
 import { 
   Plus, 
   Search, 
@@ -122,6 +122,9 @@ const EnhancedTransactions = () => {
   ];
 
   const [transactions, setTransactions] = useState([]);
+  // Paginação por cursor: a lista carrega uma página por vez
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [clients, setClients] = useState([]);
   const [suppliers, setSuppliers] = useState([]);
   const [users, setUsers] = useState([]);
@@ -161,6 +164,8 @@ const EnhancedTransactions = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [filterType, setFilterType] = useState('all');
   const [isAddModalOpen, setIsAddModalOpen] = useState(false);
+  // Idempotency-Key do formulário aberto: a mesma em cada reenvio, limpa após o sucesso
+  const [submissionKey, setSubmissionKey] = useState(null);
   const [isEditModalOpen, setIsEditModalOpen] = useState(false);
   const [selectedTransaction, setSelectedTransaction] = useState(null);
   const [isDeleteConfirmOpen, setIsDeleteConfirmOpen] = useState(false);
@@ -377,7 +382,8 @@ const EnhancedTransactions = () => {
         api.get('/travel/airports')
       ]);
       
-      setTransactions(transactionsData);
+      setTransactions(transactionsData.items);
+      setNextCursor(transactionsData.next_cursor);
       setCategories(categoriesData.categories || []);
       setPaymentMethods(paymentMethodsData.paymentMethods || []);
       setClients(clientsData);
@@ -943,6 +949,12 @@ const EnhancedTransactions = () => {
     try {
       // Generate internal reservation code if not exists
       const internalCode = newTransaction.internalReservationCode || generateInternalCode();
+      // Kept in the form so a resubmit sends the same body with the same key
+      if (!newTransaction.internalReservationCode) {
+        setNewTransaction(prev => ({ ...prev, internalReservationCode: internalCode }));
+      }
+      const idempotencyKey = submissionKey || generateIdempotencyKey();
+      setSubmissionKey(idempotencyKey);
       
       const transactionData = {
         ...newTransaction,
@@ -967,7 +979,8 @@ const EnhancedTransactions = () => {
 
       console.log('🔍 Update transaction data being sent:', transactionData); // Debug log
 
-      const response = await transactionsAPI.createTransaction(transactionData);
+      const response = await transactionsAPI.createTransaction(transactionData, idempotencyKey);
+      setSubmissionKey(null);
       
       // Extrair a transação criada da resposta (o backend retorna {message, ...transaction})
       const { message, ...createdTransaction } = response;
@@ -1104,6 +1117,12 @@ const EnhancedTransactions = () => {
     try {
       // Generate internal reservation code if not exists
       const internalCode = newTransaction.internalReservationCode || generateInternalCode();
+      // Kept in the form so a resubmit sends the same body with the same key
+      if (!newTransaction.internalReservationCode) {
+        setNewTransaction(prev => ({ ...prev, internalReservationCode: internalCode }));
+      }
+      const idempotencyKey = submissionKey || generateIdempotencyKey();
+      setSubmissionKey(idempotencyKey);
       
       const transactionData = {
         ...newTransaction,
@@ -1195,6 +1214,24 @@ const EnhancedTransactions = () => {
     setIsDeleteConfirmOpen(true);
   };
 
+  const loadMoreTransactions = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await transactionsAPI.getTransactions({ cursor: nextCursor });
+      setTransactions(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading more transactions:', error);
+      toast({
+        variant: "destructive",
+        title: "Erro",
+        description: "Erro ao carregar mais transações",
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredTransactions = transactions.filter(transaction => {
     const matchesSearch = transaction.description.toLowerCase().includes(searchTerm.toLowerCase()) ||
                          (transaction.client && transaction.client.toLowerCase().includes(searchTerm.toLowerCase())) ||
@@ -1241,6 +1278,7 @@ const EnhancedTransactions = () => {
         <Dialog open={isAddModalOpen} onOpenChange={(open) => {
           if (open) {
             resetForm(); // Limpar formulário ao abrir modal
+            setSubmissionKey(generateIdempotencyKey());
           }
           setIsAddModalOpen(open);
         }}>
@@ -3046,6 +3084,13 @@ const EnhancedTransactions = () => {
           ))
         )}
       </div>
+      {nextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={loadMoreTransactions} disabled={loadingMore}>
+            {loadingMore ? 'Carregando...' : 'Carregar mais transações'}
+          </Button>
+        </div>
+      )}
     </div>
     </>
   );
@@ -66,7 +66,7 @@ const FinancialAnalytics = () => {
       const startDate = new Date(now.getFullYear(), now.getMonth(), 1).toISOString().split('T')[0];
       const endDate = now.toISOString().split('T')[0]; // Today's date
       
-      const response = await api.get(`/reports/complete-analysis?start_date=${startDate}&end_date=${endDate}`);
+      const response = await api.get(`/reports/complete-analysis?start_date=${startDate}&end_date=${endDate}&include=summary`);
       
       // Transform data to match expected format
       const transformedData = {
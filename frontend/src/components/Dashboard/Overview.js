@@ -47,7 +47,7 @@ const Overview = () => {
         
         // Buscar transações recentes
         const transactionsData = await transactionsAPI.getTransactions({ limit: 5 });
-        setTransactions(transactionsData);
+        setTransactions(transactionsData.items);
         
       } catch (error) {
         console.error('Error fetching overview data:', error);
@@ -66,7 +66,7 @@ const PassengerControlDirect = () => {
   const loadReservations = async () => {
     setLoading(true);
     try {
-      const response = await transactionsAPI.getTransactions();
+      const response = await transactionsAPI.getAllTransactions();
       
       const entryTransactions = response.filter(transaction => 
         transaction.type === 'entrada' && 
@@ -61,7 +61,7 @@ const Reports = () => {
         resultadoLiquido: summaryData.saldoAtual
       });
       
-      setTransactions(transactionsData);
+      setTransactions(transactionsData.items);
       
     } catch (error) {
       console.error('Error fetching reports data:', error);
@@ -26,7 +26,7 @@ const TransactionMigration = () => {
   const fetchTransactions = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/transactions');
+      const response = await api.get('/transactions', { params: { all: true } });
       
       // Filter only old format transactions
       const oldTransactions = response.data.filter(t => 
@@ -18,7 +18,7 @@ import {
   SelectValue,
 } from '../ui/select';
 import { Badge } from '../ui/badge';
-import { transactionsAPI, clientsAPI, suppliersAPI, usersAPI } from '../../services/api';
+import { transactionsAPI, clientsAPI, suppliersAPI, usersAPI, generateIdempotencyKey } from '../../services/api';
 import { 
   Plus, 
   Search, 
@@ -40,6 +40,8 @@ const Transactions = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [filterType, setFilterType] = useState('all');
   const [isAddModalOpen, setIsAddModalOpen] = useState(false);
+  // Idempotency-Key do formulário aberto: a mesma em cada reenvio, limpa após o sucesso
+  const [submissionKey, setSubmissionKey] = useState(null);
   const [loading, setLoading] = useState(true);
   const { toast } = useToast();
 
@@ -106,7 +108,7 @@ const Transactions = () => {
         usersAPI.getUsers()
       ]);
       
-      setTransactions(transactionsData);
+      setTransactions(transactionsData.items);
       setCategories(categoriesData.categories || []);
       setPaymentMethods(paymentMethodsData.paymentMethods || []);
       setClients(clientsData);
@@ -145,13 +147,16 @@ const Transactions = () => {
     }
 
     try {
+      const idempotencyKey = submissionKey || generateIdempotencyKey();
+      setSubmissionKey(idempotencyKey);
       const createdTransaction = await transactionsAPI.createTransaction({
         ...newTransaction,
         amount: parseFloat(newTransaction.amount),
         saleValue: newTransaction.saleValue ? parseFloat(newTransaction.saleValue) : null,
         supplierValue: newTransaction.supplierValue ? parseFloat(newTransaction.supplierValue) : null,
         commissionValue: newTransaction.commissionValue ? parseFloat(newTransaction.commissionValue) : null
-      });
+      }, idempotencyKey);
+      setSubmissionKey(null);
       
       setTransactions([createdTransaction, ...transactions]);
       
@@ -215,7 +220,12 @@ const Transactions = () => {
       {/* Header */}
       <div className="flex items-center justify-between">
         <h2 className="text-2xl font-bold text-gray-900">Transações</h2>
-        <Dialog open={isAddModalOpen} onOpenChange={setIsAddModalOpen}>
+        <Dialog open={isAddModalOpen} onOpenChange={(open) => {
+          if (open) {
+            setSubmissionKey(generateIdempotencyKey());
+          }
+          setIsAddModalOpen(open);
+        }}>
           <DialogTrigger asChild>
             <Button className="bg-gradient-to-r from-pink-500 to-orange-400 hover:from-pink-600 hover:to-orange-500">
               <Plus className="mr-2 h-4 w-4" />
@@ -3,6 +3,26 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
 
+// Idempotency-Key de um envio de formulário: gerada uma vez quando o formulário
+// abre e reutilizada em cada reenvio, até a criação ser confirmada.
+// crypto.randomUUID só existe em contextos seguros (HTTPS/localhost);
+// fora deles, gerar um UUID v4 com getRandomValues (ou Math.random)
+export const generateIdempotencyKey = () => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  if (typeof crypto !== 'undefined' && typeof crypto.getRandomValues === 'function') {
+    crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) bytes[i] = Math.floor(Math.random() * 256);
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 // Configurar interceptor para adicionar token automaticamente
 const api = axios.create({
   baseURL: API_BASE,
@@ -88,13 +108,25 @@ export const transactionsAPI = {
     return response.data;
   },
   
+  // Página (keyset) de transações: { items, next_cursor, limit }; a próxima página
+  // vem de getTransactions({ ...params, cursor: next_cursor })
   getTransactions: async (params = {}) => {
     const response = await api.get('/transactions', { params });
     return response.data;
   },
   
-  createTransaction: async (transactionData) => {
-    const response = await api.post('/transactions', transactionData);
+  // Lista completa, sem paginação (opt-in explícito: migração e controle de passageiros)
+  getAllTransactions: async (params = {}) => {
+    const response = await api.get('/transactions', { params: { ...params, all: true } });
+    return response.data;
+  },
+  
+  // idempotencyKey: a chave do envio do formulário (generateIdempotencyKey); o reenvio
+  // com a mesma chave devolve a transação já criada em vez de duplicá-la
+  createTransaction: async (transactionData, idempotencyKey) => {
+    const response = await api.post('/transactions', transactionData, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+    });
     return response.data;
   },
   
@@ -103,6 +135,12 @@ export const transactionsAPI = {
     return response.data;
   },
   
+  // Apenas os campos alterados; operations: [{ op, path: '/suppliers/0/paymentStatus', value }]
+  patchTransaction: async (id, changes = {}, operations = []) => {
+    const response = await api.patch(`/transactions/${id}`, { ...changes, operations });
+    return response.data;
+  },
+  
   deleteTransaction: async (id) => {
     const response = await api.delete(`/transactions/${id}`);
     return response.data;
@@ -0,0 +1,111 @@
+"""
+Benchmark: per-dict Python loops (the previous report accumulation) vs. the
+columnar analytics engine, on synthetic transactions.
+
+    python tests/bench_analytics.py [rows ...]
+
+Not collected by pytest; no database needed.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from analytics import frame_from_records, group_breakdown, type_totals  # noqa: E402
+from rollups import empty_totals, rollup_increments  # noqa: E402
+
+TYPES = ["entrada_vendas", "entrada", "saida_vendas", "saida"]
+SELLERS = [f"Vendedor {i}" for i in range(25)]
+CATEGORIES = ["Pacote", "Aéreo", "Hotel", "Seguro", "Transfer", "Outros"]
+
+
+def synthetic_transactions(rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        {
+            "type": rng.choice(TYPES),
+            "category": rng.choice(CATEGORIES),
+            "seller": rng.choice(SELLERS),
+            "amount": round(rng.uniform(50, 5000), 2),
+            "saleValue": round(rng.uniform(50, 8000), 2) if rng.random() < 0.7 else None,
+            "supplierValue": round(rng.uniform(0, 3000), 2) if rng.random() < 0.6 else None,
+            "commissionValue": round(rng.uniform(0, 300), 2) if rng.random() < 0.5 else None
+        }
+        for _ in range(rows)
+    ]
+
+
+def loop_totals(transactions):
+    totals = {}
+    for transaction in transactions:
+        bucket = totals.setdefault(transaction.get("type"), empty_totals())
+        for field, value in rollup_increments(transaction).items():
+            bucket[field] += value
+    return totals
+
+
+def loop_breakdown(transactions, by, percentiles=(50, 90)):
+    groups = {}
+    for transaction in transactions:
+        key = transaction.get(by)
+        if key is None:
+            continue
+        group = groups.setdefault(key, {"sales": [], "supplierValue": 0, "commissionValue": 0})
+        sale_value = transaction.get("saleValue")
+        group["sales"].append(sale_value if sale_value is not None else transaction.get("amount") or 0)
+        group["supplierValue"] += transaction.get("supplierValue") or 0
+        group["commissionValue"] += transaction.get("commissionValue") or 0
+    rows = []
+    for key, group in groups.items():
+        sales = sorted(group["sales"])
+        total = sum(sales)
+        profit = total - group["supplierValue"] - group["commissionValue"]
+        row = {by: key, "count": len(sales), "salesTotal": total, "profit": profit,
+               "margin": profit / total * 100 if total > 0 else 0, "percentiles": {}}
+        for percentile in percentiles:
+            position = (len(sales) - 1) * percentile / 100
+            lower = int(position)
+            upper = min(lower + 1, len(sales) - 1)
+            row["percentiles"][f"p{percentile}"] = sales[lower] + (sales[upper] - sales[lower]) * (position - lower)
+        rows.append(row)
+    return sorted(rows, key=lambda row: row["salesTotal"], reverse=True)
+
+
+def timed(function, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def columnar_report(transactions):
+    frame = frame_from_records(transactions)
+    type_totals(frame)
+    group_breakdown(frame, "seller")
+    group_breakdown(frame, "category")
+
+
+def loop_report(transactions):
+    loop_totals(transactions)
+    loop_breakdown(transactions, "seller")
+    loop_breakdown(transactions, "category")
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'loops (s)':>12} {'columnar (s)':>14} {'frame only (s)':>16} {'speedup':>9}")
+    for rows in sizes:
+        transactions = synthetic_transactions(rows)
+        loops = timed(loop_report, transactions)
+        columnar = timed(columnar_report, transactions)
+        frame = frame_from_records(transactions)
+        compute = timed(lambda: (type_totals(frame), group_breakdown(frame, "seller"), group_breakdown(frame, "category")))
+        print(f"{rows:>10} {loops:>12.3f} {columnar:>14.3f} {compute:>16.3f} {loops / columnar:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000])
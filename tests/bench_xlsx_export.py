@@ -0,0 +1,108 @@
+"""
+Benchmark: peak RSS growth of the write-only XLSX export as the row count grows.
+The export should stay flat (rows go to per-sheet temp files), unlike a
+regular openpyxl workbook, which keeps every cell in memory.
+
+    python tests/bench_xlsx_export.py [rows ...]
+
+Not collected by pytest; no database needed (rows come from an async generator).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from exports import EXPORT_HEADERS, export_row, write_xlsx  # noqa: E402
+
+TYPES = ["entrada_vendas", "entrada", "saida_vendas", "saida"]
+START = datetime(2020, 1, 1)
+
+
+async def synthetic_cursor(rows: int):
+    for i in range(rows):
+        yield {
+            "type": TYPES[i % 4],
+            "effectiveDate": START + timedelta(days=i % 1500),
+            "time": "10:30",
+            "category": "Pacote",
+            "description": f"Venda {i} - Ref: reserva {i * 7}",
+            "amount": 100 + (i % 997) * 1.5,
+            "paymentMethod": "PIX",
+            "client": f"Cliente {i % 5000}",
+            "supplier": f"Fornecedor {i % 300}",
+            "seller": f"Vendedor {i % 25}",
+            "saleValue": 200 + (i % 500) * 2.0,
+            "supplierValue": 80 + (i % 300),
+            "commissionValue": 10 + (i % 40),
+            "status": "Confirmado"
+        }
+        if i % 1000 == 0:
+            # A Motor cursor yields to the event loop between batches
+            await asyncio.sleep(0)
+
+
+async def write_only(rows: int, path: str):
+    await write_xlsx(synthetic_cursor(rows), path)
+
+
+async def regular_workbook(rows: int, path: str):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(EXPORT_HEADERS)
+    async for transaction in synthetic_cursor(rows):
+        sheet.append(export_row(transaction))
+    workbook.save(path)
+
+
+def max_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_export(name: str, rows: int, results):
+    # Fresh process per run, so ru_maxrss (which includes lxml's C allocations) is per export
+    export = {"write-only": write_only, "regular": regular_workbook}[name]
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp_file:
+        path = tmp_file.name
+    try:
+        baseline = max_rss_mib()
+        started = time.perf_counter()
+        asyncio.run(export(rows, path))
+        elapsed = time.perf_counter() - started
+        results.put((elapsed, max_rss_mib() - baseline, os.path.getsize(path) / 1024 / 1024))
+    finally:
+        os.unlink(path)
+
+
+def measure(name: str, rows: int):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_export, args=(name, rows, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main(sizes, baseline_max=100_000):
+    print(f"{'export':>10} {'rows':>9} {'time (s)':>10} {'RSS growth MiB':>15} {'file MiB':>10}")
+    for rows in sizes:
+        for name in ("write-only", "regular"):
+            if name == "regular" and rows > baseline_max:
+                continue
+            elapsed, growth, size = measure(name, rows)
+            print(f"{name:>10} {rows:>9} {elapsed:>10.1f} {growth:>15.1f} {size:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000])
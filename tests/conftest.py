@@ -0,0 +1,35 @@
+"""
+Shared fixture for the tests that exercise server endpoints against MongoDB.
+Requires a reachable MongoDB in MONGO_URL; a throwaway database is used.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+TEST_DB_NAME = "cash_control_endpoint_test"
+
+
+@pytest.fixture
+def server_db():
+    """(event loop, server module) with server.db pointing at an empty test database"""
+    mongo_url = os.environ.get("MONGO_URL")
+    if not mongo_url:
+        pytest.skip("MONGO_URL not set")
+    from motor.motor_asyncio import AsyncIOMotorClient
+    import server
+
+    loop = asyncio.new_event_loop()
+    client = AsyncIOMotorClient(mongo_url, io_loop=loop)
+    server.client = client
+    server.db = client[TEST_DB_NAME]
+    loop.run_until_complete(client.drop_database(TEST_DB_NAME))
+    yield loop, server
+    loop.run_until_complete(client.drop_database(TEST_DB_NAME))
+    client.close()
+    loop.close()
@@ -0,0 +1,105 @@
+"""
+Columnar analytics engine: vectorised totals, group-bys and percentiles must
+match the per-transaction accumulation used by the daily rollups.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from analytics import ColumnBatches, frame_from_records, group_breakdown, type_totals  # noqa: E402
+from rollups import empty_totals, rollup_increments  # noqa: E402
+
+
+def sample_transactions():
+    types = ["entrada_vendas", "entrada", "saida_vendas", "saida"]
+    sellers = ["Ana", "Bia", None]
+    transactions = []
+    for i in range(200):
+        transactions.append({
+            "type": types[i % 4],
+            "category": "Pacote" if i % 3 else "Aéreo",
+            "seller": sellers[i % 3],
+            "amount": 10.5 * (i % 17) if i % 11 else None,
+            "saleValue": 100 + i if i % 5 else None,
+            "supplierValue": i % 7 or None,
+            "commissionValue": 2.5 if i % 2 else None
+        })
+    return transactions
+
+
+def loop_totals(transactions):
+    totals = {}
+    for transaction in transactions:
+        bucket = totals.setdefault(transaction["type"], empty_totals())
+        for field, value in rollup_increments(transaction).items():
+            bucket[field] += value
+    return totals
+
+
+def test_type_totals_match_rollup_accumulation():
+    transactions = sample_transactions()
+    expected = loop_totals(transactions)
+    totals = type_totals(frame_from_records(transactions))
+    assert totals.keys() == expected.keys()
+    for transaction_type, fields in expected.items():
+        for field, value in fields.items():
+            assert totals[transaction_type][field] == pytest.approx(value)
+
+
+def test_group_breakdown_margins_and_percentiles():
+    transactions = sample_transactions()
+    rows = {row["seller"]: row for row in group_breakdown(frame_from_records(transactions), "seller", [50, 90])}
+    # Rows without a seller are not grouped
+    assert set(rows) == {"Ana", "Bia"}
+    for seller, row in rows.items():
+        group = [t for t in transactions if t["seller"] == seller]
+        sales = [t["saleValue"] if t["saleValue"] is not None else (t["amount"] or 0) for t in group]
+        costs = sum(t["supplierValue"] or 0 for t in group) + sum(t["commissionValue"] or 0 for t in group)
+        assert row["count"] == len(group)
+        assert row["salesTotal"] == pytest.approx(sum(sales))
+        assert row["profit"] == pytest.approx(sum(sales) - costs)
+        assert row["margin"] == pytest.approx((sum(sales) - costs) / sum(sales) * 100)
+        assert row["percentiles"]["p50"] == pytest.approx(np.percentile(sales, 50))
+        assert row["percentiles"]["p90"] == pytest.approx(np.percentile(sales, 90))
+
+
+def test_empty_frame():
+    frame = frame_from_records([])
+    assert type_totals(frame) == {}
+    assert group_breakdown(frame, "category") == []
+
+
+def test_column_batches_match_single_frame():
+    transactions = sample_transactions()
+    columns = ColumnBatches()
+    for start in range(0, len(transactions), 64):
+        columns.add(transactions[start:start + 64])
+    assert type_totals(columns.frame()) == type_totals(frame_from_records(transactions))
+
+
+def test_engine_totals_match_legacy_accumulation(server_db, monkeypatch):
+    loop, server = server_db
+    import analytics
+    import report_engine
+    # Small batches so the columns are built from several cursor batches
+    monkeypatch.setattr(report_engine, "SCAN_BATCH_SIZE", 32)
+    monkeypatch.setattr(analytics, "ANALYTICS_BATCH_SIZE", 32)
+
+    transactions = sample_transactions()
+    loop.run_until_complete(server.db.transactions.insert_many([dict(t) for t in transactions]))
+    expected = loop_totals(transactions)
+
+    report = loop.run_until_complete(report_engine.scan_period(server.db, {}, None, server.serialize_transaction))
+    frame_totals = type_totals(loop.run_until_complete(analytics.load_frame(server.db, {})))
+    aggregated = loop.run_until_complete(report_engine.period_totals(server.db, {}))
+    for totals in (report.totals, frame_totals, aggregated):
+        assert totals.keys() == expected.keys()
+        for transaction_type, fields in expected.items():
+            for field, value in fields.items():
+                assert totals[transaction_type][field] == pytest.approx(value)
+    assert sum(len(bucket) for bucket in report.buckets.values()) == len(transactions)
@@ -0,0 +1,78 @@
+"""
+Bulk creation: each item (sale plus its generated expenses) is written as a
+unit. A write error on one document of an item removes the item's other
+documents and keeps them out of the rollups, so a retry never duplicates them.
+A single sale group falls back to a plain insert_many on a standalone server.
+"""
+
+from pymongo.errors import OperationFailure
+
+
+def sale(server, description):
+    return server.TransactionCreate(
+        type="entrada_vendas", description=description, amount=100, transactionDate="2024-03-02",
+        suppliers=[{"name": "F", "value": "40", "paymentStatus": "Pago", "paymentDate": "2024-03-04"}]
+    )
+
+
+def test_failed_sale_rolls_back_its_generated_expenses(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    item_documents = {index: server.build_transaction_documents(sale(server, f"venda {index}")) for index in range(3)}
+    # Item 1's sale collides with an existing document mid-batch
+    taken_id = item_documents[1][0]["_id"]
+    run(server.db.transactions.insert_one({"_id": taken_id, "type": "entrada", "description": "existente", "amount": 1}))
+
+    errors = run(server.insert_transaction_groups(item_documents))
+
+    assert list(errors) == [1]
+    saved = run(server.db.transactions.find({}, {"description": 1, "saleReference": 1}).to_list(None))
+    assert sorted(document["description"] for document in saved if not document.get("saleReference")) == ["existente", "venda 0", "venda 2"]
+    assert not [document for document in saved if document.get("saleReference") == str(taken_id)]
+    assert len(saved) == 5
+
+    rollups = run(server.db[server.ROLLUP_COLLECTION].find().to_list(None))
+    assert sum(row["count"] for row in rollups) == 4
+    assert sum(row["amount"] for row in rollups) == 2 * (100 + 40)
+
+
+class StandaloneSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def with_transaction(self, callback):
+        raise OperationFailure("Transaction numbers are only allowed on a replica set member or mongos", code=20)
+
+
+class StandaloneClient:
+    """Client of a standalone mongod: sessions exist, transactions do not"""
+
+    def __init__(self):
+        self.sessions = 0
+
+    async def start_session(self):
+        self.sessions += 1
+        return StandaloneSession()
+
+
+def test_group_falls_back_to_insert_many_on_a_standalone_server(server_db, monkeypatch):
+    loop, server = server_db
+    run = loop.run_until_complete
+    standalone = StandaloneClient()
+    monkeypatch.setattr(server, "client", standalone)
+    monkeypatch.setattr(server, "session_transactions_supported", None)
+
+    for description in ("venda 1", "venda 2"):
+        sale_document, expenses = server.build_transaction_documents(sale(server, description))
+        run(server.insert_transaction_group([sale_document, *expenses]))
+
+    assert server.session_transactions_supported is False
+    # Detected once: the second group no longer opens a session
+    assert standalone.sessions == 1
+    saved = run(server.db.transactions.find({}, {"description": 1}).to_list(None))
+    assert sorted(document["description"] for document in saved) == [
+        "Pagamento a F - Ref: venda 1", "Pagamento a F - Ref: venda 2", "venda 1", "venda 2"
+    ]
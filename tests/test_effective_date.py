@@ -0,0 +1,31 @@
+"""
+effectiveDate backfill: old rows get the canonical report date from
+transactionDate, falling back to date when transactionDate is empty or not a
+date; rows left null by an earlier run are retried.
+"""
+
+from datetime import datetime
+
+
+def test_backfill_falls_back_to_date_and_reports_remaining(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    run(server.db.transactions.insert_many([
+        {"_id": "iso", "transactionDate": "2024-03-02T10:00:00", "date": "2024-01-01"},
+        {"_id": "empty", "transactionDate": "", "date": "2024-03-05"},
+        {"_id": "invalid", "transactionDate": "02/03/2024", "date": "2024-03-06"},
+        {"_id": "retried", "effectiveDate": None, "date": "2024-03-07"},
+        {"_id": "none", "transactionDate": "", "date": "sem data"},
+        {"_id": "kept", "transactionDate": "2024-03-09", "effectiveDate": datetime(2024, 3, 8)}
+    ]))
+
+    result = run(server.backfill_effective_date_endpoint())
+
+    saved = {row["_id"]: row["effectiveDate"] for row in run(server.db.transactions.find().to_list(None))}
+    assert saved == {
+        "iso": datetime(2024, 3, 2), "empty": datetime(2024, 3, 5), "invalid": datetime(2024, 3, 6),
+        "retried": datetime(2024, 3, 7), "none": None, "kept": datetime(2024, 3, 8)
+    }
+    # "none" is written with an explicit null, so it counts as updated
+    assert result["updated"] == 5
+    assert result["remaining"] == 1
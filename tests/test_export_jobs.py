@@ -0,0 +1,92 @@
+"""
+Export worker leases: a job reclaimed from a stale worker is finished only by
+its new owner, and the heartbeat keeps a long-running job from looking stale.
+Import jobs share the queue under their own kind.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import export_jobs
+from export_jobs import JOBS_COLLECTION, ExportWorkerPool, create_job
+
+
+def sleeping_runner(seconds, filename):
+    async def runner(job, path, progress):
+        await asyncio.sleep(seconds)
+        with open(path, "w") as artifact:
+            artifact.write(filename)
+        return {"filename": filename, "mediaType": "text/plain"}
+    return runner
+
+
+def make_pool(server, runner):
+    pool = ExportWorkerPool(workers=0)
+    pool.db = server.db
+    pool.runners = {"txt": runner}
+    return pool
+
+
+def test_reclaimed_job_is_finished_only_by_its_new_owner(server_db, monkeypatch, tmp_path):
+    loop, server = server_db
+    monkeypatch.setattr(export_jobs, "EXPORT_DIR", tmp_path)
+    jobs = server.db[JOBS_COLLECTION]
+    created = loop.run_until_complete(create_job(server.db, "txt", {}, None))
+
+    stale = make_pool(server, sleeping_runner(0, "stale.txt"))
+    first = loop.run_until_complete(stale.claim())
+    # The first worker stops heartbeating: its lease goes stale and is reclaimed
+    loop.run_until_complete(jobs.update_one({"_id": created["_id"]}, {"$set": {"updatedAt": datetime.utcnow() - timedelta(hours=1)}}))
+    owner = make_pool(server, sleeping_runner(0, "owner.txt"))
+    second = loop.run_until_complete(owner.claim())
+    assert second["_id"] == first["_id"] and second["lease"] != first["lease"]
+
+    loop.run_until_complete(stale.run(first))
+    assert loop.run_until_complete(jobs.find_one({"_id": created["_id"]}))["status"] == "running"
+
+    loop.run_until_complete(owner.run(second))
+    job = loop.run_until_complete(jobs.find_one({"_id": created["_id"]}))
+    assert job["status"] == "done"
+    assert job["artifact"]["filename"] == "owner.txt"
+    assert [path.name for path in tmp_path.iterdir()] == [f"{created['_id']}_2.txt"]
+
+
+def test_heartbeat_refreshes_a_long_running_job(server_db, monkeypatch, tmp_path):
+    loop, server = server_db
+    monkeypatch.setattr(export_jobs, "EXPORT_DIR", tmp_path)
+    monkeypatch.setattr(export_jobs, "EXPORT_JOB_HEARTBEAT_SECONDS", 0.05)
+    jobs = server.db[JOBS_COLLECTION]
+    created = loop.run_until_complete(create_job(server.db, "txt", {}, None))
+    heartbeats = []
+
+    async def runner(job, path, progress):
+        claimed_at = job["updatedAt"]
+        for _ in range(3):
+            await asyncio.sleep(0.1)
+            heartbeats.append((await jobs.find_one({"_id": job["_id"]}))["updatedAt"] > claimed_at)
+        with open(path, "w") as artifact:
+            artifact.write("ok")
+        return {"filename": "ok.txt", "mediaType": "text/plain"}
+
+    pool = make_pool(server, runner)
+    loop.run_until_complete(pool.run(loop.run_until_complete(pool.claim())))
+    assert all(heartbeats)
+    assert loop.run_until_complete(jobs.find_one({"_id": created["_id"]}))["status"] == "done"
+
+
+def test_import_jobs_are_kept_apart_from_exports(server_db):
+    loop, server = server_db
+    user = {"id": "user-1"}
+    export = loop.run_until_complete(create_job(server.db, "csv", {}, user["id"]))
+    upload = loop.run_until_complete(create_job(
+        server.db, "import-transactions", {"filename": "a.csv"}, user["id"], source={"path": "a.csv", "format": "csv"}, kind="import"
+    ))
+    assert (export["kind"], upload["kind"]) == ("export", "import")
+
+    assert loop.run_until_complete(server.get_import_job(str(upload["_id"]), user))["kind"] == "import"
+    with pytest.raises(HTTPException) as error:
+        loop.run_until_complete(server.get_import_job(str(export["_id"]), user))
+    assert error.value.status_code == 404
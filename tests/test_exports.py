@@ -0,0 +1,105 @@
+"""
+Transaction exports: the streamed CSV and the Parquet file carry the filtered
+rows, in list order, with typed values; the XLSX rows are built off the event
+loop one batch at a time.
+"""
+
+import asyncio
+import csv
+import functools
+import io
+from datetime import datetime
+
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+import arrow_export
+import exports
+
+LEDGER = [
+    {"type": "entrada_vendas", "description": "Pacote, Lisboa", "amount": "1200.5", "saleValue": 1500, "client": "Ana",
+     "transactionDate": "2024-03-02", "date": "2024-03-02", "time": "10:00", "effectiveDate": datetime(2024, 3, 2), "status": "Confirmado"},
+    {"type": "saida", "description": "Taxa", "amount": 30, "transactionDate": "2024-03-05", "date": "2024-03-05", "time": "09:00",
+     "effectiveDate": datetime(2024, 3, 5)},
+    {"type": "entrada", "description": "Sem data efetiva", "amount": "abc", "date": "2024-03-07", "time": "08:00"},
+    {"type": "entrada", "description": "Abril", "amount": 99, "date": "2024-04-01", "time": "08:00", "effectiveDate": datetime(2024, 4, 1)}
+]
+EXPORT_ARGUMENTS = dict(type_filter=None, client=None, seller=None, supplier=None, status_filter=None, paymentMethod=None)
+
+
+async def read_stream(response) -> list:
+    return [chunk async for chunk in response.body_iterator]
+
+
+def test_csv_export_streams_the_filtered_rows(server_db, monkeypatch):
+    loop, server = server_db
+    monkeypatch.setattr(exports, "CSV_FLUSH_ROWS", 1)
+    loop.run_until_complete(server.db.transactions.insert_many([dict(row) for row in LEDGER]))
+
+    response = loop.run_until_complete(server.export_transactions_csv(start_date="2024-03-01", end_date="2024-03-31", **EXPORT_ARGUMENTS))
+    chunks = loop.run_until_complete(read_stream(response))
+
+    # One chunk per row (header travels with the first), sent while the cursor is read
+    assert len(chunks) == 2
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == exports.EXPORT_HEADERS
+    assert rows[1] == [
+        "05/03/2024", "09:00", "saida", "", "Taxa", "30.00", "", "", "", "", "", "", "", ""
+    ]
+    assert rows[2] == [
+        "02/03/2024", "10:00", "entrada_vendas", "", "Pacote, Lisboa", "1200.50", "", "Ana", "", "", "1500.00", "", "", "Confirmado"
+    ]
+    assert len(rows) == 3
+
+    response = loop.run_until_complete(server.export_transactions_csv(start_date=None, end_date=None, **{**EXPORT_ARGUMENTS, "type_filter": "entrada"}))
+    rows = list(csv.reader(io.StringIO(b"".join(loop.run_until_complete(read_stream(response))).decode("utf-8"))))
+    # Without a period every row is exported; a non-numeric amount becomes empty
+    assert [(row[0], row[4], row[5]) for row in rows[1:]] == [("01/04/2024", "Abril", "99.00"), ("07/03/2024", "Sem data efetiva", "")]
+
+
+def test_parquet_export_writes_typed_row_groups(server_db, monkeypatch):
+    loop, server = server_db
+    loop.run_until_complete(server.db.transactions.insert_many([dict(row) for row in LEDGER]))
+    # Two rows per row group: each group is drained from the sink as its own chunk
+    monkeypatch.setattr(server, "iter_parquet", functools.partial(arrow_export.iter_parquet, batch_rows=2))
+
+    response = loop.run_until_complete(server.export_transactions_parquet(start_date=None, end_date=None, **EXPORT_ARGUMENTS))
+    chunks = loop.run_until_complete(read_stream(response))
+
+    assert len(chunks) == 3 and all(chunks)
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.schema_arrow == server.TRANSACTION_ARROW_SCHEMA
+    table = parquet.read().to_pydict()
+    assert table["description"] == ["Abril", "Sem data efetiva", "Taxa", "Pacote, Lisboa"]
+    assert table["amount"] == [99.0, None, 30.0, 1200.5]
+    assert table["saleValue"] == [None, None, None, 1500.0]
+    assert table["effectiveDate"] == [datetime(2024, 4, 1), None, datetime(2024, 3, 5), datetime(2024, 3, 2)]
+    assert all(len(transaction_id) == 24 for transaction_id in table["id"])
+
+
+async def iterate(rows):
+    for row in rows:
+        yield dict(row)
+
+
+def test_xlsx_rows_are_appended_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    appended_off_loop = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(function, *args):
+        appended_off_loop.append(function.__name__)
+        return await to_thread(function, *args)
+
+    monkeypatch.setattr(exports.asyncio, "to_thread", recording_to_thread)
+    path = tmp_path / "export.xlsx"
+    totals = asyncio.run(exports.write_xlsx(iterate(LEDGER), str(path)))
+
+    assert appended_off_loop == ["append_rows", "append_rows", "save"]
+    assert totals["entrada"]["count"] == 2 and totals["entrada"]["amount"] == 99.0
+    workbook = load_workbook(path, read_only=True)
+    rows = list(workbook["entrada_vendas"].iter_rows(values_only=True))
+    assert rows[0] == tuple(exports.EXPORT_HEADERS)
+    assert rows[1][4:6] == ("Pacote, Lisboa", 1200.5)
+    assert list(workbook["Resumo"].iter_rows(values_only=True))[-1][:3] == ("Saldo", None, 1269.5)
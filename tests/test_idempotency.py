@@ -0,0 +1,50 @@
+"""
+Idempotency keys: a replay is answered from the stored record, a live pending
+lease is reported as such, an expired lease is taken over, and the same key
+sent by two users names two separate writes.
+"""
+
+from datetime import datetime, timedelta
+
+from idempotency import IDEMPOTENCY_COLLECTION, begin_request, complete_request, record_id
+
+SCOPE = "POST /api/transactions"
+OWNER = "user-1"
+
+
+def test_reserve_replay_and_take_over(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    records = server.db[IDEMPOTENCY_COLLECTION]
+
+    assert run(begin_request(server.db, SCOPE, OWNER, "k1", "f")) is None
+    assert run(begin_request(server.db, SCOPE, OWNER, "k1", "f"))["status"] == "pending"
+
+    run(complete_request(server.db, SCOPE, OWNER, "k1", {"id": "1"}))
+    replay = run(begin_request(server.db, SCOPE, OWNER, "k1", "f"))
+    assert (replay["status"], replay["response"]) == ("completed", {"id": "1"})
+
+    # Abandoned lease (crash mid-write): the next request takes it over
+    run(records.update_one({"_id": record_id(SCOPE, OWNER, "k1")}, {"$set": {"status": "pending", "expiresAt": datetime.utcnow() - timedelta(seconds=1)}}))
+    assert run(begin_request(server.db, SCOPE, OWNER, "k1", "g")) is None
+    record = run(records.find_one({"_id": record_id(SCOPE, OWNER, "k1")}))
+    assert (record["status"], record["fingerprint"], "response" in record) == ("pending", "g", False)
+
+
+def test_keys_are_scoped_per_user(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    ana, bia = {"id": "ana"}, {"id": "bia"}
+
+    def create(user, description):
+        transaction = server.TransactionCreate(type="entrada", description=description, amount=10)
+        return run(server.create_transaction(transaction, idempotency_key="same-key", current_user=user))
+
+    first = create(ana, "de Ana")
+    replay = create(ana, "de Ana")
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    # Another user (or an anonymous caller) with the same key gets a write of its own
+    other = create(bia, "de Bia")
+    anonymous = create(None, "sem usuário")
+    assert len({first["id"], other["id"], anonymous["id"]}) == 3
+    assert run(server.db.transactions.count_documents({})) == 3
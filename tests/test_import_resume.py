@@ -0,0 +1,66 @@
+"""
+Resumable transaction import: a job interrupted after a checkpoint (crash or
+shutdown) resumes after the last committed batch, without duplicating the
+rows written after that checkpoint, and keeps its upload until it finishes.
+"""
+
+import asyncio
+import copy
+import csv
+
+import pytest
+from bson import ObjectId
+
+PAID_SUPPLIER = '[{"name": "F", "value": "40", "paymentStatus": "Pago", "paymentDate": "2024-03-04"}]'
+ROWS = [
+    ["entrada_vendas", "Venda 1", "100", ""],
+    ["entrada", "Entrada 2", "x", ""],
+    ["entrada_vendas", "Venda 3", "300", PAID_SUPPLIER],
+    ["saida", "Saída 4", "abc", ""],
+    ["entrada", "Entrada 5", "50", ""],
+]
+
+
+def write_source(path):
+    with open(path, "w", newline="", encoding="utf-8") as source:
+        writer = csv.writer(source)
+        writer.writerow(["Tipo", "Descrição", "Valor", "suppliers"])
+        writer.writerows(ROWS)
+
+
+def test_resumes_after_last_checkpoint_without_duplicates(server_db, monkeypatch, tmp_path):
+    loop, server = server_db
+    monkeypatch.setattr(server, "IMPORT_BATCH_ROWS", 2)
+    source = tmp_path / "upload.csv"
+    write_source(source)
+    job = {"_id": ObjectId(), "source": {"path": str(source), "format": "csv"}}
+    checkpoints = []
+
+    async def crashing_progress(processed, total=None, checkpoint=None):
+        if checkpoint is None:
+            return
+        if len(checkpoints) == 1:
+            # Crash after writing the second batch, before its checkpoint is stored
+            raise asyncio.CancelledError()
+        # Stored on the job document: a snapshot, not the live result
+        checkpoints.append(copy.deepcopy(checkpoint))
+
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(server.run_transactions_import_job(job, str(tmp_path / "errors_1.csv"), crashing_progress))
+    assert source.exists()
+    # Both batches (the second with "Venda 3" and its expense) were written
+    assert loop.run_until_complete(server.db.transactions.count_documents({})) == 3
+
+    async def progress(processed, total=None, checkpoint=None):
+        pass
+
+    resumed = {**job, "checkpoint": checkpoints[-1]}
+    artifact = loop.run_until_complete(server.run_transactions_import_job(resumed, str(tmp_path / "errors_2.csv"), progress))
+
+    result = artifact["result"]
+    assert (result["rows"], result["created"], result["failed"], result["generatedExpenses"]) == (5, 3, 2, 1)
+    descriptions = sorted(document["description"] for document in loop.run_until_complete(server.db.transactions.find().to_list(None)))
+    assert descriptions == ["Entrada 5", "Pagamento a F - Ref: Venda 3", "Venda 1", "Venda 3"]
+    with open(tmp_path / "errors_2.csv", newline="", encoding="utf-8") as report:
+        assert [row[1:3] for row in csv.reader(report)] == [["Linha", "Campo"], ["3", "amount"], ["5", "amount"]]
+    assert not source.exists()
@@ -0,0 +1,89 @@
+"""
+Transaction import parsing: header mapping, cell conversion, per-row errors
+and batching, for CSV and XLSX sources.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from openpyxl import Workbook
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from imports import iter_import_rows, map_headers, missing_required, next_batch, row_payload  # noqa: E402
+
+
+class Row(BaseModel):
+    type: str
+    description: str
+    amount: float
+    transactionDate: Optional[str] = None
+    saleValue: Optional[float] = None
+    clientNumber: Optional[int] = None
+    hasStops: Optional[bool] = None
+    products: Optional[list] = None
+    paymentMethod: Optional[str] = None
+    seller: Optional[str] = None
+
+
+def test_maps_field_names_aliases_and_export_headers():
+    headers = ["Tipo", "DESCRIÇÃO", "valor", "Data", "Valor Venda", "sale_value", "Forma de Pagamento", "Coluna extra", "Vendedor"]
+    columns = map_headers(headers, Row)
+    assert columns == ["type", "description", "amount", "transactionDate", "saleValue", None, "paymentMethod", None, "seller"]
+    assert missing_required(columns) == []
+    assert missing_required(map_headers(["Tipo", "Valor"], Row)) == ["description"]
+
+
+def test_converts_cells_to_field_types():
+    columns = ["type", "description", "amount", "transactionDate", "saleValue", "clientNumber", "hasStops", "products"]
+    payload = row_payload(Row, columns, ["entrada", " Venda ", "R$ 1.234,56", "02/03/2024", 99.5, "12", "Sim", "a; b"])
+    assert payload == {
+        "type": "entrada", "description": "Venda", "amount": 1234.56, "transactionDate": "2024-03-02",
+        "saleValue": 99.5, "clientNumber": 12, "hasStops": True, "products": ["a", "b"]
+    }
+    assert row_payload(Row, ["transactionDate"], [datetime(2024, 3, 2, 10, 30)]) == {"transactionDate": "2024-03-02"}
+    # Blank cells are left out, so the model applies its defaults
+    assert row_payload(Row, ["type", "seller"], ["saida", "  "]) == {"type": "saida"}
+
+
+def test_reports_conversion_errors_per_field():
+    payload = row_payload(Row, ["type", "amount", "transactionDate"], ["entrada", "abc", "31/02/2024"])
+    assert payload["type"] == "entrada"
+    assert [error["field"] for error in payload["_errors"]] == ["amount", "transactionDate"]
+
+
+def test_batches_csv_rows_skipping_blank_lines(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text(
+        "Tipo;Descrição;Valor\n"
+        "entrada;A;10,5\n"
+        ";;\n"
+        "saida;B;abc\n"
+        "entrada;C;3\n",
+        encoding="utf-8"
+    )
+    rows = iter_import_rows(str(path), "csv")
+    first, second, rest = next_batch(rows, Row, 2), next_batch(rows, Row, 2), next_batch(rows, Row, 2)
+    assert [(row_number, payload.get("description")) for _, row_number, payload in first] == [(2, "A"), (4, "B")]
+    assert first[1][2]["_errors"][0]["field"] == "amount"
+    assert [row_number for _, row_number, _ in second] == [5]
+    assert rest == []
+
+
+def test_skips_xlsx_sheets_without_required_columns(tmp_path):
+    workbook = Workbook()
+    data = workbook.active
+    data.title = "Transações"
+    data.append(["Tipo", "Descrição", "Valor", "Data"])
+    data.append(["entrada", "A", 10, datetime(2024, 1, 5)])
+    notes = workbook.create_sheet("Notas")
+    notes.append(["Observação"])
+    notes.append(["não é uma transação"])
+    path = tmp_path / "rows.xlsx"
+    workbook.save(path)
+
+    batch = next_batch(iter_import_rows(str(path), "xlsx"), Row)
+    assert batch == [("Transações", 2, {"type": "entrada", "description": "A", "amount": 10.0, "transactionDate": "2024-01-05"})]
@@ -0,0 +1,73 @@
+"""
+Index coverage tests: every query in server.HOT_QUERIES must be served by an
+index from server.INDEX_REGISTRY (no COLLSCAN in the winning plan).
+Requires a reachable MongoDB in MONGO_URL; a throwaway database is used.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+MONGO_URL = os.environ.get("MONGO_URL")
+pytestmark = pytest.mark.skipif(not MONGO_URL, reason="MONGO_URL not set")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+TEST_DB_NAME = "cash_control_index_test"
+
+
+def plan_stages(plan):
+    """Yield every stage name of an explain() plan tree"""
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+@pytest.fixture(scope="module")
+def indexed_db():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    import server
+
+    loop = asyncio.new_event_loop()
+    client = AsyncIOMotorClient(MONGO_URL, io_loop=loop)
+    server.db = client[TEST_DB_NAME]
+
+    async def setup():
+        await client.drop_database(TEST_DB_NAME)
+        # explain() on a missing collection reports EOF, so create each one
+        for collection in {name for name, _, _ in server.HOT_QUERIES}:
+            await server.db[collection].insert_one({"seed": True})
+        await server.create_indexes()
+
+    loop.run_until_complete(setup())
+    yield loop, server
+    loop.run_until_complete(client.drop_database(TEST_DB_NAME))
+    client.close()
+    loop.close()
+
+
+def test_registry_indexes_are_created(indexed_db):
+    loop, server = indexed_db
+    for collection, _, options in server.INDEX_REGISTRY:
+        info = loop.run_until_complete(server.db[collection].index_information())
+        assert options["name"] in info, f"{collection}.{options['name']} missing"
+
+
+def test_hot_queries_do_not_collscan(indexed_db):
+    loop, server = indexed_db
+    failures = []
+    for collection, query, sort in server.HOT_QUERIES:
+        cursor = server.db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = loop.run_until_complete(cursor.explain())
+        stages = list(plan_stages(explain["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append(f"{collection} {query} -> {stages}")
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,37 @@
+"""
+PDF report rendering: user-supplied text (company name, labels, period) must
+not be parsed as reportlab paragraph markup.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from pdf_reports import render_report_pdf  # noqa: E402
+
+SUMMARY_KEYS = [
+    "entradas_vendas_count", "total_entradas_vendas", "entradas_outras_count", "total_entradas_outras",
+    "saidas_vendas_count", "total_saidas_vendas", "saidas_outras_count", "total_saidas_outras",
+    "total_entradas", "total_saidas", "balance"
+]
+SALES_KEYS = ["total_sales", "total_supplier_costs", "total_commissions", "net_profit", "sales_count", "average_sale"]
+
+
+def test_renders_markup_characters_in_user_text(tmp_path):
+    breakdown = [{
+        "seller": "Ana & <Beto>", "category": "Pacotes <b>", "count": 1, "salesTotal": 10.0,
+        "profit": 2.0, "margin": 20.0, "percentiles": {"p50": 10.0}
+    }]
+    payload = {
+        "company": "<b>Viagens A & B",
+        "period": {"start_date": "2024-01-01", "end_date": "<2024-01-31>"},
+        "generatedAt": "01/02/2024 10:00",
+        "summary": {key: 0 for key in SUMMARY_KEYS},
+        "sales": {key: 0 for key in SALES_KEYS},
+        "sellers": breakdown,
+        "categories": breakdown
+    }
+    path = tmp_path / "report.pdf"
+    render_report_pdf(payload, str(path))
+    assert path.read_bytes().startswith(b"%PDF")
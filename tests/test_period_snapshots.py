@@ -0,0 +1,63 @@
+"""
+Closed-period snapshots: once a month is closed, every totals path (legacy
+scan, include=summary, source=rollups) reports its frozen totals, and in
+"flag" mode a late write only marks the snapshot dirty once it has committed.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+PERIOD = {"start_date": "2024-01-01", "end_date": "2024-02-29", "fields": None, "limit": 100}
+
+
+def create(loop, server, transaction_date, amount, transaction_type="entrada"):
+    transaction = server.TransactionCreate(type=transaction_type, description="t", amount=amount, transactionDate=transaction_date)
+    return loop.run_until_complete(server.insert_transaction(transaction))
+
+
+def summaries(loop, server):
+    run = loop.run_until_complete
+    return [
+        run(server.get_complete_analysis(**PERIOD, source="transactions", include=None))["summary"],
+        run(server.get_complete_analysis(**PERIOD, source="transactions", include="summary"))["summary"],
+        run(server.get_complete_analysis(**PERIOD, source="rollups", include=None))["summary"]
+    ]
+
+
+def test_every_totals_path_reads_closed_month_snapshot(server_db):
+    loop, server = server_db
+    create(loop, server, "2024-01-10", 100)
+    create(loop, server, "2024-01-20", 40, "saida")
+    create(loop, server, "2024-02-05", 7)
+    expected = summaries(loop, server)
+    assert expected[0] == expected[1] == expected[2]
+
+    loop.run_until_complete(server.close_period(server.db, "2024-01"))
+    # Drift behind the snapshot's back: January's documents and rollups vanish
+    january = {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)}
+    loop.run_until_complete(server.db.transactions.delete_many({"effectiveDate": january}))
+    loop.run_until_complete(server.db[server.ROLLUP_COLLECTION].delete_many({"day": january}))
+    loop.run_until_complete(server.invalidate_transaction_caches())
+
+    assert summaries(loop, server) == expected
+
+
+def test_flag_mode_flags_only_committed_writes(server_db, monkeypatch):
+    loop, server = server_db
+    created = create(loop, server, "2024-01-10", 100)
+    loop.run_until_complete(server.close_period(server.db, "2024-01"))
+    monkeypatch.setattr(server, "CLOSED_PERIOD_WRITES", "flag")
+
+    def dirty():
+        return loop.run_until_complete(server.db[server.SNAPSHOT_COLLECTION].find_one({"_id": "2024-01"}))["dirty"]
+
+    failing = server.TransactionPatch(operations=[{"op": "replace", "path": "/suppliers/3/value", "value": "1"}])
+    with pytest.raises(HTTPException) as error:
+        loop.run_until_complete(server.patch_transaction(created["id"], failing, {}))
+    assert error.value.status_code == 422
+    assert dirty() is False
+
+    loop.run_until_complete(server.patch_transaction(created["id"], server.TransactionPatch(amount=120), {}))
+    assert dirty() is True
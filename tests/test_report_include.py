@@ -0,0 +1,52 @@
+"""
+Reports with include=summary|details: the metrics match the full report, and
+details adds one page per bucket that pages on with the bucket endpoint.
+"""
+
+from datetime import datetime
+
+
+def report(server, loop, endpoint, **params):
+    arguments = dict(start_date="2024-03-01", end_date="2024-03-31", fields=None, source="transactions", include=None, limit=100)
+    arguments.update(params)
+    server.report_cache.clear()
+    return loop.run_until_complete(endpoint(**arguments))
+
+
+def test_include_composes_metrics_and_bucket_pages(server_db):
+    loop, server = server_db
+    loop.run_until_complete(server.db.transactions.insert_many([
+        {"type": "entrada_vendas", "description": "v1", "amount": 100.0, "saleValue": 120.0, "supplierValue": 40.0,
+         "commissionValue": 5.0, "date": "2024-03-02", "time": "10:00", "effectiveDate": datetime(2024, 3, 2)},
+        {"type": "entrada_vendas", "description": "v2", "amount": 80.0, "date": "2024-03-03", "time": "09:00",
+         "effectiveDate": datetime(2024, 3, 3)},
+        {"type": "saida_vendas", "description": "f1", "amount": 30.0, "date": "2024-03-04", "time": "08:00",
+         "effectiveDate": datetime(2024, 3, 4)},
+        {"type": "entrada", "description": "fora", "amount": 500.0, "date": "2024-04-01", "time": "08:00",
+         "effectiveDate": datetime(2024, 4, 1)}
+    ]))
+
+    full = report(server, loop, server.get_sales_analysis)
+    summary = report(server, loop, server.get_sales_analysis, include="summary")
+    assert summary["sales"] == full["sales"] == {
+        "total_sales": 200.0, "total_supplier_costs": 70.0, "total_commissions": 5.0,
+        "net_profit": 125.0, "sales_count": 2, "average_sale": 100.0
+    }
+    assert "details" not in summary and "transactions" not in summary
+
+    details = report(server, loop, server.get_sales_analysis, include="details", fields="description", limit=1)
+    assert details["sales"] == full["sales"]
+    sales_page, supplier_page = details["details"]["transactions"], details["details"]["supplier_payments"]
+    assert [row["description"] for row in sales_page["items"]] == ["v2"]
+    assert [row["description"] for row in supplier_page["items"]] == ["f1"]
+    assert supplier_page["next_cursor"] is None
+
+    following = loop.run_until_complete(server.fetch_report_page(
+        "2024-03-01", "2024-03-31", "entrada_vendas", sales_page["next_cursor"], 1, "description"
+    ))
+    assert [row["description"] for row in following["items"]] == ["v1"]
+
+    complete = report(server, loop, server.get_complete_analysis, include="summary")
+    assert complete["summary"]["total_entradas"] == 180.0
+    assert complete["summary"]["saidas_vendas_count"] == 1
+    assert complete["summary"]["entradas_outras_count"] == 0
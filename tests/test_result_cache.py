@@ -0,0 +1,38 @@
+"""
+Result cache: entries are bounded by count and by weight (rows held by the
+cached results), so wide report periods cannot grow memory without limit.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from result_cache import ResultCache, result_weight  # noqa: E402
+
+
+def test_result_weight_counts_nested_rows():
+    assert result_weight({"period": {}, "sales": {"transactions": [1, 2, 3], "count": 3}}) == 4
+    assert result_weight(42) == 1
+
+
+def test_weight_budget_evicts_least_recently_used():
+    cache = ResultCache(max_entries=10, max_weight=10)
+    cache.set("a", [0] * 4)
+    cache.set("b", [0] * 4)
+    cache.get("a")
+    cache.set("c", [0] * 4)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.weight == 10
+
+
+def test_results_over_budget_are_not_cached():
+    cache = ResultCache(max_entries=10, max_weight=10)
+    cache.set("small", [0])
+    cache.set("huge", [0] * 100)
+    assert cache.get("huge") is None
+    assert cache.get("small") == [0]
+    # Replacing an entry releases its old weight
+    cache.set("small", [0, 0])
+    assert cache.weight == 3
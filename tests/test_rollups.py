@@ -0,0 +1,40 @@
+"""
+Daily rollups: the dashboard summary read from daily_rollups must match the
+one aggregated from the transactions, including rows whose effectiveDate was
+never filled in or that carry no usable date at all.
+"""
+
+from datetime import datetime
+
+from rollups import apply_rollups, rebuild_rollups
+
+MIXED_DATES = [
+    {"type": "entrada", "amount": 100.0, "client": "Ana", "effectiveDate": datetime(2024, 3, 2), "date": "2024-03-02"},
+    {"type": "entrada", "amount": 50.0, "client": "Bia", "effectiveDate": None, "transactionDate": "2024-03-05"},
+    {"type": "entrada", "amount": 25.0, "client": "Ana", "transactionDate": "", "date": "2024-02-10"},
+    {"type": "saida", "amount": 30.0, "transactionDate": "10/02/2024", "date": "2024-02-10"},
+    {"type": "saida", "amount": 12.5, "date": ""},
+    {"type": "entrada", "amount": 7.0}
+]
+
+
+def summaries(server, loop):
+    server.report_cache.clear()
+    from_transactions = loop.run_until_complete(server.get_transaction_summary(source="transactions"))
+    from_rollups = loop.run_until_complete(server.get_transaction_summary(source="rollups"))
+    return from_transactions, from_rollups
+
+
+def test_rollup_summary_matches_the_transaction_scan_with_missing_dates(server_db):
+    loop, server = server_db
+    documents = [dict(document) for document in MIXED_DATES]
+    loop.run_until_complete(server.db.transactions.insert_many(documents))
+    loop.run_until_complete(apply_rollups(server.db, documents))
+
+    from_transactions, from_rollups = summaries(server, loop)
+    assert from_transactions["totalEntradas"] == 182.0
+    assert from_transactions["totalSaidas"] == 42.5
+    assert from_rollups == from_transactions
+
+    loop.run_until_complete(rebuild_rollups(server.db))
+    assert summaries(server, loop)[1] == from_transactions
@@ -0,0 +1,55 @@
+"""
+/reports/timeseries: per-type totals bucketed by day, week (starting on
+Monday) or month, identical from the transactions and from the rollups.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from rollups import rebuild_rollups
+
+ROWS = [
+    # 2024-03-03 is a Sunday: it belongs to the week starting Monday 2024-02-26
+    ("entrada_vendas", 100.0, datetime(2024, 3, 3)),
+    ("entrada_vendas", 50.0, datetime(2024, 3, 4)),
+    ("saida", 20.0, datetime(2024, 3, 10)),
+    ("entrada", 5.0, datetime(2024, 3, 10)),
+    ("saida_vendas", 40.0, datetime(2024, 4, 1)),
+    ("saida", 999.0, datetime(2024, 5, 2))
+]
+
+
+def point(period, **values):
+    return {"period": period, "entrada_vendas": 0, "entrada": 0, "saida_vendas": 0, "saida": 0, **values}
+
+
+EXPECTED = {
+    "day": [
+        point("2024-03-03", entrada_vendas=100.0), point("2024-03-04", entrada_vendas=50.0),
+        point("2024-03-10", saida=20.0, entrada=5.0), point("2024-04-01", saida_vendas=40.0)
+    ],
+    "week": [
+        point("2024-02-26", entrada_vendas=100.0), point("2024-03-04", entrada_vendas=50.0, saida=20.0, entrada=5.0),
+        point("2024-04-01", saida_vendas=40.0)
+    ],
+    "month": [
+        point("2024-03-01", entrada_vendas=150.0, saida=20.0, entrada=5.0), point("2024-04-01", saida_vendas=40.0)
+    ]
+}
+
+
+@pytest.mark.parametrize("granularity", ["day", "week", "month"])
+def test_buckets_per_granularity_from_both_sources(server_db, granularity):
+    loop, server = server_db
+    loop.run_until_complete(server.db.transactions.insert_many([
+        {"type": transaction_type, "amount": amount, "effectiveDate": day} for transaction_type, amount, day in ROWS
+    ]))
+    loop.run_until_complete(rebuild_rollups(server.db))
+
+    for source in ("transactions", "rollups"):
+        server.report_cache.clear()
+        result = loop.run_until_complete(server.get_timeseries(
+            granularity=granularity, metric="amount", start_date="2024-03-01", end_date="2024-04-30", source=source
+        ))
+        assert result["series"] == EXPECTED[granularity], source
@@ -0,0 +1,109 @@
+"""
+PATCH /api/transactions/{id}: translation of changed fields and JSON-Patch
+style entry operations into a single MongoDB update.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from transaction_patch import build_patch_update, removal_arrays  # noqa: E402
+
+SUPPLIERS = [{"name": "A", "value": "10"}, None, {"name": "C", "value": "30"}]
+
+
+def test_positional_changes_are_guarded_by_entry_existence():
+    update, conditions = build_patch_update({"amount": 5.0}, [
+        {"op": "replace", "path": "/suppliers/2/paymentStatus", "value": "Pago"},
+        {"op": "remove", "path": "/passengers/0/name"}
+    ])
+    assert update == {"$set": {"amount": 5.0, "suppliers.2.paymentStatus": "Pago"}, "$unset": {"passengers.0.name": ""}}
+    assert conditions == {"suppliers.2": {"$exists": True}, "passengers.0": {"$exists": True}}
+
+
+def test_append_and_positional_insert():
+    update, conditions = build_patch_update({}, [
+        {"op": "add", "path": "/suppliers/-", "value": {"name": "D"}},
+        {"op": "add", "path": "/suppliers/-", "value": {"name": "E"}},
+        {"op": "add", "path": "/passengers/1", "value": {"name": "P"}}
+    ])
+    assert update == {"$push": {
+        "suppliers": {"$each": [{"name": "D"}, {"name": "E"}]},
+        "passengers": {"$each": [{"name": "P"}], "$position": 1}
+    }}
+    assert conditions == {}
+
+
+@pytest.mark.parametrize("fields, operations", [
+    ({}, [{"op": "replace", "path": "/suppliers/0", "value": {}}, {"op": "replace", "path": "/suppliers/0/value", "value": "1"}]),
+    ({}, [{"op": "add", "path": "/suppliers/-", "value": {}}, {"op": "replace", "path": "/suppliers/0/value", "value": "1"}]),
+    ({}, [{"op": "add", "path": "/suppliers/-", "value": {}}, {"op": "add", "path": "/suppliers/0", "value": {}}]),
+    ({"suppliers": []}, [{"op": "replace", "path": "/suppliers/0/value", "value": "1"}]),
+    ({}, [{"op": "replace", "path": "/suppliers/-/value", "value": "1"}]),
+    ({}, [{"op": "move", "path": "/suppliers/0"}]),
+    ({}, [{"op": "replace", "path": "/clients/0", "value": {}}])
+])
+def test_rejects_conflicting_or_invalid_operations(fields, operations):
+    with pytest.raises(ValueError):
+        build_patch_update(fields, operations)
+
+
+def test_remove_rewrites_the_array_from_the_pre_image():
+    operations = [
+        {"op": "remove", "path": "/suppliers/0"},
+        {"op": "replace", "path": "/suppliers/2/value", "value": "35"}
+    ]
+    assert removal_arrays(operations) == ["suppliers"]
+    update, conditions = build_patch_update({"amount": 1.0}, operations, {"suppliers": SUPPLIERS})
+    # Entries keep their stored positions; a null that was already there stays
+    assert update == {"$set": {"amount": 1.0, "suppliers": [None, {"name": "C", "value": "35"}]}}
+    assert conditions == {}
+    assert SUPPLIERS[2]["value"] == "30"
+
+
+def test_remove_out_of_range_raises_index_error():
+    with pytest.raises(IndexError):
+        build_patch_update({}, [{"op": "remove", "path": "/suppliers/3"}], {"suppliers": SUPPLIERS})
+    with pytest.raises(IndexError):
+        build_patch_update({}, [{"op": "remove", "path": "/passengers/0"}], {"passengers": None})
+
+
+def test_out_of_range_index_is_a_422(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    created = run(server.insert_transaction(server.TransactionCreate(
+        type="entrada", description="t", amount=10, suppliers=[{"name": "A", "value": "10"}, {"name": "B", "value": "20"}]
+    )))
+
+    for operation in ({"op": "replace", "path": "/suppliers/5/value", "value": "1"}, {"op": "remove", "path": "/suppliers/5"}):
+        with pytest.raises(HTTPException) as error:
+            run(server.patch_transaction(created["id"], server.TransactionPatch(operations=[operation]), {}))
+        assert error.value.status_code == 422
+
+    patched = run(server.patch_transaction(created["id"], server.TransactionPatch(operations=[{"op": "remove", "path": "/suppliers/0"}]), {}))
+    assert patched["suppliers"] == [{"name": "B", "value": "20"}]
+
+
+def test_custom_category_recomputes_the_stored_category(server_db):
+    loop, server = server_db
+    run = loop.run_until_complete
+    created = run(server.insert_transaction(server.TransactionCreate(
+        type="entrada", description="t", amount=10, category="Passagem"
+    )))
+
+    def patch(**fields):
+        return run(server.patch_transaction(created["id"], server.TransactionPatch(**fields), {}))
+
+    assert patch(customCategory="Cruzeiro")["category"] == "Cruzeiro"
+    # The custom category wins over a chosen one while it is set
+    assert patch(category="Hotel")["category"] == "Cruzeiro"
+    assert patch(customCategory="", category="Hotel")["category"] == "Hotel"
+    patch(customCategory="Cruzeiro")
+    assert patch(customCategory=None)["category"] == "Outros"
+
+    rollups = run(server.db[server.ROLLUP_COLLECTION].find({"count": {"$ne": 0}}).to_list(None))
+    assert [(row["category"], row["count"]) for row in rollups] == [("Outros", 1)]
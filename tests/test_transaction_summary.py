@@ -0,0 +1,31 @@
+"""
+GET /api/transactions/summary: the single $facet aggregation returns the
+dashboard numbers without loading the transactions.
+"""
+
+from datetime import date
+
+
+def test_summary_values_from_the_facet_aggregation(server_db):
+    loop, server = server_db
+    today = date.today().strftime("%Y-%m-%d")
+    loop.run_until_complete(server.db.transactions.insert_many([
+        {"type": "entrada", "amount": 100.0, "client": "Ana", "date": today},
+        {"type": "entrada", "amount": 50.0, "client": "Bia", "date": "2024-03-01", "transactionDate": today},
+        {"type": "entrada", "client": "Ana", "date": "2024-03-02"},
+        {"type": "saida", "amount": 30.0, "client": "", "date": "2024-03-03"},
+        {"type": "entrada_vendas", "amount": 999.0, "client": "Caio", "date": "2024-03-04"},
+        {"type": "saida_vendas", "amount": 400.0, "client": None, "date": today}
+    ]))
+
+    summary = loop.run_until_complete(server.get_transaction_summary(source="transactions"))
+
+    assert summary == {
+        # Only entrada/saida count in the totals; a missing amount adds 0
+        "totalEntradas": 150.0,
+        "totalSaidas": 30.0,
+        "saldoAtual": 120.0,
+        "transacoesHoje": 3,
+        "clientesAtendidos": 3,
+        "ticketMedio": 50.0
+    }
@@ -0,0 +1,48 @@
+"""
+GET /api/transactions: without paging parameters the endpoint returns one
+bounded page; the full list is only sent when asked for with all=true.
+"""
+
+from starlette.requests import Request
+
+
+def list_transactions(server, loop, **params):
+    arguments = dict(
+        limit=None, cursor=None, stream=False, all_transactions=False, fields=None, type_filter=None,
+        date_from=None, date_to=None, client=None, seller=None, supplier=None, status_filter=None, paymentMethod=None
+    )
+    arguments.update(params)
+    request = Request({"type": "http", "headers": []})
+    return loop.run_until_complete(server.get_transactions(request, **arguments))
+
+
+def test_default_is_a_bounded_page(server_db, monkeypatch):
+    loop, server = server_db
+    monkeypatch.setattr(server, "TRANSACTIONS_DEFAULT_LIMIT", 2)
+    loop.run_until_complete(server.db.transactions.insert_many([
+        {"type": "entrada", "description": f"t{day}", "amount": day, "date": f"2024-03-0{day}", "time": "10:00"}
+        for day in range(1, 6)
+    ]))
+
+    page = list_transactions(server, loop)
+    assert [transaction["description"] for transaction in page["items"]] == ["t5", "t4"]
+    assert page["next_cursor"]
+
+    following = list_transactions(server, loop, cursor=page["next_cursor"])
+    assert [transaction["description"] for transaction in following["items"]] == ["t3", "t2"]
+
+    everything = list_transactions(server, loop, all_transactions=True)
+    assert [transaction["description"] for transaction in everything] == ["t5", "t4", "t3", "t2", "t1"]
+
+
+def test_fields_drop_subpaths_of_a_projected_parent(server_db):
+    loop, server = server_db
+    assert server.build_projection("suppliers,suppliers.name,passengers.name", required=["date"]) == {
+        "suppliers": 1, "passengers.name": 1, "date": 1
+    }
+    loop.run_until_complete(server.db.transactions.insert_one({
+        "type": "entrada", "description": "t", "amount": 1, "date": "2024-03-01", "time": "10:00",
+        "suppliers": [{"name": "A", "value": "10"}]
+    }))
+    page = list_transactions(server, loop, fields="suppliers.name,suppliers")
+    assert page["items"][0]["suppliers"] == [{"name": "A", "value": "10"}]